@@ -0,0 +1,174 @@
+import argparse
+import logging
+import random
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from odf.opendocument import OpenDocumentSpreadsheet
+from odf.table import Table, TableCell, TableRow
+from odf.text import P
+
+# Abreviações dos meses no formato usado pela Anatel nos cabeçalhos ("Jan/13", "Fev/13", ...).
+MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+SERVICOS = ["SMP", "STFC", "SCM"]
+
+GRUPOS = ["ALGAR", "CLARO", "VIVO", "OI", "SKY", "TIM", "NEXTEL", "SERCOMTEL"]
+
+# Valores da coluna VARIÁVEL presentes nas planilhas reais do IDA; a métrica alvo vem primeiro.
+VARIAVEIS = [
+    "Taxa de Respondidas em 5 dias Úteis",
+    "Indicador de Desempenho no Atendimento (IDA)",
+    "Índice de Reclamações",
+    "Quantidade de Reclamações",
+    "Quantidade de Reabertas",
+    "Quantidade de Respondidas",
+    "Quantidade de Respondidas em até 5 dias",
+    "Quantidade de acessos em serviço",
+    "Taxa de Reabertas",
+    "Taxa de Respondidas",
+]
+
+# Número de linhas de preâmbulo antes do cabeçalho (o ETL lê com `header=8`).
+LINHAS_PREAMBULO = 8
+
+
+def nomes(base: Sequence[str], quantidade: int, prefixo: str) -> List[str]:
+    """
+    Retorna `quantidade` nomes: os primeiros da lista `base` e, se ela não bastar,
+    nomes sintéticos no formato `<prefixo> NN`.
+    """
+    extras = [f"{prefixo} {i:02d}" for i in range(1, quantidade - len(base) + 1)]
+    return (list(base) + extras)[:quantidade]
+
+
+def _cell(value) -> TableCell:
+    if value is None:
+        return TableCell()
+    if isinstance(value, float):
+        cell = TableCell(valuetype="float", value=repr(value))
+    else:
+        cell = TableCell(valuetype="string")
+    cell.addElement(P(text=str(value)))
+    return cell
+
+
+def _row(values: Sequence) -> TableRow:
+    row = TableRow()
+    for value in values:
+        row.addElement(_cell(value))
+    return row
+
+
+def generate_file(
+    output_path: Path,
+    servico: str,
+    ano: int,
+    grupos: Sequence[str],
+    variaveis: Sequence[str],
+    faltantes: float = 0.05,
+    seed: int = 0,
+) -> int:
+    """
+    Gera uma planilha .ods sintética no mesmo layout das planilhas do IDA: 8 linhas de
+    preâmbulo, o cabeçalho `GRUPO ECONÔMICO`, `VARIÁVEL`, `Mmm/AA`... e uma linha por
+    grupo econômico e variável com um valor por mês.
+
+    Os valores são determinísticos para uma mesma combinação de serviço, ano e `seed`.
+
+    Args:
+        output_path (Path): O arquivo .ods a ser gravado.
+        servico (str): O serviço (usado apenas no preâmbulo e na semente).
+        ano (int): O ano das colunas de mês.
+        grupos (Sequence[str]): Os grupos econômicos.
+        variaveis (Sequence[str]): Os valores da coluna VARIÁVEL.
+        faltantes (float): Fração das células de valor deixadas vazias ou com "-".
+        seed (int): Semente do gerador de números aleatórios.
+
+    Returns:
+        int: O número de linhas de dados gravadas.
+    """
+    rnd = random.Random(f"{servico}-{ano}-{seed}")
+    table = Table(name="IDA")
+
+    preambulo = [f"Índice de Desempenho no Atendimento - {servico} {ano}", "Fonte: dados sintéticos"]
+    for i in range(LINHAS_PREAMBULO):
+        table.addElement(_row([preambulo[i] if i < len(preambulo) else f"Nota {i}"]))
+
+    ano_curto = str(ano)[2:]
+    table.addElement(_row(["GRUPO ECONÔMICO", "VARIÁVEL"] + [f"{mes}/{ano_curto}" for mes in MESES]))
+
+    for grupo in grupos:
+        for variavel in variaveis:
+            valores = []
+            for _ in MESES:
+                if rnd.random() < faltantes:
+                    valores.append(rnd.choice([None, "-"]))
+                else:
+                    valores.append(round(rnd.uniform(0, 100), 4))
+            # As planilhas reais trazem espaços nas pontas da coluna VARIÁVEL.
+            table.addElement(_row([grupo, f" {variavel} "] + valores))
+
+    doc = OpenDocumentSpreadsheet()
+    doc.spreadsheet.addElement(table)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(output_path))
+    return len(grupos) * len(variaveis)
+
+
+def generate_dataset(
+    output_dir: Path,
+    anos: Sequence[int] = range(2013, 2020),
+    servicos: Sequence[str] = SERVICOS,
+    n_grupos: int = len(GRUPOS),
+    n_variaveis: int = 3,
+    faltantes: float = 0.05,
+    seed: int = 0,
+    variaveis: Optional[Sequence[str]] = None,
+) -> List[Path]:
+    """
+    Gera um conjunto de planilhas `<SERVIÇO><ANO>.ods`, como as baixadas pelo ETL.
+
+    Returns:
+        List[Path]: Os arquivos gerados.
+    """
+    grupos = nomes(GRUPOS, n_grupos, "GRUPO")
+    variaveis = list(variaveis) if variaveis else nomes(VARIAVEIS, n_variaveis, "Variável Sintética")
+    files = []
+    for servico in servicos:
+        for ano in anos:
+            output_path = output_dir / f"{servico}{ano}.ods"
+            generate_file(output_path, servico, ano, grupos, variaveis, faltantes, seed)
+            files.append(output_path)
+    return files
+
+
+def main():
+    """
+    Linha de comando do gerador de planilhas sintéticas.
+    """
+    parser = argparse.ArgumentParser(description="Gera planilhas .ods sintéticas no layout do IDA.")
+    parser.add_argument("saida", type=Path, help="Diretório onde os arquivos .ods serão gravados.")
+    parser.add_argument("--anos", type=int, nargs=2, default=[2013, 2019], metavar=("INICIO", "FIM"))
+    parser.add_argument("--servicos", nargs="+", default=SERVICOS)
+    parser.add_argument("--grupos", type=int, default=len(GRUPOS), help="Número de grupos econômicos.")
+    parser.add_argument("--variaveis", type=int, default=3, help="Número de valores distintos de VARIÁVEL.")
+    parser.add_argument("--faltantes", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = generate_dataset(
+        args.saida,
+        anos=range(args.anos[0], args.anos[1] + 1),
+        servicos=args.servicos,
+        n_grupos=args.grupos,
+        n_variaveis=args.variaveis,
+        faltantes=args.faltantes,
+        seed=args.seed,
+    )
+    logging.info(f"{len(files)} arquivos gerados em '{args.saida}'.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
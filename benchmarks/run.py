@@ -0,0 +1,237 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+from benchmarks.generator import generate_dataset
+from src.config import LEITORES_ODS, METRICA_ALVO, MODOS_CARGA
+from src.database import truncate_star_sql
+from src.etl import EtlPipeline
+from src.views import ANALYTIC_VIEWS
+
+RESULTS_DIR = Path(__file__).parent / "resultados"
+
+ETAPAS = ("parse", "transform", "load", "streaming", "views")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    """
+    Mede cada etapa do `EtlPipeline` sobre um conjunto de planilhas sintéticas e grava os
+    resultados em JSON, para comparação entre commits.
+
+    Cada medição é repetida `repeticoes` vezes (após `aquecimento` execuções descartadas) e
+    o resultado guarda todos os tempos, além do mínimo e da mediana.
+    """
+
+    def __init__(
+        self,
+        input_dir: Path,
+        db_url: Optional[str] = None,
+        repeticoes: int = 3,
+        aquecimento: int = 1,
+        metrics: tuple = (METRICA_ALVO,),
+    ):
+        """
+        Constrói uma instância da BenchmarkSuite.
+
+        Args:
+            input_dir (Path): Diretório com as planilhas .ods de entrada.
+            db_url (str, opcional): URI de um PostgreSQL local. Sem ela, as etapas que
+                dependem do banco (load, streaming, views) são puladas.
+            repeticoes (int): Número de medições de cada etapa.
+            aquecimento (int): Número de execuções descartadas antes das medições.
+            metrics (tuple): Métricas carregadas pelo pipeline.
+        """
+        self.input_dir = input_dir
+        self.db_url = db_url
+        self.repeticoes = max(1, repeticoes)
+        self.aquecimento = max(0, aquecimento)
+        self.metrics = metrics
+        self.results: List[Dict] = []
+
+    def _pipeline(self, **kwargs) -> EtlPipeline:
+        # Sem cache de parsing: o objetivo é medir a leitura das planilhas.
+        return EtlPipeline(self.input_dir, self.db_url or "postgresql://", metrics=self.metrics, parse_cache=None, **kwargs)
+
+    def _measure(self, etapa: str, variante: str, func: Callable[[], int], setup: Optional[Callable[[], None]] = None) -> Dict:
+        """
+        Executa `func` repetidas vezes e registra os tempos. `setup` roda antes de cada
+        execução, fora da medição. `func` retorna o número de linhas produzidas.
+        """
+        tempos = []
+        linhas = 0
+        for i in range(self.aquecimento + self.repeticoes):
+            if setup:
+                setup()
+            inicio = time.perf_counter()
+            linhas = func()
+            duracao = time.perf_counter() - inicio
+            if i >= self.aquecimento:
+                tempos.append(duracao)
+
+        resultado = {
+            "etapa": etapa,
+            "variante": variante,
+            "linhas": linhas,
+            "tempos_s": tempos,
+            "min_s": min(tempos),
+            "mediana_s": statistics.median(tempos),
+        }
+        self.results.append(resultado)
+        logging.info(f"{etapa}[{variante}]: mediana de {resultado['mediana_s']:.3f}s ({linhas} linhas).")
+        return resultado
+
+    def bench_parse(self, leitores=LEITORES_ODS, parse_workers: int = 1) -> None:
+        for leitor in leitores:
+            pipeline = self._pipeline(ods_reader=leitor, parse_workers=parse_workers)
+
+            def parse():
+                pipeline.extract_and_clean()
+                return sum(len(df) for df in pipeline.cleaned_data.values())
+
+            self._measure("parse", f"{leitor}/workers={parse_workers}", parse)
+
+    def bench_transform(self) -> EtlPipeline:
+        pipeline = self._pipeline()
+        pipeline.extract_and_clean()
+
+        def transform():
+            pipeline.transform()
+            return len(pipeline.final_df)
+
+        self._measure("transform", "melt+filtro", transform)
+        return pipeline
+
+    def _truncate(self, pipeline: EtlPipeline) -> None:
+        with pipeline.backend.engine.begin() as connection:
+            connection.execute(text(truncate_star_sql()))
+
+    def bench_load(self, pipeline: EtlPipeline, modos=MODOS_CARGA, materialized_views: bool = False) -> None:
+        for modo in modos:
+            pipeline.load_mode = modo
+            pipeline.materialized_views = materialized_views
+            pipeline._setup_database()
+
+            def load():
+                pipeline.load()
+                return len(pipeline.final_df)
+
+            # Cada execução parte de tabelas vazias, inclusive no modo upsert.
+            self._measure("load", f"{modo}/mv={int(materialized_views)}", load, setup=lambda: self._truncate(pipeline))
+
+    def bench_streaming(self, chunk_rows: int = 50_000) -> None:
+        pipeline = self._pipeline(chunk_rows=chunk_rows)
+        pipeline._setup_database()
+        self._measure(
+            "streaming",
+            f"chunk_rows={chunk_rows}",
+            lambda: pipeline.load_streaming(pipeline.iter_transformed_chunks()),
+        )
+
+    def bench_views(self, pipeline: EtlPipeline) -> None:
+        with pipeline.backend.engine.connect() as connection:
+            for name in ANALYTIC_VIEWS:
+                def query():
+                    return len(pd.read_sql(text(f"SELECT * FROM {name}"), connection))
+
+                self._measure("views", name, query)
+        if pipeline.materialized_views:
+            self._measure("views", "refresh_materialized", lambda: pipeline.refresh_views() or 0)
+
+    def report(self, parametros: Dict) -> Dict:
+        return {
+            "metadados": {
+                "commit": _git_commit(),
+                "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "plataforma": platform.platform(),
+                "cpus": os.cpu_count(),
+                "parametros": parametros,
+            },
+            "resultados": self.results,
+        }
+
+
+def main():
+    """
+    Linha de comando da suíte de benchmarks.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa do pipeline de ETL.")
+    parser.add_argument("--entrada", type=Path, help="Diretório com planilhas .ods. Se omitido, um conjunto sintético é gerado.")
+    parser.add_argument("--anos", type=int, nargs=2, default=[2013, 2019], metavar=("INICIO", "FIM"))
+    parser.add_argument("--grupos", type=int, default=8)
+    parser.add_argument("--variaveis", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DATABASE_URL"), help="PostgreSQL local para as etapas de carga e views.")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument("--modos", nargs="+", choices=MODOS_CARGA, default=list(MODOS_CARGA))
+    parser.add_argument("--parse-workers", type=int, default=1)
+    parser.add_argument("--materializadas", action="store_true", help="Cria as views como materializadas.")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--aquecimento", type=int, default=1)
+    parser.add_argument("--saida", type=Path, help="Arquivo JSON de resultados.")
+    args = parser.parse_args()
+
+    parametros = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items() if k != "db_url"}
+    with tempfile.TemporaryDirectory(prefix="bench_ods_") as tmp_dir:
+        input_dir = args.entrada
+        if input_dir is None:
+            input_dir = Path(tmp_dir)
+            generate_dataset(
+                input_dir,
+                anos=range(args.anos[0], args.anos[1] + 1),
+                n_grupos=args.grupos,
+                n_variaveis=args.variaveis,
+                seed=args.seed,
+            )
+        parametros["arquivos"] = len(list(input_dir.glob("*.ods")))
+
+        suite = BenchmarkSuite(input_dir, args.db_url, args.repeticoes, args.aquecimento)
+        if "parse" in args.etapas:
+            suite.bench_parse(parse_workers=args.parse_workers)
+        pipeline = suite.bench_transform() if {"transform", "load", "views"} & set(args.etapas) else None
+        if args.db_url is None:
+            logging.warning("Sem --db-url/BENCH_DATABASE_URL: etapas de banco puladas.")
+        else:
+            if "load" in args.etapas:
+                suite.bench_load(pipeline, args.modos, args.materializadas)
+            if "views" in args.etapas:
+                if "load" not in args.etapas:
+                    pipeline.materialized_views = args.materializadas
+                    pipeline._setup_database()
+                    pipeline.load()
+                suite.bench_views(pipeline)
+            if "streaming" in args.etapas:
+                suite.bench_streaming()
+
+    report = suite.report(parametros)
+    output = args.saida or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['metadados']['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    logging.info(f"Resultados gravados em '{output}'.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
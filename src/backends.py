@@ -0,0 +1,947 @@
+import io
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .config import ANOS, MODOS_CARGA, MODOS_CARGA_PARQUET, STAGING_SCHEMA, parquet_dir
+from .database import (
+    MART_TABLES,
+    ROLLUP_TABLES,
+    bump_data_version,
+    create_staging_schema,
+    create_views,
+    data_version,
+    drop_schema,
+    refresh_views,
+    setup_database,
+    swap_schema,
+    truncate_star_sql,
+)
+from .metrics import RunMetrics
+from .models import (
+    DimGrupoEconomico,
+    DimMetrica,
+    DimServico,
+    DimTempo,
+    FatoAtendimento,
+    attach_partition,
+    detach_partition,
+    ensure_partitions,
+    partition_ddl,
+)
+from .parquet_store import ParquetStore
+from .rollups import COLUNAS_FATO, compute_rollups
+
+
+# Dimensões do modelo estrela: (tabela, coluna de `final_df`, chave substituta, coluna natural).
+_DIMENSOES = (
+    ("dim_servico", "servico", "id_servico", "nome_servico"),
+    ("dim_grupo_economico", "grupo_economico", "id_grupo", "nome_grupo"),
+    ("dim_metrica", "metrica", "id_metrica", "nome_metrica"),
+    ("dim_tempo", "data_referencia", "id_tempo", "data_referencia"),
+)
+
+
+def _star_frames(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Monta as tabelas do modelo estrela a partir de `final_df`. As chaves substitutas são
+    atribuídas em memória a partir dos códigos de categorias do pandas (código + 1), o que
+    dispensa a releitura das dimensões para resolver as chaves estrangeiras da fato.
+    """
+    servicos = pd.Categorical(df["servico"])
+    grupos = pd.Categorical(df["grupo_economico"])
+    datas = pd.Categorical(df["data_referencia"])
+    metricas = pd.Categorical(df["metrica"])
+
+    return {
+        "dim_servico": pd.DataFrame({
+            "id_servico": range(1, len(servicos.categories) + 1),
+            "nome_servico": servicos.categories,
+        }),
+        "dim_grupo_economico": pd.DataFrame({
+            "id_grupo": range(1, len(grupos.categories) + 1),
+            "nome_grupo": grupos.categories,
+        }),
+        "dim_tempo": pd.DataFrame({
+            "id_tempo": range(1, len(datas.categories) + 1),
+            "data_referencia": datas.categories,
+            "ano": datas.categories.year,
+            "mes": datas.categories.month,
+        }),
+        "dim_metrica": pd.DataFrame({
+            "id_metrica": range(1, len(metricas.categories) + 1),
+            "nome_metrica": metricas.categories,
+        }),
+        "fato_atendimento": pd.DataFrame({
+            "tempo_id": datas.codes + 1,
+            "servico_id": servicos.codes + 1,
+            "grupo_economico_id": grupos.codes + 1,
+            "metrica_id": metricas.codes + 1,
+            "data_referencia": df["data_referencia"].to_numpy(),
+            "valor": df["valor"].to_numpy(),
+        }),
+    }
+
+
+def _iter_star_frames(chunks: Iterable[pd.DataFrame], chaves: Dict[str, Dict]) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Converte um fluxo de blocos de `final_df` em blocos das tabelas do modelo estrela: para
+    cada bloco, os membros de dimensão ainda não vistos e em seguida os registros da fato.
+    As chaves substitutas são atribuídas em memória e guardadas em `chaves` (por tabela),
+    sendo reaproveitadas entre os blocos.
+
+    Yields:
+        Tuple[str, pd.DataFrame]: O nome da tabela e os registros a gravar nela.
+    """
+    for chunk in chunks:
+        for table, coluna, id_column, natural in _DIMENSOES:
+            cache = chaves.setdefault(table, {})
+            novos = [valor for valor in chunk[coluna].unique() if valor not in cache]
+            if not novos:
+                continue
+            for valor in novos:
+                cache[valor] = len(cache) + 1
+            frame = pd.DataFrame({id_column: [cache[valor] for valor in novos], natural: novos})
+            if table == "dim_tempo":
+                datas = pd.DatetimeIndex(novos)
+                frame["data_referencia"] = datas
+                frame["ano"] = datas.year
+                frame["mes"] = datas.month
+            yield table, frame
+
+        yield "fato_atendimento", pd.DataFrame({
+            "tempo_id": chunk["data_referencia"].map(chaves["dim_tempo"]).astype("int32"),
+            "servico_id": chunk["servico"].map(chaves["dim_servico"]).astype("int32"),
+            "grupo_economico_id": chunk["grupo_economico"].map(chaves["dim_grupo_economico"]).astype("int32"),
+            "metrica_id": chunk["metrica"].map(chaves["dim_metrica"]).astype("int32"),
+            "data_referencia": chunk["data_referencia"],
+            "valor": chunk["valor"],
+        })
+
+
+def _copy_frame(cursor, table: str, frame: pd.DataFrame) -> None:
+    """
+    Envia um DataFrame para uma tabela com `COPY ... FROM STDIN` (formato CSV),
+    a partir de um buffer em memória. Valores ausentes viram NULL.
+    """
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    columns = ", ".join(frame.columns)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _write_rollups(cursor, rollups: Iterable[Dict[str, pd.DataFrame]]) -> None:
+    """
+    Substitui o conteúdo das tabelas de agregados, gravando via `COPY` cada conjunto de
+    agregados recebido (ex: um por serviço).
+    """
+    cursor.execute(f"TRUNCATE TABLE {', '.join(ROLLUP_TABLES)}")
+    linhas = Counter()
+    for frames in rollups:
+        for table, frame in frames.items():
+            _copy_frame(cursor, table, frame)
+            linhas[table] += len(frame)
+    logging.info(f"Agregados carregados: {dict(linhas)}")
+
+
+def _rollups_from_database(cursor) -> Iterator[Dict[str, pd.DataFrame]]:
+    """
+    Calcula os agregados a partir da tabela fato do banco, um serviço por vez, de forma
+    que apenas os registros de um serviço fiquem em memória.
+    """
+    cursor.execute("SELECT id_servico FROM dim_servico ORDER BY id_servico")
+    for (servico_id,) in cursor.fetchall():
+        cursor.execute(
+            "SELECT f.data_referencia, s.nome_servico, g.nome_grupo, m.nome_metrica, f.valor "
+            "FROM fato_atendimento f "
+            "JOIN dim_servico s ON f.servico_id = s.id_servico "
+            "JOIN dim_grupo_economico g ON f.grupo_economico_id = g.id_grupo "
+            "JOIN dim_metrica m ON f.metrica_id = m.id_metrica "
+            "WHERE f.servico_id = %s",
+            (servico_id,),
+        )
+        df = pd.DataFrame(cursor.fetchall(), columns=COLUNAS_FATO)
+        if df.empty:
+            continue
+        df["data_referencia"] = pd.to_datetime(df["data_referencia"])
+        yield compute_rollups(df)
+
+
+class DataMartBackend:
+    """
+    Interface comum dos backends do Data Mart, usada pelo `EtlPipeline` (escrita) e pelo
+    `QueryService` (leitura). Cada backend implementa o setup, as cargas completa e em
+    streaming, a atualização das views e a versão dos dados.
+    """
+
+    # Nome do backend, registrado nas métricas de execução.
+    nome: str = ""
+    # Dialeto SQL das consultas (ver `views.FORMATO_MES`).
+    dialect: str = ""
+    # Modos de carga suportados (ver `config.MODOS_CARGA`).
+    modos_carga: Tuple[str, ...] = MODOS_CARGA
+
+    def setup(self, anos: Iterable[int] = ANOS, materialized_views: bool = False) -> None:
+        """
+        Garante que a estrutura do Data Mart exista.
+        """
+        raise NotImplementedError
+
+    def load(
+        self,
+        df: pd.DataFrame,
+        rollups: Dict[str, pd.DataFrame],
+        load_mode: str = "replace",
+        materialized_views: bool = False,
+    ) -> Optional[Dict[str, int]]:
+        """
+        Carrega `final_df` e seus agregados no Data Mart e publica a nova versão dos dados.
+
+        Returns:
+            Optional[Dict[str, int]]: No modo "upsert", as contagens de registros da fato
+            inseridos, atualizados e inalterados.
+        """
+        raise NotImplementedError
+
+    def load_streaming(
+        self, chunks: Iterable[pd.DataFrame], load_mode: str = "replace", materialized_views: bool = False
+    ) -> int:
+        """
+        Carrega o Data Mart a partir de um fluxo de blocos de `final_df`, de acordo com o
+        modo de carga, e publica a nova versão dos dados.
+
+        Returns:
+            int: O número de registros carregados na tabela fato.
+        """
+        raise NotImplementedError
+
+    def refresh_views(self) -> None:
+        """
+        Atualiza as views analíticas que guardam dados, se houver.
+        """
+        raise NotImplementedError
+
+    def data_version(self) -> str:
+        """
+        Retorna a versão dos dados publicada pela última carga bem-sucedida.
+        """
+        raise NotImplementedError
+
+    def read(self, sql: str, params: Dict, versao: str) -> pa.Table:
+        """
+        Executa uma consulta no dialeto do backend e retorna o resultado como tabela Arrow.
+        """
+        raise NotImplementedError
+
+    def record_run(self, run_metrics: RunMetrics) -> None:
+        """
+        Grava as métricas de uma execução do pipeline junto com o Data Mart, se o backend
+        tiver onde guardá-las.
+        """
+
+    def close(self) -> None:
+        """
+        Fecha as conexões abertas pelo backend.
+        """
+
+    def _check_load_mode(self, load_mode: str) -> None:
+        if load_mode not in self.modos_carga:
+            raise ValueError(f"O modo de carga '{load_mode}' não é suportado pelo backend {self.nome}.")
+
+
+class PostgresBackend(DataMartBackend):
+    """
+    Data Mart no PostgreSQL: modelo estrela particionado, agregados, views analíticas
+    (comuns ou materializadas) e a tabela `etl_versao_dados`.
+    """
+
+    nome = "postgresql"
+    dialect = "postgresql"
+
+    def __init__(self, db_url: str, **engine_kwargs):
+        """
+        Constrói uma instância do PostgresBackend.
+
+        Args:
+            db_url (str): A URL de conexão para o banco de dados PostgreSQL.
+            **engine_kwargs: Opções do `create_engine` (ex: tamanho do pool).
+        """
+        self.engine = create_engine(db_url, **engine_kwargs)
+
+    def setup(self, anos: Iterable[int] = ANOS, materialized_views: bool = False) -> None:
+        """
+        Garante que toda a estrutura de tabelas e views exista no banco de dados
+        (ver `database.setup_database`).
+        """
+        setup_database(self.engine, anos, materialized_views)
+
+    def load(
+        self,
+        df: pd.DataFrame,
+        rollups: Dict[str, pd.DataFrame],
+        load_mode: str = "replace",
+        materialized_views: bool = False,
+    ) -> Optional[Dict[str, int]]:
+        """
+        Carrega o DataFrame transformado para o Data Mart no PostgreSQL, de acordo com
+        o modo de carga:
+
+        - "replace": trunca as tabelas e reinsere todo o histórico.
+        - "upsert": carga incremental; apenas as diferenças são gravadas.
+        - "copy": trunca e recarrega tudo via `COPY FROM STDIN`, numa única conexão.
+        - "swap": recarrega tudo num schema de staging e o publica com uma troca atômica.
+
+        Ao fim de uma carga bem-sucedida as views materializadas (se houver) são atualizadas
+        (no modo "swap" elas já são publicadas preenchidas) e a versão dos dados é
+        incrementada (ver `database.bump_data_version`).
+
+        Returns:
+            Optional[Dict[str, int]]: No modo "upsert", as contagens de registros da fato
+            inseridos, atualizados e inalterados.
+        """
+        self._check_load_mode(load_mode)
+        stats = None
+        if load_mode == "upsert":
+            stats = self._load_upsert(df)
+        elif load_mode == "copy":
+            self._load_copy(df, rollups)
+        elif load_mode == "swap":
+            self._load_swap(df, rollups, materialized_views)
+        else:
+            self._load_replace(df, rollups)
+
+        if load_mode != "swap":
+            self.refresh_views()
+        self._bump_data_version()
+        return stats
+
+    def _bump_data_version(self) -> None:
+        """
+        Incrementa a versão dos dados do Data Mart depois de uma carga confirmada,
+        invalidando os resultados guardados pelos caches de consulta (ver `QueryService`).
+        """
+        versao = bump_data_version(self.engine)
+        logging.info(f"Versão dos dados do Data Mart: {versao}.")
+
+    def _load_replace(self, df: pd.DataFrame, rollups: Dict[str, pd.DataFrame]) -> None:
+        """
+        Carrega o DataFrame transformado para o Data Mart no PostgreSQL.
+        A carga é idempotente, truncando as tabelas antes de inserir novos dados.
+        """
+        logging.info("Iniciando a carga de dados para o PostgreSQL.")
+
+        with self.engine.connect() as conn:
+            logging.info("Limpando tabelas existentes para garantir a idempotência.")
+            conn.execute(text(truncate_star_sql()))
+            conn.commit()
+
+        dim_servico_df = pd.DataFrame(df["servico"].unique(), columns=["nome_servico"])
+        dim_servico_df.to_sql("dim_servico", self.engine, if_exists="append", index=False)
+        logging.info(f"Carregados {len(dim_servico_df)} registros em dim_servico.")
+
+        dim_grupo_df = pd.DataFrame(df["grupo_economico"].unique(), columns=["nome_grupo"])
+        dim_grupo_df.to_sql("dim_grupo_economico", self.engine, if_exists="append", index=False)
+        logging.info(f"Carregados {len(dim_grupo_df)} registros em dim_grupo_economico.")
+
+        dim_tempo_df = pd.DataFrame({"data_referencia": df["data_referencia"].unique()})
+        dim_tempo_df["ano"] = dim_tempo_df["data_referencia"].dt.year
+        dim_tempo_df["mes"] = dim_tempo_df["data_referencia"].dt.month
+        dim_tempo_df.to_sql("dim_tempo", self.engine, if_exists="append", index=False)
+        logging.info(f"Carregados {len(dim_tempo_df)} registros em dim_tempo.")
+
+        dim_metrica_df = pd.DataFrame(df["metrica"].unique(), columns=["nome_metrica"])
+        dim_metrica_df.to_sql("dim_metrica", self.engine, if_exists="append", index=False)
+        logging.info(f"Carregados {len(dim_metrica_df)} registros em dim_metrica.")
+
+        logging.info("Mapeando chaves estrangeiras para a tabela fato.")
+        dim_servico_db = pd.read_sql("SELECT id_servico, nome_servico FROM dim_servico", self.engine)
+        dim_grupo_db = pd.read_sql("SELECT id_grupo, nome_grupo FROM dim_grupo_economico", self.engine)
+        dim_tempo_db = pd.read_sql("SELECT id_tempo, data_referencia FROM dim_tempo", self.engine)
+        dim_metrica_db = pd.read_sql("SELECT id_metrica, nome_metrica FROM dim_metrica", self.engine)
+
+        df = pd.merge(df, dim_servico_db, left_on="servico", right_on="nome_servico", how="left")
+        df = pd.merge(df, dim_grupo_db, left_on="grupo_economico", right_on="nome_grupo", how="left")
+        df = pd.merge(df, dim_metrica_db, left_on="metrica", right_on="nome_metrica", how="left")
+
+        dim_tempo_db['data_referencia'] = pd.to_datetime(dim_tempo_db['data_referencia'])
+        df = pd.merge(df, dim_tempo_db, on="data_referencia", how="left")
+
+        df.rename(columns={
+            "id_tempo": "tempo_id",
+            "id_servico": "servico_id",
+            "id_grupo": "grupo_economico_id",
+            "id_metrica": "metrica_id",
+        }, inplace=True)
+
+        df_fato = df[["tempo_id", "servico_id", "grupo_economico_id", "metrica_id", "data_referencia", "valor"]].copy()
+
+        with self.engine.begin() as conn:
+            ensure_partitions(conn, df_fato["data_referencia"].dt.year.unique())
+
+        logging.info(f"Carregando {len(df_fato)} registros na tabela fato_atendimento.")
+        df_fato.to_sql("fato_atendimento", self.engine, if_exists="append", index=False)
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                _write_rollups(cursor, [rollups])
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+
+        logging.info("Carga de dados para o PostgreSQL concluída com sucesso.")
+
+    def _load_copy(self, df: pd.DataFrame, rollups: Dict[str, pd.DataFrame], schema: Optional[str] = None) -> None:
+        """
+        Recarrega o Data Mart em massa com `COPY FROM STDIN`.
+
+        As chaves substitutas são atribuídas em memória (ver `_star_frames`), o que dispensa
+        a releitura das dimensões e os merges para resolver as chaves estrangeiras da fato.
+        TRUNCATE, cargas (inclusive dos agregados) e ajuste das sequências rodam numa única
+        conexão do pool e numa única transação.
+
+        Args:
+            schema (str, opcional): Schema onde estão as tabelas carregadas. Por padrão,
+                o schema corrente (`public`).
+        """
+        logging.info("Iniciando a carga em massa (COPY) para o PostgreSQL.")
+        frames = _star_frames(df)
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                if schema is not None:
+                    cursor.execute(f"SET LOCAL search_path TO {schema}")
+                logging.info("Limpando tabelas existentes para garantir a idempotência.")
+                cursor.execute(truncate_star_sql())
+
+                for table, id_column in (
+                    ("dim_servico", "id_servico"),
+                    ("dim_grupo_economico", "id_grupo"),
+                    ("dim_tempo", "id_tempo"),
+                    ("dim_metrica", "id_metrica"),
+                ):
+                    frame = frames[table]
+                    _copy_frame(cursor, table, frame)
+                    # As chaves foram atribuídas explicitamente; a sequência precisa acompanhá-las.
+                    cursor.execute(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', '{id_column}'), %s)",
+                        (len(frame),),
+                    )
+                    logging.info(f"Carregados {len(frame)} registros em {table}.")
+
+                for statement in partition_ddl(frames["dim_tempo"]["ano"].unique()):
+                    cursor.execute(statement)
+                df_fato = frames["fato_atendimento"]
+                logging.info(f"Carregando {len(df_fato)} registros na tabela fato_atendimento.")
+                _copy_frame(cursor, "fato_atendimento", df_fato)
+                _write_rollups(cursor, [rollups])
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+
+        logging.info("Carga de dados para o PostgreSQL concluída com sucesso.")
+
+    def _load_swap(self, df: pd.DataFrame, rollups: Dict[str, pd.DataFrame], materialized_views: bool) -> None:
+        """
+        Recarrega o Data Mart sem deixá-lo vazio ou incompleto em nenhum momento.
+
+        O novo modelo estrela é montado no schema de staging (tabelas, partições, índices,
+        dados via `COPY` e views analíticas), sem bloquear o schema `public`. As contagens
+        são validadas contra o DataFrame carregado e, só então, as tabelas e views são
+        trocadas numa única transação (ver `database.swap_schema`). Se algo falhar antes
+        da troca, o staging é descartado e os dados publicados continuam intactos.
+        """
+        logging.info(f"Iniciando a carga com troca atômica via schema '{STAGING_SCHEMA}'.")
+        anos = set(ANOS) | set(df["data_referencia"].dt.year.unique())
+        try:
+            create_staging_schema(self.engine, STAGING_SCHEMA, sorted(anos))
+            self._load_copy(df, rollups, schema=STAGING_SCHEMA)
+            with self.engine.begin() as connection:
+                connection.execute(text(f"SET LOCAL search_path TO {STAGING_SCHEMA}"))
+                create_views(connection, materialized_views)
+                _validate_staging(connection, df)
+                connection.execute(text(f"ANALYZE {', '.join(MART_TABLES)}"))
+            swap_schema(self.engine, STAGING_SCHEMA)
+        except Exception:
+            drop_schema(self.engine, STAGING_SCHEMA)
+            raise
+        logging.info("Carga com troca atômica concluída com sucesso.")
+
+    @staticmethod
+    def _upsert_dimension(conn, table, natural_key: str, surrogate_key: str, rows: List[dict]) -> Dict:
+        """
+        Insere na dimensão os membros ainda inexistentes (ON CONFLICT DO NOTHING na coluna
+        única) e retorna o mapa chave natural -> chave substituta de todos os membros pedidos.
+        """
+        if rows:
+            conn.execute(pg_insert(table).on_conflict_do_nothing(index_elements=[natural_key]), rows)
+        keys = [row[natural_key] for row in rows]
+        result = conn.execute(
+            select(table.c[natural_key], table.c[surrogate_key]).where(table.c[natural_key].in_(keys))
+        )
+        return dict(result.all())
+
+    def _load_upsert(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Carrega o DataFrame de forma incremental, sem truncar as tabelas.
+
+        As dimensões recebem apenas os membros novos e a fato é mesclada com
+        `INSERT ... ON CONFLICT` na constraint `uq_atendimento_contexto`, atualizando
+        somente as linhas cujo `valor` mudou (ver `_upsert_frame`). Tudo roda numa única
+        transação, então o Data Mart nunca fica vazio durante a carga. Em seguida os
+        agregados são recalculados a partir da fato mesclada, serviço a serviço.
+
+        Returns:
+            Dict[str, int]: Contagens de registros da fato inseridos, atualizados e inalterados.
+        """
+        logging.info("Iniciando a carga incremental (upsert) para o PostgreSQL.")
+        with self.engine.begin() as conn:
+            stats = self._upsert_frame(conn, df)
+            # A fato mesclada pode ter mais registros que o DataFrame carregado: os
+            # agregados são recalculados a partir do banco, na mesma transação.
+            with conn.connection.cursor() as cursor:
+                _write_rollups(cursor, _rollups_from_database(cursor))
+
+        logging.info(
+            f"Carga incremental concluída: {stats['inseridos']} inseridos, "
+            f"{stats['atualizados']} atualizados, {stats['inalterados']} inalterados."
+        )
+        return stats
+
+    def _upsert_frame(self, conn, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Mescla um DataFrame no formato de `final_df` no modelo estrela, na transação de
+        `conn`: insere os membros de dimensão novos e faz o `INSERT ... ON CONFLICT` da fato.
+
+        Returns:
+            Dict[str, int]: Contagens de registros da fato inseridos, atualizados e inalterados.
+        """
+        fact_keys = ["data_referencia", "servico", "grupo_economico", "metrica"]
+        if df.duplicated(subset=fact_keys).any():
+            logging.warning("Registros duplicados para o mesmo contexto encontrados; mantendo o último.")
+            df = df.drop_duplicates(subset=fact_keys, keep="last")
+
+        datas = pd.to_datetime(pd.Series(df["data_referencia"].unique()))
+        servico_ids = self._upsert_dimension(
+            conn, DimServico.__table__, "nome_servico", "id_servico",
+            [{"nome_servico": nome} for nome in df["servico"].unique()],
+        )
+        grupo_ids = self._upsert_dimension(
+            conn, DimGrupoEconomico.__table__, "nome_grupo", "id_grupo",
+            [{"nome_grupo": nome} for nome in df["grupo_economico"].unique()],
+        )
+        metrica_ids = self._upsert_dimension(
+            conn, DimMetrica.__table__, "nome_metrica", "id_metrica",
+            [{"nome_metrica": nome} for nome in df["metrica"].unique()],
+        )
+        tempo_ids = self._upsert_dimension(
+            conn, DimTempo.__table__, "data_referencia", "id_tempo",
+            [
+                {"data_referencia": data.date(), "ano": data.year, "mes": data.month}
+                for data in datas
+            ],
+        )
+
+        df_fato = pd.DataFrame({
+            "tempo_id": df["data_referencia"].dt.date.map(tempo_ids),
+            "servico_id": df["servico"].map(servico_ids),
+            "grupo_economico_id": df["grupo_economico"].map(grupo_ids),
+            "metrica_id": df["metrica"].map(metrica_ids),
+            "data_referencia": df["data_referencia"].dt.date,
+            "valor": df["valor"],
+        })
+
+        fato = FatoAtendimento.__table__
+        stmt = pg_insert(fato)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_atendimento_contexto",
+            set_={"valor": stmt.excluded.valor},
+            where=fato.c.valor.is_distinct_from(stmt.excluded.valor),
+        ).returning(fato.c.id)
+
+        ensure_partitions(conn, datas.dt.year.unique())
+        # Tabelas particionadas não expõem `xmax` no RETURNING; linhas inseridas são
+        # reconhecidas por receberem um id maior que o maior id anterior à carga.
+        maior_id = conn.execute(select(func.coalesce(func.max(fato.c.id), 0))).scalar()
+        logging.info(f"Mesclando {len(df_fato)} registros na tabela fato_atendimento.")
+        result = conn.execute(stmt, df_fato.to_dict("records"))
+        inseridos = atualizados = 0
+        for (id_fato,) in result:
+            if id_fato > maior_id:
+                inseridos += 1
+            else:
+                atualizados += 1
+
+        return {
+            "inseridos": inseridos,
+            "atualizados": atualizados,
+            "inalterados": len(df_fato) - inseridos - atualizados,
+        }
+
+    def load_streaming(
+        self, chunks: Iterable[pd.DataFrame], load_mode: str = "replace", materialized_views: bool = False
+    ) -> int:
+        """
+        Carrega o Data Mart a partir de um fluxo de blocos de `final_df`, com memória
+        limitada ao tamanho de cada bloco, de acordo com o modo de carga:
+
+        - "replace" / "copy": trunca as tabelas e grava cada bloco via `COPY`, numa única
+          conexão e transação (ver `_copy_streaming`).
+        - "upsert": mescla cada bloco nas tabelas existentes (ver `_upsert_frame`), numa
+          única transação, sem apagar os registros ausentes do fluxo.
+        - "swap": grava os blocos via `COPY` no schema de staging e o publica com uma troca
+          atômica, sem bloquear o schema `public` durante a carga.
+
+        Ao final, os agregados são calculados a partir da fato carregada, serviço a serviço.
+
+        Returns:
+            int: O número de registros do fluxo carregados na tabela fato (no modo
+            "upsert", apenas os inseridos ou atualizados).
+        """
+        self._check_load_mode(load_mode)
+        if load_mode == "upsert":
+            total = self._upsert_streaming(chunks)
+        elif load_mode == "swap":
+            total = self._swap_streaming(chunks, materialized_views)
+        else:
+            logging.info("Iniciando a carga em streaming para o PostgreSQL.")
+            total = self._copy_streaming(chunks)
+        logging.info(f"Carga em streaming concluída: {total} registros na tabela fato_atendimento.")
+
+        if total and load_mode != "swap":
+            self.refresh_views()
+        self._bump_data_version()
+        return total
+
+    def _copy_streaming(self, chunks: Iterable[pd.DataFrame], schema: Optional[str] = None) -> int:
+        """
+        Recarrega o modelo estrela a partir do fluxo de blocos, numa única conexão e
+        transação: trunca as tabelas, e para cada bloco grava via `COPY` apenas os membros
+        de dimensão ainda não vistos (as chaves são atribuídas em memória e mantidas em
+        cache entre os blocos) e em seguida os registros da fato.
+
+        Args:
+            schema (str, opcional): Schema onde estão as tabelas carregadas. Por padrão,
+                o schema corrente (`public`).
+
+        Returns:
+            int: O número de registros carregados na tabela fato.
+        """
+        chaves: Dict[str, Dict] = {}
+        anos: set = set()
+        total = 0
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                if schema is not None:
+                    cursor.execute(f"SET LOCAL search_path TO {schema}")
+                logging.info("Limpando tabelas existentes para garantir a idempotência.")
+                cursor.execute(truncate_star_sql())
+
+                for table, frame in _iter_star_frames(chunks, chaves):
+                    if table == "dim_tempo":
+                        novos_anos = set(frame["ano"]) - anos
+                        for statement in partition_ddl(novos_anos):
+                            cursor.execute(statement)
+                        anos |= novos_anos
+                    _copy_frame(cursor, table, frame)
+                    if table == "fato_atendimento":
+                        total += len(frame)
+                        logging.info(f"Bloco de {len(frame)} registros carregado ({total} no total).")
+
+                for table, _, id_column, _ in _DIMENSOES:
+                    cache = chaves.get(table)
+                    if cache:
+                        cursor.execute(
+                            f"SELECT setval(pg_get_serial_sequence('{table}', '{id_column}'), %s)",
+                            (len(cache),),
+                        )
+                _write_rollups(cursor, _rollups_from_database(cursor))
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        return total
+
+    def _upsert_streaming(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Mescla cada bloco do fluxo no modelo estrela, numa única transação, e recalcula os
+        agregados a partir da fato mesclada.
+
+        Returns:
+            int: O número de registros da fato inseridos ou atualizados (os inalterados
+            não contam como carregados).
+        """
+        logging.info("Iniciando a carga incremental (upsert) em streaming para o PostgreSQL.")
+        stats: Counter = Counter()
+        with self.engine.begin() as conn:
+            for chunk in chunks:
+                # Os blocos chegam com colunas categóricas; o upsert trabalha com os valores.
+                stats.update(self._upsert_frame(conn, chunk.astype({
+                    "servico": str, "grupo_economico": str, "metrica": str,
+                })))
+            with conn.connection.cursor() as cursor:
+                _write_rollups(cursor, _rollups_from_database(cursor))
+        logging.info(
+            f"Carga incremental concluída: {stats['inseridos']} inseridos, "
+            f"{stats['atualizados']} atualizados, {stats['inalterados']} inalterados."
+        )
+        return stats["inseridos"] + stats["atualizados"]
+
+    def _swap_streaming(self, chunks: Iterable[pd.DataFrame], materialized_views: bool) -> int:
+        """
+        Equivalente de `_load_swap` para o fluxo de blocos: a carga via `COPY` roda no
+        schema de staging, validado (a fato deve ter todos os registros do fluxo) e então
+        publicado com `database.swap_schema`. Se algo falhar antes da troca, o staging é
+        descartado e os dados publicados continuam intactos.
+
+        Returns:
+            int: O número de registros carregados na tabela fato.
+        """
+        logging.info(f"Iniciando a carga em streaming com troca atômica via schema '{STAGING_SCHEMA}'.")
+        try:
+            create_staging_schema(self.engine, STAGING_SCHEMA, ANOS)
+            total = self._copy_streaming(chunks, schema=STAGING_SCHEMA)
+            with self.engine.begin() as connection:
+                connection.execute(text(f"SET LOCAL search_path TO {STAGING_SCHEMA}"))
+                create_views(connection, materialized_views)
+                obtido = connection.execute(text("SELECT count(*) FROM fato_atendimento")).scalar()
+                if obtido != total:
+                    raise ValueError(f"Validação do staging falhou: fato_atendimento tem {obtido} registros, esperado {total}.")
+                connection.execute(text(f"ANALYZE {', '.join(MART_TABLES)}"))
+            swap_schema(self.engine, STAGING_SCHEMA)
+        except Exception:
+            drop_schema(self.engine, STAGING_SCHEMA)
+            raise
+        return total
+
+    def detach_year(self, ano: int, concurrently: bool = False) -> None:
+        """
+        Desanexa a partição de um ano da tabela fato (ver `models.detach_partition`), que
+        continua no banco como tabela comum. Os agregados são recalculados sem o ano, as
+        views materializadas (se houver) são atualizadas e a versão dos dados é incrementada.
+
+        Args:
+            ano (int): O ano da partição.
+            concurrently (bool): Se True, usa `DETACH ... CONCURRENTLY`, que não bloqueia
+                as leituras da tabela fato e roda fora de uma transação.
+        """
+        if concurrently:
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                detach_partition(connection, ano, concurrently=True)
+        else:
+            with self.engine.begin() as connection:
+                detach_partition(connection, ano)
+        logging.info(f"Partição do ano {ano} desanexada da tabela fato.")
+        self._rebuild_rollups()
+
+    def attach_year(self, ano: int) -> None:
+        """
+        Anexa de volta à tabela fato a partição de um ano desanexada por `detach_year` e
+        recalcula os agregados, as views materializadas e a versão dos dados.
+        """
+        with self.engine.begin() as connection:
+            attach_partition(connection, ano)
+        logging.info(f"Partição do ano {ano} anexada à tabela fato.")
+        self._rebuild_rollups()
+
+    def _rebuild_rollups(self) -> None:
+        """
+        Recalcula os agregados a partir da tabela fato, atualiza as views materializadas e
+        publica uma nova versão dos dados.
+        """
+        with self.engine.begin() as connection:
+            with connection.connection.cursor() as cursor:
+                _write_rollups(cursor, _rollups_from_database(cursor))
+        self.refresh_views()
+        self._bump_data_version()
+
+    def refresh_views(self) -> None:
+        """
+        Atualiza as views analíticas materializadas sem bloquear as consultas em
+        andamento (ver `database.refresh_views`).
+        """
+        refresh_views(self.engine)
+
+    def data_version(self) -> str:
+        """
+        Retorna a versão da tabela `etl_versao_dados`, incrementada a cada carga.
+        """
+        with self.engine.connect() as connection:
+            return str(data_version(connection))
+
+    def read(self, sql: str, params: Dict, versao: str) -> pa.Table:
+        """
+        Executa uma consulta no banco e retorna o resultado como tabela Arrow. O banco só
+        expõe a versão atual dos dados; `versao` serve apenas à chave de quem consulta.
+        """
+        with self.engine.connect() as connection:
+            df = pd.read_sql(text(sql), connection, params=params)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    def record_run(self, run_metrics: RunMetrics) -> None:
+        """
+        Grava as métricas da execução nas tabelas `etl_run` e `etl_stage_metric`.
+        """
+        run_metrics.persist(self.engine)
+
+    def close(self) -> None:
+        """
+        Fecha as conexões do pool.
+        """
+        self.engine.dispose()
+
+
+class ParquetBackend(DataMartBackend):
+    """
+    Data Mart em arquivos Parquet servidos pelo DuckDB (ver `ParquetStore`). Toda carga
+    regrava e publica uma versão completa, então o modo "upsert" não é suportado.
+    """
+
+    nome = "parquet"
+    dialect = "duckdb"
+    modos_carga = MODOS_CARGA_PARQUET
+
+    def __init__(self, directory: Path):
+        """
+        Constrói uma instância do ParquetBackend.
+
+        Args:
+            directory (Path): Diretório raiz do Data Mart em Parquet.
+        """
+        self.store = ParquetStore(directory)
+
+    def setup(self, anos: Iterable[int] = ANOS, materialized_views: bool = False) -> None:
+        """
+        Garante que o diretório raiz exista. As views são criadas a cada conexão.
+        """
+        self.store.setup()
+
+    def load(
+        self,
+        df: pd.DataFrame,
+        rollups: Dict[str, pd.DataFrame],
+        load_mode: str = "replace",
+        materialized_views: bool = False,
+    ) -> Optional[Dict[str, int]]:
+        """
+        Grava o DataFrame transformado e os agregados como uma nova versão do Data Mart em
+        Parquet e a publica (ver `ParquetStore.writer`). As chaves substitutas são
+        atribuídas em memória, como na carga via `COPY`.
+        """
+        self._check_load_mode(load_mode)
+        logging.info(f"Iniciando a carga para o Data Mart em Parquet em '{self.store.root}'.")
+        with self.store.writer() as writer:
+            for table, frame in _star_frames(df).items():
+                writer.append(table, frame)
+            for table, frame in rollups.items():
+                writer.append(table, frame)
+        logging.info("Carga para o Data Mart em Parquet concluída com sucesso.")
+        return None
+
+    def load_streaming(
+        self, chunks: Iterable[pd.DataFrame], load_mode: str = "replace", materialized_views: bool = False
+    ) -> int:
+        """
+        Cada bloco vira novos arquivos da nova versão, e os agregados são calculados ao
+        final, serviço a serviço, a partir da fato gravada. A versão só é publicada se
+        tudo der certo, então todos os modos suportados equivalem a uma troca atômica.
+        """
+        self._check_load_mode(load_mode)
+        logging.info(f"Iniciando a carga em streaming para o Data Mart em Parquet em '{self.store.root}'.")
+        with self.store.writer() as writer:
+            for table, frame in _iter_star_frames(chunks, {}):
+                writer.append(table, frame)
+                if table == "fato_atendimento":
+                    logging.info(f"Bloco de {len(frame)} registros carregado ({writer.linhas[table]} no total).")
+            for df in writer.facts_by_service():
+                for table, frame in compute_rollups(df).items():
+                    writer.append(table, frame)
+        total = writer.linhas["fato_atendimento"]
+        logging.info(f"Carga em streaming concluída: {total} registros na tabela fato_atendimento.")
+        return total
+
+    def refresh_views(self) -> None:
+        """
+        As views leem direto os arquivos publicados e não precisam de atualização.
+        """
+
+    def data_version(self) -> str:
+        """
+        Retorna o nome da versão publicada.
+
+        Raises:
+            FileNotFoundError: Se nenhuma carga foi publicada.
+        """
+        directory = self.store.current_version()
+        if directory is None:
+            raise FileNotFoundError(f"Nenhuma carga publicada em '{self.store.root}'. Execute o pipeline antes.")
+        return directory.name
+
+    def read(self, sql: str, params: Dict, versao: str) -> pa.Table:
+        """
+        Executa uma consulta (dialeto do DuckDB) sobre a versão `versao` do Data Mart e
+        retorna o resultado como tabela Arrow.
+        """
+        connection = self.store.connect(self.store.root / versao)
+        try:
+            return connection.execute(sql, params).to_arrow_table()
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        """
+        Fecha as conexões DuckDB abertas pelas consultas.
+        """
+        self.store.close()
+
+
+def open_backend(db_url: str, **engine_kwargs) -> DataMartBackend:
+    """
+    Abre o backend do Data Mart indicado pela URL: `parquet://<diretório>` para o
+    backend Parquet, ou uma URL do PostgreSQL.
+
+    Args:
+        db_url (str): A URL do Data Mart.
+        **engine_kwargs: Opções do `create_engine`, usadas apenas pelo PostgreSQL.
+    """
+    directory = parquet_dir(db_url)
+    if directory is None:
+        return PostgresBackend(db_url, **engine_kwargs)
+    return ParquetBackend(directory)
+
+
+def _validate_staging(connection, df: pd.DataFrame) -> None:
+    """
+    Confere as contagens das tabelas do staging contra o DataFrame carregado.
+    """
+    esperado = {
+        "fato_atendimento": len(df),
+        "dim_tempo": df["data_referencia"].nunique(),
+        "dim_grupo_economico": df["grupo_economico"].nunique(),
+        "dim_servico": df["servico"].nunique(),
+        "dim_metrica": df["metrica"].nunique(),
+        "agg_grupo_mensal": len(df),
+    }
+    for table, count in esperado.items():
+        obtido = connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        if obtido != count:
+            raise ValueError(f"Validação do staging falhou: {table} tem {obtido} registros, esperado {count}.")
+    logging.info(f"Staging validado: {esperado}")
@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+CACHE_DIR = Path("cache") / "ods_parseados"
+
+# Tamanho máximo padrão do cache em disco (512 MiB).
+MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_digest(file_path: Path) -> str:
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo, lendo-o em blocos.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Cache em disco dos DataFrames já lidos e limpos de cada arquivo .ods.
+
+    As entradas são endereçadas pelo conteúdo: a chave é o hash do arquivo mais uma
+    "variante" que identifica o parser (leitor, versão, métricas). Assim, um arquivo
+    alterado ou uma mudança no parser geram automaticamente uma chave nova. Os
+    DataFrames são guardados em Parquet e as entradas menos usadas recentemente são
+    removidas quando o cache passa de `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        """
+        Constrói uma instância do ParseCache.
+
+        Args:
+            cache_dir (Path): Diretório onde as entradas do cache são guardadas.
+            max_bytes (int): Tamanho máximo do cache em disco, em bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, file_path: Path, variant: str) -> str:
+        """
+        Monta a chave de cache de um arquivo: `<hash do conteúdo>-<hash da variante>`.
+        """
+        variant_digest = hashlib.sha256(variant.encode("utf-8")).hexdigest()[:16]
+        return f"{file_digest(file_path)}-{variant_digest}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Retorna o DataFrame guardado para a chave, ou `None` se não houver entrada válida.
+        """
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Entrada de cache corrompida '{path.name}' ({e}). Descartando.")
+            path.unlink(missing_ok=True)
+            return None
+        # Atualiza o mtime para que a remoção por tamanho siga a ordem de uso (LRU).
+        os.utime(path)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Guarda o DataFrame no cache e aplica o limite de tamanho.
+        DataFrames que não podem ser representados em Parquet não são guardados.
+        """
+        storable = to_storable(df)
+        if storable is None:
+            logging.warning(f"DataFrame da chave {key} não pode ser guardado em cache. Ignorando.")
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            storable.to_parquet(tmp_path, index=False)
+            tmp_path.replace(path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logging.warning(f"Falha ao gravar a entrada de cache {key}: {e}")
+            return
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove as entradas menos usadas recentemente até o cache caber em `max_bytes`.
+
+        Returns:
+            int: O número de entradas removidas.
+        """
+        if not self.cache_dir.exists():
+            return 0
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry)
+            for entry in self.cache_dir.glob("*.parquet")
+        )
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            logging.info(f"{removed} entradas removidas do cache de parsing (limite de {self.max_bytes} bytes).")
+        return removed
+
+    def invalidate(self, file_path: Path) -> int:
+        """
+        Remove todas as entradas (de qualquer variante) do conteúdo atual de um arquivo.
+
+        Returns:
+            int: O número de entradas removidas.
+        """
+        removed = 0
+        for entry in self.cache_dir.glob(f"{file_digest(file_path)}-*.parquet"):
+            entry.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """
+        Remove todas as entradas do cache.
+
+        Returns:
+            int: O número de entradas removidas.
+        """
+        removed = 0
+        for entry in self.cache_dir.glob("*.parquet"):
+            entry.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+def to_storable(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Adapta um DataFrame para o Parquet. Colunas `object` com tipos misturados (ex: números e
+    textos como "-") viram texto; as etapas seguintes já convertem os valores com
+    `pd.to_numeric`, então o resultado final não muda. Retorna `None` se os nomes das
+    colunas não forem textos.
+    """
+    if not all(isinstance(col, str) for col in df.columns):
+        return None
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col].dropna()
+            if not values.map(lambda v: isinstance(v, str)).all():
+                df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v)).astype("string")
+    return df
+
+
+def main():
+    """
+    Linha de comando para manutenção do cache de parsing.
+    """
+    parser = argparse.ArgumentParser(description="Manutenção do cache de arquivos .ods parseados.")
+    parser.add_argument("--dir", type=Path, default=Path(os.getenv("ETL_PARSE_CACHE_DIR", CACHE_DIR)))
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--limpar", action="store_true", help="Remove todas as entradas do cache.")
+    group.add_argument("--invalidar", type=Path, nargs="+", metavar="ARQUIVO", help="Remove as entradas dos arquivos informados.")
+    args = parser.parse_args()
+
+    cache = ParseCache(args.dir)
+    if args.limpar:
+        removed = cache.clear()
+    else:
+        removed = sum(cache.invalidate(file_path) for file_path in args.invalidar)
+    logging.info(f"{removed} entradas removidas do cache em '{args.dir}'.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
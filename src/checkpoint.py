@@ -0,0 +1,69 @@
+import logging
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+
+from .cache import to_storable
+from .config import CHECKPOINT_DIR
+
+# Prefixo dos checkpoints de `cleaned_data` (um arquivo por serviço) e nome do de `final_df`.
+CLEANED_PREFIX = "cleaned_"
+FINAL_FILE = "final.parquet"
+
+
+def _write(df: pd.DataFrame, path: Path) -> None:
+    """
+    Grava um DataFrame em Parquet de forma atômica (arquivo temporário + rename).
+    """
+    storable = to_storable(df)
+    if storable is None:
+        raise ValueError(f"O DataFrame do checkpoint '{path.name}' não pode ser gravado em Parquet.")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        storable.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def save_cleaned_data(cleaned_data: Dict[str, pd.DataFrame], directory: Path = CHECKPOINT_DIR) -> None:
+    """
+    Grava o `cleaned_data` da extração, um arquivo Parquet por serviço. Checkpoints de
+    serviços que não estão mais presentes são removidos.
+    """
+    for service, df in cleaned_data.items():
+        _write(df, directory / f"{CLEANED_PREFIX}{service}.parquet")
+    for path in directory.glob(f"{CLEANED_PREFIX}*.parquet"):
+        if path.stem[len(CLEANED_PREFIX):] not in cleaned_data:
+            path.unlink()
+    logging.info(f"Checkpoint da extração gravado em '{directory}' ({len(cleaned_data)} serviços).")
+
+
+def load_cleaned_data(directory: Path = CHECKPOINT_DIR) -> Dict[str, pd.DataFrame]:
+    """
+    Lê o checkpoint de `cleaned_data` gravado por `save_cleaned_data`.
+    """
+    paths = sorted(directory.glob(f"{CLEANED_PREFIX}*.parquet"))
+    if not paths:
+        raise FileNotFoundError(f"Checkpoint da extração não encontrado em '{directory}'. Execute a etapa 'extract' antes.")
+    return {path.stem[len(CLEANED_PREFIX):]: pd.read_parquet(path) for path in paths}
+
+
+def save_final_df(final_df: pd.DataFrame, directory: Path = CHECKPOINT_DIR) -> None:
+    """
+    Grava o `final_df` da transformação.
+    """
+    _write(final_df, directory / FINAL_FILE)
+    logging.info(f"Checkpoint da transformação gravado em '{directory / FINAL_FILE}' ({len(final_df)} registros).")
+
+
+def load_final_df(directory: Path = CHECKPOINT_DIR) -> pd.DataFrame:
+    """
+    Lê o checkpoint de `final_df` gravado por `save_final_df`.
+    """
+    path = directory / FINAL_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"Checkpoint da transformação não encontrado em '{path}'. Execute a etapa 'transform' antes.")
+    return pd.read_parquet(path)
@@ -0,0 +1,246 @@
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Apenas módulos leves são importados aqui: pandas, requests e SQLAlchemy são importados
+# dentro de cada comando, de forma que comandos simples (ex: `refresh-views`) não pagam
+# o custo de carregar o pipeline inteiro.
+from .config import (
+    ANOS,
+    CHECKPOINT_DIR,
+    INPUT_DIR,
+    LEITORES_ODS,
+    MODOS_CARGA,
+    database_url,
+    parquet_dir,
+    source_base_url,
+    source_file_names,
+)
+
+
+def _engine():
+    from sqlalchemy import create_engine
+
+    return create_engine(database_url())
+
+
+def _pipeline(args: argparse.Namespace, **overrides):
+    from .etl import pipeline_from_env
+
+    return pipeline_from_env(
+        use_parse_cache=False if getattr(args, "sem_cache", False) else None,
+        input_dir=args.entrada,
+        base_url=args.base_url,
+        metrics=args.metricas,
+        **overrides,
+    )
+
+
+def cmd_setup_db(args: argparse.Namespace) -> int:
+    directory = parquet_dir(database_url())
+    if directory is not None:
+        # No backend Parquet as tabelas e views são criadas a cada carga publicada.
+        directory.mkdir(parents=True, exist_ok=True)
+        return 0
+
+    from .database import setup_database
+
+    setup_database(_engine(), ANOS, _materialized_views(args))
+    return 0
+
+
+def cmd_download(args: argparse.Namespace) -> int:
+    from collections import Counter
+
+    from .download import FALHOU, SourceDownloader
+
+    downloader = SourceDownloader(
+        args.entrada or INPUT_DIR,
+        base_url=args.base_url or source_base_url(),
+        max_workers=args.workers or int(os.getenv("ETL_DOWNLOAD_WORKERS", "4")),
+    )
+    results = downloader.download_all(source_file_names())
+    contagem = Counter(result.status for result in results)
+    logging.info(f"Downloads finalizados: {dict(contagem)}")
+    return 1 if contagem[FALHOU] else 0
+
+
+def cmd_extract(args: argparse.Namespace) -> int:
+    from .checkpoint import save_cleaned_data
+
+    pipeline = _pipeline(args, ods_reader=args.leitor, parse_workers=args.workers)
+    pipeline.extract_and_clean()
+    if not pipeline.cleaned_data:
+        logging.error("Nenhum dado extraído; o checkpoint não foi gravado.")
+        return 1
+    save_cleaned_data(pipeline.cleaned_data, args.checkpoints)
+    return 0
+
+
+def cmd_transform(args: argparse.Namespace) -> int:
+    from .checkpoint import load_cleaned_data, save_final_df
+
+    pipeline = _pipeline(args)
+    pipeline.cleaned_data = load_cleaned_data(args.checkpoints)
+    pipeline.transform()
+    if pipeline.final_df.empty:
+        logging.error("A transformação não produziu registros; o checkpoint não foi gravado.")
+        return 1
+    save_final_df(pipeline.final_df, args.checkpoints)
+    return 0
+
+
+def cmd_load(args: argparse.Namespace) -> int:
+    from .checkpoint import load_final_df
+
+    pipeline = _pipeline(args, load_mode=args.modo, materialized_views=_materialized_views(args))
+    pipeline.final_df = load_final_df(args.checkpoints)
+    pipeline._setup_database()
+    pipeline.load()
+    return 0
+
+
+def cmd_refresh_views(args: argparse.Namespace) -> int:
+    if parquet_dir(database_url()) is not None:
+        logging.info("Backend Parquet: as views leem direto os arquivos publicados; nada a atualizar.")
+        return 0
+
+    from .database import refresh_views
+
+    refresh_views(_engine())
+    return 0
+
+
+def cmd_particao(args: argparse.Namespace) -> int:
+    if parquet_dir(database_url()) is not None:
+        logging.error("O backend Parquet não tem partições.")
+        return 1
+
+    from .backends import PostgresBackend
+
+    backend = PostgresBackend(database_url())
+    try:
+        if args.desanexar is not None:
+            backend.detach_year(args.desanexar, concurrently=args.concorrente)
+        else:
+            backend.attach_year(args.anexar)
+    finally:
+        backend.close()
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    from .metrics import SUCESSO
+
+    pipeline = _pipeline(
+        args,
+        ods_reader=args.leitor,
+        parse_workers=args.workers,
+        load_mode=args.modo,
+        materialized_views=_materialized_views(args),
+        pipelined=True if args.pipelined else None,
+    )
+    streaming = args.streaming or os.getenv("ETL_STREAMING", "0") == "1"
+    run_metrics = pipeline.run_streaming() if streaming else pipeline.run()
+    return 0 if run_metrics.status == SUCESSO else 1
+
+
+def _materialized_views(args: argparse.Namespace) -> bool:
+    # Sem a flag, vale a variável de ambiente ETL_MATERIALIZED_VIEWS.
+    if args.materializadas:
+        return True
+    return os.getenv("ETL_MATERIALIZED_VIEWS", "0") == "1"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Monta o parser da linha de comando, com um subcomando por etapa do pipeline.
+    As opções omitidas usam as mesmas variáveis de ambiente de `python -m src.etl`.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Pipeline de ETL dos dados de IDA da Anatel, por etapas.",
+    )
+    parser.add_argument("--entrada", type=Path, help=f"Diretório dos arquivos .ods (padrão: {INPUT_DIR}).")
+    parser.add_argument(
+        "--base-url", help="URL base de onde os arquivos .ods são baixados (padrão: ETL_BASE_URL, ou o portal da Anatel)."
+    )
+    parser.add_argument(
+        "--checkpoints", type=Path, default=Path(os.getenv("ETL_CHECKPOINT_DIR", CHECKPOINT_DIR)),
+        help="Diretório dos checkpoints intermediários em Parquet.",
+    )
+    parser.add_argument(
+        "--metrica", dest="metricas", action="append",
+        help="Métrica (valor de VARIÁVEL) carregada; pode ser repetida. Padrão: ETL_METRICAS.",
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True, metavar="COMANDO")
+
+    def add(name: str, func, help: str) -> argparse.ArgumentParser:
+        sub = subparsers.add_parser(name, help=help, description=help)
+        sub.set_defaults(func=func)
+        return sub
+
+    def add_views_flag(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--materializadas", action="store_true", help="Usa views materializadas.")
+
+    def add_extract_flags(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--leitor", choices=LEITORES_ODS, help="Leitor de .ods (padrão: ETL_ODS_READER).")
+        sub.add_argument("--workers", type=int, help="Processos de leitura (padrão: ETL_PARSE_WORKERS).")
+        sub.add_argument("--sem-cache", action="store_true", help="Ignora o cache de parsing.")
+
+    add_views_flag(add("setup-db", cmd_setup_db, "Cria ou atualiza as tabelas, partições e views."))
+
+    sub = add("download", cmd_download, "Baixa os arquivos .ods do portal da Anatel.")
+    sub.add_argument("--workers", type=int, help="Downloads simultâneos (padrão: ETL_DOWNLOAD_WORKERS).")
+
+    add_extract_flags(add("extract", cmd_extract, "Lê e limpa os arquivos .ods e grava o checkpoint da extração."))
+
+    add("transform", cmd_transform, "Transforma o checkpoint da extração e grava o checkpoint da transformação.")
+
+    sub = add("load", cmd_load, "Carrega o checkpoint da transformação no Data Mart.")
+    sub.add_argument("--modo", choices=MODOS_CARGA, help="Modo de carga (padrão: ETL_LOAD_MODE).")
+    add_views_flag(sub)
+
+    add("refresh-views", cmd_refresh_views, "Atualiza as views materializadas.")
+
+    sub = add("particao", cmd_particao, "Desanexa ou anexa de volta a partição de um ano da tabela fato.")
+    acao = sub.add_mutually_exclusive_group(required=True)
+    acao.add_argument("--desanexar", type=int, metavar="ANO", help="Desanexa a partição do ano (ex: para arquivá-la).")
+    acao.add_argument("--anexar", type=int, metavar="ANO", help="Anexa de volta a partição desanexada do ano.")
+    sub.add_argument(
+        "--concorrente", action="store_true", help="Desanexa com DETACH ... CONCURRENTLY, sem bloquear as leituras."
+    )
+
+    sub = add("run", cmd_run, "Executa o pipeline completo, sem checkpoints.")
+    add_extract_flags(sub)
+    sub.add_argument("--modo", choices=MODOS_CARGA, help="Modo de carga (padrão: ETL_LOAD_MODE).")
+    sub.add_argument("--streaming", action="store_true", help="Executa em modo streaming (baixa memória).")
+    sub.add_argument(
+        "--pipelined", action="store_true", help="Sobrepõe downloads e leitura dos arquivos (padrão: ETL_PIPELINED)."
+    )
+    add_views_flag(sub)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Ponto de entrada da linha de comando.
+
+    Returns:
+        int: O código de saída (0 em caso de sucesso).
+    """
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        return args.func(args)
+    except Exception as e:
+        logging.error(f"Falha no comando '{args.comando}': {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+from typing import List, Optional
+
+# Configurações compartilhadas pelo pipeline e pela linha de comando. Este módulo não
+# importa nenhuma biblioteca pesada, para que comandos simples iniciem rapidamente.
+
+# --- Configurações ---
+INPUT_DIR = Path("dados_brutos")
+
+# Endereço do portal de dados abertos da Anatel de onde os arquivos .ods são baixados.
+BASE_URL = "https://www.anatel.gov.br/dadosabertos/PDA/IDA/"
+
+ANOS = range(2013, 2020)  # Gera anos de 2013 a 2019
+SERVICOS = ["SMP", "STFC", "SCM"]
+
+METRICA_ALVO = "Taxa de Respondidas em 5 dias Úteis"
+
+# Métricas (valores da coluna VARIÁVEL) carregadas por padrão no Data Mart.
+METRICAS_ALVO = (METRICA_ALVO,)
+
+# Leitores de .ods disponíveis: o `odf` do pandas (lê a planilha inteira) ou o
+# leitor em streaming, que só materializa as linhas das métricas de interesse.
+LEITORES_ODS = ("odf", "stream")
+
+# Modos de carga: "replace" trunca e recarrega tudo; "upsert" grava apenas as diferenças;
+# "copy" recarrega tudo em massa com COPY; "swap" recarrega tudo num schema de staging e
+# o publica atomicamente, sem janela com o Data Mart vazio.
+MODOS_CARGA = ("replace", "upsert", "copy", "swap")
+
+# Modos de carga do backend Parquet, em que toda carga publica uma versão completa.
+MODOS_CARGA_PARQUET = tuple(modo for modo in MODOS_CARGA if modo != "upsert")
+
+# Schema onde a carga "swap" monta o novo modelo estrela antes da troca.
+STAGING_SCHEMA = "etl_staging"
+
+# Prefixo das URLs do backend Parquet: `parquet://<diretório>` grava o Data Mart em arquivos
+# Parquet servidos pelo DuckDB, em vez de um banco PostgreSQL.
+PARQUET_SCHEME = "parquet://"
+
+# Diretório padrão do Data Mart em Parquet, usado pela consulta em linha de comando.
+PARQUET_DIR = Path("dados_parquet")
+
+# Diretório dos checkpoints intermediários (`cleaned_data` e `final_df`) da linha de comando.
+CHECKPOINT_DIR = Path("checkpoints")
+
+
+def source_file_names() -> List[str]:
+    """
+    Nomes dos arquivos .ods publicados pela Anatel para os serviços e anos configurados.
+    """
+    return [f"{servico}{ano}.ods" for servico in SERVICOS for ano in ANOS]
+
+
+def source_base_url() -> str:
+    """
+    URL base de onde os arquivos .ods são baixados: `ETL_BASE_URL`, se definida (ex: um
+    espelho do portal), ou o portal da Anatel.
+    """
+    return os.getenv("ETL_BASE_URL") or BASE_URL
+
+
+def database_url() -> str:
+    """
+    Monta a URL de conexão do PostgreSQL a partir das variáveis de ambiente `POSTGRES_*`.
+    Se `ETL_DATABASE_URL` estiver definida (ex: `parquet://dados_parquet`), ela é usada
+    no lugar.
+    """
+    url = os.getenv("ETL_DATABASE_URL")
+    if url:
+        return url
+    db_user = os.getenv("POSTGRES_USER", "default_user")
+    db_password = os.getenv("POSTGRES_PASSWORD", "default_password")
+    db_host = os.getenv("POSTGRES_HOST", "localhost")
+    db_port = os.getenv("POSTGRES_PORT", "5432")
+    db_name = os.getenv("POSTGRES_DB", "default_db")
+    return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+def parquet_dir(url: str) -> Optional[Path]:
+    """
+    Retorna o diretório de uma URL do backend Parquet, ou None se a URL for de outro banco.
+    """
+    if not url.startswith(PARQUET_SCHEME):
+        return None
+    return Path(url[len(PARQUET_SCHEME):])
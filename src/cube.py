@@ -0,0 +1,214 @@
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .config import METRICA_ALVO
+from .rollups import COLUNAS_FATO
+
+
+def _anterior(valores: np.ndarray) -> np.ndarray:
+    """
+    Retorna, para cada posição do eixo 0 (meses), o último valor presente antes dela na
+    mesma série, ignorando os NaN. Equivale ao `LAG` do SQL sobre as linhas existentes.
+    """
+    if len(valores) == 0:
+        # Sem meses não há anterior; o mesmo formato vazio é devolvido.
+        return np.full_like(valores, np.nan)
+    posicoes = np.arange(len(valores)).reshape((-1,) + (1,) * (valores.ndim - 1))
+    ultimo = np.maximum.accumulate(np.where(np.isnan(valores), -1, posicoes), axis=0)
+    # O anterior de um mês é o último valor presente até o mês que o antecede.
+    ultimo = np.concatenate([np.full((1,) + valores.shape[1:], -1, dtype=ultimo.dtype), ultimo[:-1]])
+    anterior = np.take_along_axis(valores, np.maximum(ultimo, 0), axis=0)
+    return np.where(ultimo >= 0, anterior, np.nan)
+
+
+def _variacao(atual: np.ndarray, anterior: np.ndarray) -> np.ndarray:
+    # Assim como `NULLIF(anterior, 0)` no SQL, uma base zero não gera variação.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(anterior != 0, (atual - anterior) / anterior, np.nan)
+
+
+class IdaCube:
+    """
+    Cubo em memória com os valores de uma métrica do IDA, num array denso
+    (mês × serviço × grupo econômico) com NaN onde não há valor.
+
+    As análises das views (variação mês a mês, média e variação do mercado, diferença
+    para o mercado e ranking) são calculadas com operações vetorizadas do NumPy sobre o
+    cubo inteiro, com a mesma semântica de `rollups.compute_rollups`: as variações usam o
+    mês anterior disponível da série e a média do mercado considera os grupos presentes
+    no mês. O mercado e o ranking são sempre os dos grupos do cubo, então um cubo
+    recortado com `select` simula cenários (ex: o mercado sem um operador).
+    """
+
+    def __init__(
+        self,
+        valores: np.ndarray,
+        meses: pd.DatetimeIndex,
+        servicos: Sequence[str],
+        grupos: Sequence[str],
+        metrica: str = METRICA_ALVO,
+    ):
+        """
+        Constrói uma instância do IdaCube.
+
+        Args:
+            valores (np.ndarray): Array `float64` de forma (meses, serviços, grupos).
+            meses (pd.DatetimeIndex): Os meses do eixo 0, em ordem crescente.
+            servicos (Sequence[str]): Os serviços do eixo 1.
+            grupos (Sequence[str]): Os grupos econômicos do eixo 2.
+            metrica (str): A métrica (valor de `VARIÁVEL`) representada no cubo.
+        """
+        self.valores = np.asarray(valores, dtype=np.float64)
+        self.meses = pd.DatetimeIndex(meses)
+        self.servicos = pd.Index(servicos)
+        self.grupos = pd.Index(grupos)
+        self.metrica = metrica
+        esperado = (len(self.meses), len(self.servicos), len(self.grupos))
+        if self.valores.shape != esperado:
+            raise ValueError(f"Forma do cubo {self.valores.shape} não corresponde aos eixos {esperado}.")
+
+    @classmethod
+    def from_final_df(cls, df: pd.DataFrame, metrica: str = METRICA_ALVO) -> "IdaCube":
+        """
+        Monta o cubo de uma métrica a partir de um DataFrame no formato de
+        `EtlPipeline.final_df`. Os valores são arredondados como na coluna `valor`
+        (NUMERIC(18, 4)) da tabela fato.
+
+        Raises:
+            ValueError: Se houver mais de um valor para o mesmo mês, serviço e grupo.
+        """
+        df = df.loc[df["metrica"].astype(str) == metrica, COLUNAS_FATO]
+        if df.duplicated(["data_referencia", "servico", "grupo_economico"]).any():
+            raise ValueError(f"O DataFrame tem valores duplicados por mês, serviço e grupo para '{metrica}'.")
+
+        i, meses = pd.factorize(df["data_referencia"], sort=True)
+        j, servicos = pd.factorize(df["servico"].astype(str), sort=True)
+        k, grupos = pd.factorize(df["grupo_economico"].astype(str), sort=True)
+        valores = np.full((len(meses), len(servicos), len(grupos)), np.nan)
+        valores[i, j, k] = df["valor"].to_numpy(dtype=np.float64).round(4)
+        return cls(valores, meses, servicos, grupos, metrica)
+
+    def select(
+        self,
+        servicos: Optional[Iterable[str]] = None,
+        grupos: Optional[Iterable[str]] = None,
+        inicio: Optional[str] = None,
+        fim: Optional[str] = None,
+    ) -> "IdaCube":
+        """
+        Recorta o cubo por serviços, grupos e período (meses `inicio` a `fim`, inclusive,
+        ex: "2015-01"). O mercado e o ranking do novo cubo consideram apenas os grupos
+        selecionados; o primeiro mês do período não tem variação, pois o histórico
+        anterior fica de fora.
+
+        Raises:
+            ValueError: Se algum serviço ou grupo não existir no cubo.
+        """
+        def indices(eixo: pd.Index, nomes: Optional[Iterable[str]], descricao: str) -> np.ndarray:
+            if nomes is None:
+                return np.arange(len(eixo))
+            nomes = list(nomes)
+            posicoes = eixo.get_indexer(nomes)
+            ausentes = [nome for nome, posicao in zip(nomes, posicoes) if posicao < 0]
+            if ausentes:
+                raise ValueError(f"{descricao} inexistentes no cubo: {ausentes}. Opções: {list(eixo)}")
+            return posicoes
+
+        meses = np.ones(len(self.meses), dtype=bool)
+        if inicio is not None:
+            meses &= self.meses >= pd.Timestamp(inicio)
+        if fim is not None:
+            meses &= self.meses <= pd.Timestamp(fim)
+        j = indices(self.servicos, servicos, "Serviços")
+        k = indices(self.grupos, grupos, "Grupos")
+        valores = self.valores[meses][:, j][:, :, k]
+        return IdaCube(valores, self.meses[meses], self.servicos[j], self.grupos[k], self.metrica)
+
+    def valor_anterior(self) -> np.ndarray:
+        """
+        Valor do mês anterior disponível de cada grupo, (meses × serviços × grupos).
+        """
+        return _anterior(self.valores)
+
+    def variacao_mensal(self) -> np.ndarray:
+        """
+        Variação de cada grupo em relação ao seu mês anterior disponível,
+        (meses × serviços × grupos).
+        """
+        return _variacao(self.valores, self.valor_anterior())
+
+    def grupos_presentes(self) -> np.ndarray:
+        """
+        Número de grupos com valor em cada mês e serviço, (meses × serviços).
+        """
+        return (~np.isnan(self.valores)).sum(axis=2)
+
+    def media_mercado(self) -> np.ndarray:
+        """
+        Média do mercado (grupos com valor) em cada mês e serviço, (meses × serviços).
+        """
+        quantidade = self.grupos_presentes()
+        soma = np.nansum(self.valores, axis=2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(quantidade > 0, soma / quantidade, np.nan)
+
+    def variacao_media_mercado(self) -> np.ndarray:
+        """
+        Variação da média do mercado em relação ao mês anterior disponível do mesmo
+        serviço, (meses × serviços).
+        """
+        media = self.media_mercado()
+        return _variacao(media, _anterior(media))
+
+    def variacao_relativa_mercado(self) -> np.ndarray:
+        """
+        Diferença entre a variação de cada grupo e a variação do mercado,
+        (meses × serviços × grupos).
+        """
+        return self.variacao_mensal() - self.variacao_media_mercado()[:, :, np.newaxis]
+
+    def ranking(self) -> np.ndarray:
+        """
+        Posição de cada grupo no mês e serviço, do maior para o menor valor, como o
+        `RANK()` do SQL (empates dividem a menor posição). NaN onde não há valor.
+        """
+        maiores = (self.valores[:, :, np.newaxis, :] > self.valores[:, :, :, np.newaxis]).sum(axis=3)
+        return np.where(np.isnan(self.valores), np.nan, maiores + 1)
+
+    def _meses_formatados(self) -> np.ndarray:
+        return self.meses.strftime("%Y-%m").to_numpy()
+
+    def performance_relativa(self) -> pd.DataFrame:
+        """
+        Tabela equivalente à `vw_performance_relativa_mercado`, com uma coluna por grupo
+        do cubo (em vez dos operadores fixos da view), em pontos percentuais.
+        """
+        relativa = self.variacao_relativa_mercado() * 100
+        mes, servico = np.nonzero(~np.isnan(relativa).all(axis=2))
+        frame = pd.DataFrame({
+            "Mes": self._meses_formatados()[mes],
+            "Serviço": self.servicos.to_numpy()[servico],
+            "Taxa de Variação Média": self.variacao_media_mercado()[mes, servico] * 100,
+        })
+        for k, grupo in enumerate(self.grupos):
+            frame[grupo] = relativa[mes, servico, k]
+        return frame
+
+    def ranking_desempenho(self) -> pd.DataFrame:
+        """
+        Tabela equivalente à `vw_ranking_desempenho_absoluto` para a métrica do cubo.
+        """
+        mes, servico, grupo = np.nonzero(~np.isnan(self.valores))
+        frame = pd.DataFrame({
+            "Mes": self._meses_formatados()[mes],
+            "Métrica": self.metrica,
+            "Serviço": self.servicos.to_numpy()[servico],
+            "Grupo Econômico": self.grupos.to_numpy()[grupo],
+            "Valor do Indicador": self.valores[mes, servico, grupo],
+            "Ranking": self.ranking()[mes, servico, grupo].astype("int64"),
+        })
+        return frame.sort_values(
+            ["Mes", "Serviço", "Ranking", "Grupo Econômico"], kind="mergesort", ignore_index=True
+        )
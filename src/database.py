@@ -0,0 +1,332 @@
+import hashlib
+import logging
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from .config import METRICA_ALVO
+from .models import Base, DimMetrica, FatoAtendimento, ensure_partitions
+from .views import ANALYTIC_VIEWS, materialized_view_ddl, view_ddl
+
+# Tabelas do modelo estrela.
+STAR_TABLES = ("dim_tempo", "dim_grupo_economico", "dim_servico", "dim_metrica", "fato_atendimento")
+
+# Tabelas de agregados pré-calculados pelo pipeline, lidas pelas views analíticas.
+ROLLUP_TABLES = ("agg_mercado_mensal", "agg_grupo_mensal", "agg_grupo_anual")
+
+# Tabelas do Data Mart, recriadas a cada carga com troca de schema.
+MART_TABLES = STAR_TABLES + ROLLUP_TABLES
+
+# Palavra-chave do ALTER ... SET SCHEMA para cada tipo de relação (pg_class.relkind).
+_ALTER_KEYWORD = {"r": "TABLE", "p": "TABLE", "v": "VIEW", "m": "MATERIALIZED VIEW"}
+
+# Códigos de erro do PostgreSQL que tornam a troca de schema passível de nova tentativa.
+_LOCK_NOT_AVAILABLE = "55P03"
+_DEADLOCK_DETECTED = "40P01"
+
+# DDL das views analíticas comuns, por nome.
+VIEW_SQL = {name: view_ddl(name) for name in ANALYTIC_VIEWS}
+
+
+def truncate_star_sql() -> str:
+    """
+    Comando que esvazia as tabelas do modelo estrela e reinicia suas sequências.
+    """
+    return f"TRUNCATE TABLE {', '.join(STAR_TABLES)} RESTART IDENTITY CASCADE;"
+
+
+def setup_database(engine, anos: Iterable[int], materialized_views: bool = False) -> None:
+    """
+    Garante que toda a estrutura de tabelas e views exista no banco de dados.
+    Cria as tabelas a partir dos modelos ORM, as partições anuais da tabela fato para
+    `anos` e as views a partir de DDL explícito. Com `materialized_views` as views
+    analíticas são criadas como materializadas.
+    """
+    logging.info("Configurando o schema do banco de dados a partir dos modelos...")
+    with engine.begin() as connection:
+        legado = _rename_legacy_fact_table(connection)
+        Base.metadata.create_all(connection)
+        ensure_partitions(connection, anos)
+        if legado is not None:
+            _migrate_legacy_fact_table(connection, legado)
+    logging.info("Tabelas criadas com sucesso.")
+
+    tipo = "materializadas" if materialized_views else "comuns"
+    logging.info(f"Criando/Atualizando as views analíticas ({tipo})...")
+    with engine.connect() as connection:
+        with connection.begin():
+            create_views(connection, materialized_views)
+
+    logging.info("Views criadas/atualizadas com sucesso.")
+
+
+def _rename_legacy_fact_table(connection) -> Optional[str]:
+    """
+    Se a tabela fato existir sem particionamento (bancos criados antes do particionamento
+    por ano), renomeia-a, junto com seus índices, constraints e sequência, para que a
+    tabela particionada possa ser criada com os nomes dos modelos.
+
+    Returns:
+        Optional[str]: O novo nome da tabela antiga, ou None se não há o que migrar.
+    """
+    tabela = FatoAtendimento.__tablename__
+    if relkind(connection, tabela) != "r":
+        return None
+    legado = f"{tabela}_legado"
+    logging.warning(f"A tabela '{tabela}' não é particionada; migrando seus registros para a tabela particionada...")
+    sequencia = connection.execute(
+        text("SELECT pg_get_serial_sequence(:tabela, 'id')"), {"tabela": tabela}
+    ).scalar()
+    indices = connection.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :tabela AND schemaname = current_schema()"),
+        {"tabela": tabela},
+    ).scalars().all()
+    connection.execute(text(f"ALTER TABLE {tabela} RENAME TO {legado}"))
+    # Renomear o índice de uma constraint (chave primária, única) renomeia a constraint.
+    for indice in indices:
+        connection.execute(text(f"ALTER INDEX {indice} RENAME TO {indice}_legado"))
+    if sequencia is not None:
+        connection.execute(text(f"ALTER SEQUENCE {sequencia} RENAME TO {tabela}_id_seq_legado"))
+    return legado
+
+
+def _migrate_legacy_fact_table(connection, legado: str) -> None:
+    """
+    Copia os registros da tabela fato antiga para a tabela particionada e descarta a
+    antiga. A data de referência vem de `dim_tempo` e, se a tabela antiga não tiver
+    `metrica_id` (bancos anteriores à dimensão de métrica), os registros são atribuídos a
+    `config.METRICA_ALVO`, a única métrica carregada até então. Os agregados lidos pelas
+    views são recalculados a partir dos registros migrados, na mesma transação, e as views
+    que liam a tabela antiga são descartadas junto com ela e recriadas pelo setup.
+    """
+    # Importado aqui: o recálculo usa o pandas, que o setup comum não precisa carregar.
+    from .backends import _rollups_from_database, _write_rollups
+
+    tabela = FatoAtendimento.__tablename__
+    colunas = set(connection.execute(
+        text("SELECT column_name FROM information_schema.columns WHERE table_name = :tabela AND table_schema = current_schema()"),
+        {"tabela": legado},
+    ).scalars())
+    metrica = "l.metrica_id"
+    if "metrica_id" not in colunas:
+        metrica = connection.execute(
+            text(
+                f"INSERT INTO {DimMetrica.__tablename__} (nome_metrica) VALUES (:nome) "
+                "ON CONFLICT (nome_metrica) DO UPDATE SET nome_metrica = EXCLUDED.nome_metrica "
+                "RETURNING id_metrica"
+            ),
+            {"nome": METRICA_ALVO},
+        ).scalar_one()
+
+    anos = connection.execute(text(
+        f"SELECT DISTINCT EXTRACT(YEAR FROM t.data_referencia)::int FROM {legado} l "
+        "JOIN dim_tempo t ON t.id_tempo = l.tempo_id"
+    )).scalars().all()
+    ensure_partitions(connection, anos)
+    linhas = connection.execute(text(
+        f"INSERT INTO {tabela} (id, data_referencia, tempo_id, servico_id, grupo_economico_id, metrica_id, valor) "
+        f"SELECT l.id, t.data_referencia, l.tempo_id, l.servico_id, l.grupo_economico_id, {metrica}, l.valor "
+        f"FROM {legado} l JOIN dim_tempo t ON t.id_tempo = l.tempo_id"
+    )).rowcount
+    connection.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), COALESCE((SELECT MAX(id) FROM {tabela}), 0) + 1, false)"
+    ))
+    with connection.connection.cursor() as cursor:
+        _write_rollups(cursor, _rollups_from_database(cursor))
+    connection.execute(text(f"DROP TABLE {legado} CASCADE"))
+    logging.info(f"{linhas} registros migrados para a tabela particionada '{tabela}'.")
+
+
+def create_views(connection, materialized_views: bool = False) -> None:
+    """
+    Cria ou atualiza as views analíticas no schema corrente da conexão.
+    Views comuns são sempre recriadas, já que `CREATE OR REPLACE VIEW` não aceita
+    mudanças nas colunas de uma view existente.
+    """
+    for name in ANALYTIC_VIEWS:
+        if materialized_views:
+            create_materialized_view(connection, name)
+        else:
+            kind = relkind(connection, name)
+            if kind == "m":
+                connection.execute(text(f"DROP MATERIALIZED VIEW {name}"))
+            elif kind == "v":
+                connection.execute(text(f"DROP VIEW {name}"))
+            connection.execute(text(VIEW_SQL[name]))
+
+
+def bump_data_version(engine) -> int:
+    """
+    Incrementa a versão dos dados do Data Mart (tabela `etl_versao_dados`). Deve ser
+    chamada depois que a carga foi confirmada, para que quem ler a nova versão já
+    encontre os novos dados.
+
+    Returns:
+        int: A nova versão.
+    """
+    with engine.begin() as connection:
+        return connection.execute(
+            text(
+                "INSERT INTO etl_versao_dados (id, versao, atualizado_em) VALUES (1, 1, now()) "
+                "ON CONFLICT (id) DO UPDATE "
+                "SET versao = etl_versao_dados.versao + 1, atualizado_em = now() "
+                "RETURNING versao"
+            )
+        ).scalar_one()
+
+
+def data_version(connection) -> int:
+    """
+    Retorna a versão atual dos dados do Data Mart, ou 0 se nenhuma carga foi concluída.
+    """
+    return connection.execute(text("SELECT versao FROM etl_versao_dados WHERE id = 1")).scalar() or 0
+
+
+def relkind(connection, name: str) -> Optional[str]:
+    """
+    Retorna o tipo do objeto no schema corrente ('v' para view, 'm' para view
+    materializada, 'r' para tabela...), ou None se ele não existir.
+    """
+    return connection.execute(
+        text(
+            "SELECT c.relkind FROM pg_class c "
+            "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+        ),
+        {"name": name},
+    ).scalar()
+
+
+def create_materialized_view(connection, name: str) -> None:
+    """
+    Cria a view materializada e seu índice único. Se ela já existir com a mesma
+    definição, é mantida como está; se a definição mudou (ou se existir uma view
+    comum com o mesmo nome), é recriada. A definição vigente é identificada por um
+    hash guardado no comentário da view.
+    """
+    ddl = materialized_view_ddl(name)
+    versao = hashlib.sha256("\n".join(ddl).encode("utf-8")).hexdigest()[:16]
+    kind = relkind(connection, name)
+    if kind == "m":
+        comentario = connection.execute(
+            text("SELECT obj_description(CAST(:name AS regclass), 'pg_class')"), {"name": name}
+        ).scalar()
+        if comentario == f"definicao:{versao}":
+            return
+        connection.execute(text(f"DROP MATERIALIZED VIEW {name}"))
+    elif kind == "v":
+        connection.execute(text(f"DROP VIEW {name}"))
+
+    for statement in ddl:
+        connection.execute(text(statement))
+    connection.execute(text(f"COMMENT ON MATERIALIZED VIEW {name} IS 'definicao:{versao}'"))
+    logging.info(f"View materializada '{name}' criada.")
+
+
+def refresh_views(engine) -> None:
+    """
+    Atualiza as views analíticas materializadas com `REFRESH MATERIALIZED VIEW
+    CONCURRENTLY`, que não bloqueia as consultas em andamento. Views comuns não
+    precisam de atualização e são ignoradas.
+    """
+    with engine.connect() as connection:
+        with connection.begin():
+            for name in ANALYTIC_VIEWS:
+                if relkind(connection, name) != "m":
+                    continue
+                logging.info(f"Atualizando a view materializada '{name}'...")
+                connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+
+
+def create_staging_schema(engine, schema: str, anos: Iterable[int]) -> None:
+    """
+    (Re)cria um schema de staging vazio com as tabelas do Data Mart (modelo estrela e agregados)
+    e as partições anuais da tabela fato. Nada no schema `public` é bloqueado.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+        # Com o search_path apontando para o staging, o DDL sem schema dos modelos
+        # (inclusive as chaves estrangeiras e as partições) é criado lá.
+        connection.execute(text(f"SET LOCAL search_path TO {schema}"))
+        Base.metadata.create_all(connection, tables=[Base.metadata.tables[name] for name in MART_TABLES])
+        ensure_partitions(connection, anos)
+
+
+def swap_schema(
+    engine, schema: str, lock_timeout: str = "500ms", tentativas: int = 20
+) -> None:
+    """
+    Troca atomicamente as tabelas do modelo estrela e as views analíticas do schema
+    `public` pelas do schema de staging, numa única transação.
+
+    As relações antigas (incluindo todas as partições da tabela fato) vão para um schema
+    temporário, as novas são movidas para `public` e o schema temporário é descartado.
+    Índices, constraints e sequências acompanham suas tabelas, e as views continuam
+    apontando para as tabelas com que foram criadas. Consultas concorrentes veem os dados
+    antigos ou os novos.
+
+    Todos os bloqueios são obtidos de uma vez, no início, na mesma ordem em que as
+    consultas os obtêm (views e depois tabelas). Se não forem obtidos em `lock_timeout`,
+    a transação é desfeita, liberando as consultas que estavam na fila, e a troca é
+    tentada de novo, até `tentativas` vezes.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            _swap_schema_once(engine, schema, lock_timeout)
+            return
+        except OperationalError as e:
+            pgcode = getattr(e.orig, "pgcode", None)
+            if pgcode not in (_LOCK_NOT_AVAILABLE, _DEADLOCK_DETECTED) or tentativa == tentativas:
+                raise
+            logging.warning(f"Bloqueios para a troca de schema não obtidos (tentativa {tentativa}/{tentativas}). Tentando de novo.")
+            time.sleep(min(0.1 * tentativa, 2.0))
+
+
+def _swap_schema_once(engine, schema: str, lock_timeout: str) -> None:
+    old_schema = f"{schema}_old"
+    with engine.begin() as connection:
+        connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        novas = connection.execute(
+            text(
+                "SELECT c.relname, c.relkind FROM pg_class c "
+                "WHERE c.relnamespace = CAST(:schema AS regnamespace) AND c.relkind IN ('r', 'p', 'v', 'm')"
+            ),
+            {"schema": schema},
+        ).all()
+        antigas = connection.execute(
+            text(
+                "SELECT c.relname, c.relkind FROM pg_class c "
+                "WHERE c.relnamespace = 'public'::regnamespace AND c.relkind IN ('r', 'p', 'v', 'm') "
+                "AND (c.relname = ANY(:names) OR c.oid IN ("
+                "    SELECT i.inhrelid FROM pg_inherits i WHERE i.inhparent = to_regclass(:fato)))"
+            ),
+            {"names": [name for name, _ in novas], "fato": f"public.{FatoAtendimento.__tablename__}"},
+        ).all()
+        # Views primeiro: uma consulta bloqueia a view antes das tabelas que ela lê. Views
+        # materializadas não aceitam LOCK; são bloqueadas pelo próprio ALTER, logo abaixo.
+        antigas = sorted(antigas, key=lambda rel: (rel[1] not in ("v", "m"), rel[0]))
+        bloqueaveis = [name for name, kind in antigas if kind != "m"]
+        if bloqueaveis:
+            connection.execute(text(
+                "LOCK TABLE " + ", ".join(f"public.{name}" for name in bloqueaveis) + " IN ACCESS EXCLUSIVE MODE"
+            ))
+
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {old_schema} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {old_schema}"))
+        for name, kind in antigas:
+            connection.execute(text(f"ALTER {_ALTER_KEYWORD[kind]} public.{name} SET SCHEMA {old_schema}"))
+        for name, kind in novas:
+            connection.execute(text(f"ALTER {_ALTER_KEYWORD[kind]} {schema}.{name} SET SCHEMA public"))
+        connection.execute(text(f"DROP SCHEMA {old_schema} CASCADE"))
+        connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    logging.info(f"Schema '{schema}' publicado: {len(novas)} relações trocadas, {len(antigas)} descartadas.")
+
+
+def drop_schema(engine, schema: str) -> None:
+    """
+    Remove um schema e tudo o que ele contém, se existir.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
@@ -0,0 +1,248 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+from .config import BASE_URL
+
+# Status possíveis de um download.
+BAIXADO = "baixado"
+RETOMADO = "retomado"
+NAO_MODIFICADO = "nao_modificado"
+NAO_ENCONTRADO = "nao_encontrado"
+FALHOU = "falhou"
+CANCELADO = "cancelado"
+
+
+class DownloadCancelado(Exception):
+    """
+    Sinaliza que um download em andamento foi interrompido por um pedido de cancelamento.
+    """
+
+
+@dataclass
+class DownloadResult:
+    """
+    Resultado do download de um único arquivo.
+    """
+    file_name: str
+    status: str
+    bytes_downloaded: int = 0
+
+
+class SourceDownloader:
+    """
+    Baixa os arquivos de dados brutos de forma concorrente, condicional e retomável.
+
+    - Um número limitado de downloads roda ao mesmo tempo sobre uma única `requests.Session`,
+      reaproveitando as conexões do pool.
+    - Os validadores HTTP (ETag / Last-Modified) de cada arquivo ficam num manifesto JSON
+      ao lado do diretório de saída; arquivos que não mudaram no servidor (304) são pulados.
+    - Downloads interrompidos ficam num arquivo `.part` e são retomados com `Range`/`If-Range`.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        base_url: str = BASE_URL,
+        max_workers: int = 4,
+        timeout: int = 60,
+        manifest_path: Optional[Path] = None,
+    ):
+        """
+        Constrói uma instância do SourceDownloader.
+
+        Args:
+            output_dir (Path): Diretório onde os arquivos baixados serão salvos.
+            base_url (str): URL base de onde os arquivos são baixados.
+            max_workers (int): Número máximo de downloads simultâneos.
+            timeout (int): Timeout, em segundos, de cada requisição.
+            manifest_path (Path, opcional): Caminho do manifesto. Por padrão fica ao lado
+                do diretório de saída, ex: `dados_brutos.manifest.json`.
+        """
+        self.output_dir = output_dir
+        self.base_url = base_url
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.manifest_path = manifest_path or output_dir.parent / f"{output_dir.name}.manifest.json"
+        self._manifest: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _load_manifest(self) -> None:
+        """
+        Lê o manifesto do disco. Um manifesto ausente ou corrompido é tratado como vazio.
+        """
+        try:
+            self._manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self._manifest = {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Manifesto '{self.manifest_path}' ilegível ({e}). Ignorando.")
+            self._manifest = {}
+
+    def _update_manifest(self, file_name: str, entry: Optional[Dict]) -> None:
+        """
+        Atualiza (ou remove, se `entry` for None) a entrada de um arquivo e persiste o manifesto.
+        A escrita é atômica (arquivo temporário + rename) para sobreviver a interrupções.
+        """
+        with self._lock:
+            if entry is None:
+                self._manifest.pop(file_name, None)
+            else:
+                self._manifest[file_name] = entry
+            tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+            tmp_path.write_text(json.dumps(self._manifest, indent=2, sort_keys=True), encoding="utf-8")
+            tmp_path.replace(self.manifest_path)
+
+    @staticmethod
+    def _validators(response: requests.Response) -> Dict:
+        """
+        Extrai os validadores HTTP relevantes de uma resposta.
+        """
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def _download_file(self, file_name: str) -> DownloadResult:
+        """
+        Baixa um único arquivo, aplicando requisição condicional e retomada quando possível.
+        """
+        url = f"{self.base_url}{file_name}"
+        output_path = self.output_dir / file_name
+        part_path = output_path.with_name(output_path.name + ".part")
+        entry = self._manifest.get(file_name, {})
+
+        headers = {}
+        offset = 0
+        partial = entry.get("partial")
+        if part_path.exists() and partial and (partial.get("etag") or partial.get("last_modified")):
+            # Só retoma se o servidor puder garantir que o arquivo não mudou (If-Range).
+            offset = part_path.stat().st_size
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = partial.get("etag") or partial.get("last_modified")
+        elif output_path.exists():
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code == 304:
+                    logging.info(f"Arquivo '{file_name}' não foi modificado no servidor. Pulando.")
+                    return DownloadResult(file_name, NAO_MODIFICADO)
+                if r.status_code == 416:
+                    # O trecho pedido não existe mais; descarta o parcial e recomeça do zero.
+                    part_path.unlink(missing_ok=True)
+                    self._update_manifest(file_name, {k: v for k, v in entry.items() if k != "partial"})
+                    return self._download_file(file_name)
+                r.raise_for_status()
+
+                resumed = r.status_code == 206
+                validators = self._validators(r)
+                mode = "ab" if resumed else "wb"
+                written = 0
+                try:
+                    with open(part_path, mode) as f:
+                        for chunk in r.iter_content(chunk_size=64 * 1024):
+                            if self._cancel.is_set():
+                                raise DownloadCancelado(file_name)
+                            f.write(chunk)
+                            written += len(chunk)
+                except (requests.exceptions.RequestException, OSError, DownloadCancelado):
+                    # Guarda os validadores do parcial para permitir a retomada na próxima execução.
+                    self._update_manifest(file_name, {**entry, "partial": validators})
+                    raise
+
+            part_path.replace(output_path)
+            self._update_manifest(file_name, {**validators, "size": output_path.stat().st_size})
+            status = RETOMADO if resumed else BAIXADO
+            logging.info(f"Arquivo '{file_name}' salvo com sucesso ({status}, {written} bytes).")
+            return DownloadResult(file_name, status, written)
+
+        except DownloadCancelado:
+            logging.warning(f"Download de '{file_name}' cancelado; o parcial será retomado na próxima execução.")
+            return DownloadResult(file_name, CANCELADO)
+        except requests.exceptions.HTTPError as e:
+            # Se o erro for 404, apenas avisa que o arquivo não existe e continua.
+            if e.response.status_code == 404:
+                logging.warning(f"Arquivo '{file_name}' não encontrado no servidor (404). Pulando.")
+                return DownloadResult(file_name, NAO_ENCONTRADO)
+            logging.error(f"Falha ao baixar {file_name} com erro HTTP {e.response.status_code}.")
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Falha de conexão ao tentar baixar {file_name}: {e}")
+        except OSError as e:
+            logging.error(f"Falha ao gravar {file_name} em disco: {e}")
+        return DownloadResult(file_name, FALHOU)
+
+    def _download_task(
+        self, file_name: str, on_complete: Optional[Callable[[DownloadResult], None]]
+    ) -> DownloadResult:
+        """
+        Baixa um arquivo (se o cancelamento não tiver sido pedido) e, na própria thread
+        do download, entrega o resultado a `on_complete`.
+        """
+        if self._cancel.is_set():
+            return DownloadResult(file_name, CANCELADO)
+        result = self._download_file(file_name)
+        if on_complete is not None:
+            on_complete(result)
+        return result
+
+    def download_all(
+        self,
+        file_names: Iterable[str],
+        on_complete: Optional[Callable[[DownloadResult], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> List[DownloadResult]:
+        """
+        Baixa todos os arquivos informados com no máximo `max_workers` downloads simultâneos.
+
+        Args:
+            file_names (Iterable[str]): Os arquivos a baixar.
+            on_complete (Callable, opcional): Chamada com o resultado de cada arquivo assim
+                que ele termina, na thread do download. Se ela bloquear, aquela thread não
+                inicia o próximo download (ex: para aplicar contrapressão).
+            cancel (threading.Event, opcional): Quando sinalizado, os downloads ainda não
+                iniciados são pulados e os em andamento são interrompidos, mantendo o
+                parcial para retomada; o status deles fica "cancelado". É sinalizado
+                também quando um erro inesperado interrompe os downloads.
+
+        Returns:
+            List[DownloadResult]: Um resultado por arquivo, na mesma ordem de `file_names`.
+        """
+        file_names = list(file_names)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._load_manifest()
+        self._cancel = cancel or threading.Event()
+
+        results: Dict[str, DownloadResult] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, tqdm(
+            total=len(file_names), unit="arquivo", desc="Downloads"
+        ) as pbar:
+            futures = {executor.submit(self._download_task, name, on_complete): name for name in file_names}
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result.file_name] = result
+                    pbar.update(1)
+            except BaseException:
+                # Um erro inesperado interrompe os demais downloads antes de ser propagado.
+                self._cancel.set()
+                raise
+
+        return [results[name] for name in file_names]
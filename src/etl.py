@@ -1,21 +1,44 @@
 import logging
 import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, as_completed, wait
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
-import requests
-from sqlalchemy import create_engine, text
-from tqdm import tqdm
 
-from .models import Base
-from .views import VW_PERFORMANCE_SQL, VW_RANKING_ABSOLUTO_SQL
+from .cache import CACHE_DIR, MAX_BYTES, ParseCache
+from .config import (
+    ANOS,
+    BASE_URL,
+    INPUT_DIR,
+    LEITORES_ODS,
+    METRICAS_ALVO,
+    MODOS_CARGA,
+    MODOS_CARGA_PARQUET,
+    database_url,
+    parquet_dir,
+    source_base_url,
+    source_file_names,
+)
+from .metrics import FALHA, SUCESSO, RunMetrics, StageMetric
+from .ods_reader import read_ods_filtered
+from .rollups import compute_rollups
 
-# --- Configurações ---
-INPUT_DIR = Path("dados_brutos")
+# O backend (SQLAlchemy, PyArrow) e o downloader (requests, tqdm) são importados apenas
+# pelos métodos que os usam, para que extração e transformação não os carreguem.
+if TYPE_CHECKING:
+    from .backends import DataMartBackend
+    from .download import DownloadResult
 
-METRICA_ALVO = "Taxa de Respondidas em 5 dias Úteis"
+# Versão da lógica de leitura/limpeza dos arquivos. Deve ser incrementada sempre que
+# `_read_ods_file` (ou os leitores que ele usa) mudar, invalidando o cache de parsing.
+VERSAO_PARSER = 1
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -28,79 +51,134 @@ class EtlPipeline:
     dos dados de atendimento das operadoras de telecomunicações.
     """
 
-    def __init__(self, input_dir: Path, db_url: str):
+    def __init__(
+        self,
+        input_dir: Path,
+        db_url: str,
+        base_url: str = BASE_URL,
+        download_workers: int = 4,
+        parse_workers: int = 1,
+        ods_reader: str = "odf",
+        parse_cache: Optional[ParseCache] = None,
+        load_mode: str = "replace",
+        metrics: Iterable[str] = METRICAS_ALVO,
+        materialized_views: bool = False,
+        chunk_rows: int = 50_000,
+        metrics_log: Optional[Path] = None,
+        file_timings: bool = False,
+        pipelined: bool = False,
+    ):
         """
         Constrói uma instância do EtlPipeline.
 
         Args:
             input_dir (Path): O diretório onde os arquivos de dados brutos (.ods) serão salvos.
-            db_url (str): A URL de conexão para o banco de dados PostgreSQL.
+            db_url (str): A URL de conexão para o banco de dados PostgreSQL, ou
+                `parquet://<diretório>` para gravar o Data Mart em arquivos Parquet
+                servidos pelo DuckDB (ver `ParquetStore`). Nesse backend toda carga
+                regrava e publica uma versão completa, e o modo "upsert" não é suportado.
+            base_url (str): A URL base de onde os arquivos .ods são baixados.
+            download_workers (int): Número máximo de downloads simultâneos.
+            parse_workers (int): Número de processos usados para ler os arquivos .ods.
+                Com 1 (padrão) a leitura é feita em série no próprio processo.
+            ods_reader (str): O leitor de .ods usado na extração: "odf" (padrão, via
+                `pd.read_excel`) ou "stream" (leitor em streaming que já descarta as
+                linhas de outras métricas).
+            parse_cache (ParseCache, opcional): Cache dos DataFrames já lidos de cada arquivo.
+                Se omitido, todos os arquivos são lidos a cada execução.
+            load_mode (str): O modo de carga: "replace" (padrão, trunca e recarrega),
+                "upsert" (carga incremental), "copy" (recarga em massa via COPY) ou
+                "swap" (recarga num schema de staging publicado com troca atômica).
+            metrics (Iterable[str]): As métricas (valores de `VARIÁVEL`) carregadas no
+                Data Mart, todas numa única passada pelos arquivos.
+            materialized_views (bool): Se True, as views analíticas são criadas como views
+                materializadas, atualizadas automaticamente ao fim de cada carga.
+            chunk_rows (int): Tamanho máximo, em linhas, dos blocos do modo streaming.
+            metrics_log (Path, opcional): Arquivo JSON Lines que recebe as métricas de cada
+                etapa de `run`/`run_streaming`, além do log comum e da tabela `etl_stage_metric`.
+            file_timings (bool): Se True, as métricas da extração incluem o tempo de
+                leitura de cada arquivo.
+            pipelined (bool): Se True, `run` sobrepõe download e extração, lendo cada
+                arquivo assim que ele é baixado (ver `download_and_extract`).
         """
+        if ods_reader not in LEITORES_ODS:
+            raise ValueError(f"Leitor de .ods inválido: '{ods_reader}'. Opções: {LEITORES_ODS}")
+        if load_mode not in MODOS_CARGA:
+            raise ValueError(f"Modo de carga inválido: '{load_mode}'. Opções: {MODOS_CARGA}")
         self.input_dir = input_dir
-        self.engine = create_engine(db_url)
+        self.base_url = base_url
+        self.download_workers = download_workers
+        self.parse_workers = max(1, parse_workers)
+        self.ods_reader = ods_reader
+        self.parse_cache = parse_cache
+        self.load_mode = load_mode
+        self.materialized_views = materialized_views
+        self.chunk_rows = max(1, chunk_rows)
+        self.metrics_log = metrics_log
+        self.file_timings = file_timings
+        self.pipelined = pipelined
+        self.metrics = tuple(dict.fromkeys(metric.strip() for metric in metrics))
+        if parquet_dir(db_url) is not None and load_mode not in MODOS_CARGA_PARQUET:
+            raise ValueError(f"O modo de carga '{load_mode}' não é suportado pelo backend parquet.")
+        self.db_url = db_url
         self.cleaned_data: Dict[str, pd.DataFrame] = {}
         self.final_df: pd.DataFrame = pd.DataFrame()
+        # Agregados de `final_df` calculados na carga, por tabela (ver `rollups.compute_rollups`).
+        self.rollups: Dict[str, pd.DataFrame] = {}
+        # Contadores da leitura dos arquivos (lidos, do cache, com falha) e tempo de cada um.
+        self.parse_stats: Counter = Counter()
+        self.parse_timings: Dict[str, float] = {}
+        self.run_metrics: Optional[RunMetrics] = None
+
+    @cached_property
+    def backend(self) -> "DataMartBackend":
+        """
+        O backend do Data Mart (ver `backends.open_backend`), aberto no primeiro uso: as
+        etapas que não acessam o Data Mart não criam o engine do banco.
+        """
+        from .backends import open_backend
+
+        return open_backend(self.db_url)
 
     def _setup_database(self) -> None:
         """
-        Garante que toda a estrutura de tabelas e views exista no banco de dados.
-        Cria as tabelas a partir dos modelos ORM e as views a partir de DDL explícito.
+        Garante que toda a estrutura de tabelas e views exista no Data Mart
+        (ver `database.setup_database`).
         """
-        logging.info("Configurando o schema do banco de dados a partir dos modelos...")
-        Base.metadata.create_all(self.engine)
-        logging.info("Tabelas criadas com sucesso.")
+        self.backend.setup(ANOS, self.materialized_views)
 
-        logging.info("Criando/Atualizando a view 'vw_performance_relativa_mercado'...")
-        with self.engine.connect() as connection:
-            with connection.begin():
-                connection.execute(text(VW_PERFORMANCE_SQL))
-                connection.execute(text(VW_RANKING_ABSOLUTO_SQL))
-        
-        logging.info("Views criadas/atualizadas com sucesso.")
+    def refresh_views(self) -> None:
+        """
+        Atualiza as views analíticas materializadas sem bloquear as consultas em
+        andamento (ver `database.refresh_views`). No backend Parquet as views leem
+        direto os arquivos publicados e não precisam de atualização.
+        """
+        self.backend.refresh_views()
 
-    def _download_source_files(self) -> None:
+    def _download_source_files(self) -> List["DownloadResult"]:
         """
         Baixa os arquivos ODS do portal da Anatel para um range de anos (2013-2019).
+        Os downloads rodam em paralelo (até `download_workers` por vez), são condicionais
+        (arquivos inalterados no servidor não são baixados de novo) e retomáveis.
         O processo é resiliente a arquivos não encontrados (erro 404).
         """
+        from .download import SourceDownloader
+
         logging.info("Iniciando o download do histórico de arquivos de dados (2013-2019)...")
-        self.input_dir.mkdir(exist_ok=True)
 
-        anos = range(2013, 2020)  # Gera anos de 2013 a 2019
-        servicos = ["SMP", "STFC", "SCM"]
-        base_url = "https://www.anatel.gov.br/dadosabertos/PDA/IDA/"
+        file_names = source_file_names()
 
-        for servico in servicos:
-            for ano in anos:
-                file_name = f"{servico}{ano}.ods"
-                url = f"{base_url}{file_name}"
-                output_path = self.input_dir / file_name
+        downloader = SourceDownloader(
+            self.input_dir, base_url=self.base_url, max_workers=self.download_workers
+        )
+        results = downloader.download_all(file_names)
 
-                try:
-                    logging.info(f"Tentando baixar: {file_name}")
-                    with requests.get(url, stream=True, timeout=60) as r:
-                        # Lança um erro para status como 404 (Not Found)
-                        r.raise_for_status()
-                        
-                        total_size = int(r.headers.get('content-length', 0))
-                        with open(output_path, 'wb') as f, tqdm(
-                            total=total_size, unit='iB', unit_scale=True, desc=file_name
-                        ) as pbar:
-                            for chunk in r.iter_content(chunk_size=8192):
-                                f.write(chunk)
-                                pbar.update(len(chunk))
-                    logging.info(f"Arquivo '{file_name}' salvo com sucesso.")
-                
-                except requests.exceptions.HTTPError as e:
-                    # Se o erro for 404, apenas avisa que o arquivo não existe e continua.
-                    if e.response.status_code == 404:
-                        logging.warning(f"Arquivo '{file_name}' não encontrado no servidor (404). Pulando.")
-                    else:
-                        logging.error(f"Falha ao baixar {file_name} com erro HTTP {e.response.status_code}.")
-                except requests.exceptions.RequestException as e:
-                    logging.error(f"Falha de conexão ao tentar baixar {file_name}: {e}")
+        contagem = Counter(result.status for result in results)
+        logging.info(f"Downloads finalizados: {dict(contagem)}")
+        return results
 
-    def _reformat_date_columns(self, columns: pd.Index) -> List[str]:
+    @staticmethod
+    def _reformat_date_columns(columns: pd.Index) -> List[str]:
         """
         Padroniza as colunas de data do formato 'Mês/Ano' para 'AAAA-MM'.
         """
@@ -132,42 +210,257 @@ class EtlPipeline:
                 new_column_names.append(col)
         return new_column_names
 
+    def _parse_files(self, ods_files: List[Path]) -> List[Optional[pd.DataFrame]]:
+        """
+        Lê e limpa cada arquivo .ods, em série ou num pool de processos.
+        Arquivos já presentes no cache de parsing (mesmo conteúdo e mesma versão do parser)
+        não são lidos de novo. Falhas são isoladas por arquivo: o erro é registrado e o
+        arquivo vira `None`.
+
+        Returns:
+            List[Optional[pd.DataFrame]]: Um DataFrame (ou `None`) por arquivo, na mesma
+            ordem de `ods_files`, independentemente da ordem em que os workers terminam.
+        """
+        results: List[Optional[pd.DataFrame]] = [None] * len(ods_files)
+        cache_keys: Dict[int, Optional[str]] = {}
+        pending = []
+
+        variant = self._cache_variant() if self.parse_cache is not None else None
+        for i, file_path in enumerate(ods_files):
+            cache_keys[i], results[i] = self._from_parse_cache(file_path, variant)
+            if results[i] is None:
+                pending.append(i)
+        if self.parse_cache is not None:
+            logging.info(
+                f"Cache de parsing: {len(ods_files) - len(pending)} arquivos reaproveitados, "
+                f"{len(pending)} a processar."
+            )
+
+        workers = min(self.parse_workers, len(pending))
+        if workers <= 1:
+            for i in pending:
+                file_path = ods_files[i]
+                logging.info(f"Processando arquivo: {file_path.name} para o serviço '{file_path.stem[:3]}'")
+                results[i] = self._parsed(
+                    file_path, cache_keys[i], lambda: _timed_read_ods_file(file_path, self.ods_reader, self.metrics)
+                )
+        else:
+            logging.info(f"Processando {len(pending)} arquivos em paralelo com {workers} processos.")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_timed_read_ods_file, ods_files[i], self.ods_reader, self.metrics): i
+                    for i in pending
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = self._parsed(ods_files[i], cache_keys[i], future.result)
+        return results
+
+    def _from_parse_cache(self, file_path: Path, variant: Optional[str]) -> Tuple[Optional[str], Optional[pd.DataFrame]]:
+        """
+        Procura um arquivo no cache de parsing.
+
+        Returns:
+            Tuple: A chave de cache do arquivo (`None` sem cache) e o DataFrame guardado,
+            ou `None` se o arquivo ainda precisar ser lido.
+        """
+        if self.parse_cache is None:
+            return None, None
+        key = self.parse_cache.key(file_path, variant)
+        df = self.parse_cache.get(key)
+        if df is not None:
+            self.parse_stats["cache"] += 1
+            logging.info(f"Arquivo recuperado do cache: {file_path.name}")
+        return key, df
+
+    def _parsed(
+        self, file_path: Path, cache_key: Optional[str], read: Callable[[], Tuple[pd.DataFrame, float]]
+    ) -> Optional[pd.DataFrame]:
+        """
+        Obtém o resultado da leitura de um arquivo (`read`, ex: `future.result`), atualiza
+        os contadores e guarda o DataFrame no cache. Uma falha na leitura é registrada e
+        o arquivo vira `None`; só a quebra do pool de processos é propagada, pois
+        impede a leitura de todos os arquivos seguintes.
+        """
+        try:
+            df, self.parse_timings[file_path.name] = read()
+        except BrokenExecutor:
+            raise
+        except Exception as e:
+            self.parse_stats["falhas"] += 1
+            logging.error(f"Falha ao processar o arquivo {file_path.name}: {e}")
+            return None
+        self.parse_stats["lidos"] += 1
+        logging.info(f"Arquivo processado: {file_path.name} para o serviço '{file_path.stem[:3]}'")
+        if cache_key is not None:
+            self.parse_cache.put(cache_key, df)
+        return df
+
+    def _cache_variant(self) -> str:
+        """
+        Identifica o parser em uso para compor a chave do cache de parsing.
+        """
+        variant = f"{self.ods_reader}|v{VERSAO_PARSER}"
+        if self.ods_reader == "stream":
+            variant += "|" + "|".join(sorted(self.metrics))
+        return variant
+
     def extract_and_clean(self):
         """
         Extrai e limpa os dados de todos os arquivos .ods encontrados no diretório de entrada.
+        Com `parse_workers` > 1 os arquivos são lidos em paralelo num pool de processos.
         Os DataFrames limpos e combinados por serviço são armazenados em `self.cleaned_data`.
         """
         logging.info(f"Iniciando extração e limpeza do diretório: {self.input_dir}")
-        ods_files = list(self.input_dir.glob("*.ods"))
+        self.parse_stats, self.parse_timings = Counter(), {}
+        # A ordem dos arquivos é fixa para que o resultado seja determinístico.
+        ods_files = sorted(self.input_dir.glob("*.ods"))
         if not ods_files:
             logging.error(f"Nenhum arquivo .ods encontrado em '{self.input_dir}'. A etapa de download pode ter falhado.")
             return
 
+        self.cleaned_data = self._consolidate(zip(ods_files, self._parse_files(ods_files)))
+
+    @staticmethod
+    def _consolidate(parsed: Iterable[Tuple[Path, Optional[pd.DataFrame]]]) -> Dict[str, pd.DataFrame]:
+        """
+        Combina por serviço os DataFrames lidos de cada arquivo, na ordem recebida.
+        Arquivos com falha (`None`) são ignorados.
+        """
         all_data = {}
-        for file_path in ods_files:
-            try:
-                service_name = file_path.stem[:3]
-                logging.info(f"Processando arquivo: {file_path.name} para o serviço '{service_name}'")
-                df = pd.read_excel(file_path, engine="odf", header=8)
-                df.dropna(how="all", axis=1, inplace=True)
-                df.dropna(how="all", axis=0, inplace=True)
-                df.columns = self._reformat_date_columns(df.columns)
-                if service_name not in all_data:
-                    all_data[service_name] = []
-                all_data[service_name].append(df)
-            except Exception as e:
-                logging.error(f"Falha ao processar o arquivo {file_path.name}: {e}")
+        for file_path, df in parsed:
+            if df is None:
+                continue
+            service_name = file_path.stem[:3]
+            if service_name not in all_data:
+                all_data[service_name] = []
+            all_data[service_name].append(df)
 
         final_dfs = {}
         for service, dfs in all_data.items():
             final_dfs[service] = pd.concat(dfs, ignore_index=True)
             logging.info(f"Serviço '{service}' consolidado com sucesso.")
+        return final_dfs
+
+    def download_and_extract(self) -> List["DownloadResult"]:
+        """
+        Baixa e extrai os arquivos de forma encadeada, sobrepondo rede e CPU: cada .ods
+        é entregue à leitura assim que seu download termina, em vez de esperar todos
+        os downloads. O resultado (`self.cleaned_data`) é o mesmo de
+        `_download_source_files` seguido de `extract_and_clean`.
+
+        - Os downloads concluídos passam por uma fila limitada (`download_workers` +
+          `parse_workers` itens) e no máximo `parse_workers` leituras ficam em andamento.
+          Quando a leitura fica para trás, a fila enche e as threads de download esperam
+          antes de iniciar o próximo arquivo (contrapressão).
+        - Um erro fatal (ex: quebra do pool de processos ou exceção inesperada nas
+          threads de download) cancela os downloads restantes, interrompe os em andamento
+          (o parcial fica para retomada) e é propagado. Falhas de um único arquivo,
+          inclusive de rede ou de gravação em disco (do arquivo ou do manifesto),
+          continuam isoladas: viram um resultado com status "falhou".
+
+        Returns:
+            List[DownloadResult]: Um resultado por arquivo, como em `_download_source_files`.
+        """
+        from .download import SourceDownloader
+
+        logging.info("Iniciando download e extração encadeados do histórico de arquivos (2013-2019)...")
+        self.parse_stats, self.parse_timings = Counter(), {}
+        variant = self._cache_variant() if self.parse_cache is not None else None
+        downloader = SourceDownloader(
+            self.input_dir, base_url=self.base_url, max_workers=self.download_workers
+        )
+        baixados: queue.Queue = queue.Queue(maxsize=self.download_workers + self.parse_workers)
+        cancel = threading.Event()
+        download_results: List["DownloadResult"] = []
+        erros: List[BaseException] = []
+
+        def entregar(result: Optional["DownloadResult"]) -> None:
+            # Bloqueia a thread do download enquanto a fila estiver cheia, a menos que
+            # a execução seja cancelada.
+            while not cancel.is_set():
+                try:
+                    baixados.put(result, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
 
-        self.cleaned_data = final_dfs
+        def produzir() -> None:
+            try:
+                download_results.extend(
+                    downloader.download_all(source_file_names(), on_complete=entregar, cancel=cancel)
+                )
+            except BaseException as e:
+                erros.append(e)
+                cancel.set()
+            finally:
+                # Marca o fim dos downloads.
+                entregar(None)
+
+        parsed: Dict[Path, Optional[pd.DataFrame]] = {}
+        em_leitura: Dict[Future, Tuple[Path, Optional[str]]] = {}
+        executor = ProcessPoolExecutor(max_workers=self.parse_workers) if self.parse_workers > 1 else None
+
+        def concluir(futures: Iterable[Future]) -> None:
+            for future in futures:
+                file_path, key = em_leitura.pop(future)
+                parsed[file_path] = self._parsed(file_path, key, future.result)
+
+        def ler(file_path: Path) -> None:
+            if file_path in parsed or not file_path.exists():
+                return
+            key, parsed[file_path] = self._from_parse_cache(file_path, variant)
+            if parsed[file_path] is not None:
+                return
+            if executor is None:
+                logging.info(f"Processando arquivo: {file_path.name} para o serviço '{file_path.stem[:3]}'")
+                parsed[file_path] = self._parsed(
+                    file_path, key, lambda: _timed_read_ods_file(file_path, self.ods_reader, self.metrics)
+                )
+                return
+            while len(em_leitura) >= self.parse_workers:
+                concluir(wait(em_leitura, return_when=FIRST_COMPLETED).done)
+            em_leitura[executor.submit(_timed_read_ods_file, file_path, self.ods_reader, self.metrics)] = (file_path, key)
+
+        produtor = threading.Thread(target=produzir, name="etl-downloads", daemon=True)
+        produtor.start()
+        try:
+            while not erros:
+                try:
+                    result = baixados.get(timeout=0.1)
+                except queue.Empty:
+                    concluir([future for future in em_leitura if future.done()])
+                    continue
+                if result is None:
+                    break
+                ler(self.input_dir / result.file_name)
+            if erros:
+                raise erros[0]
+            # Arquivos em disco que não vieram de um download concluído (ex: o download
+            # falhou, mas há uma cópia de uma execução anterior), como na extração sequencial.
+            for file_path in sorted(self.input_dir.glob("*.ods")):
+                ler(file_path)
+            concluir(list(wait(em_leitura).done))
+        except BaseException:
+            logging.error("Erro fatal no pipeline encadeado. Cancelando downloads e leituras pendentes.")
+            cancel.set()
+            raise
+        finally:
+            produtor.join()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        contagem = Counter(result.status for result in download_results)
+        logging.info(f"Downloads finalizados: {dict(contagem)}")
+        if not parsed:
+            logging.error(f"Nenhum arquivo .ods encontrado em '{self.input_dir}'. A etapa de download pode ter falhado.")
+        # A ordem dos arquivos é fixa para que o resultado seja determinístico.
+        self.cleaned_data = self._consolidate(sorted(parsed.items(), key=lambda item: item[0]))
+        return download_results
 
     def transform(self):
         """
-        Transforma os dados extraídos, realizando unpivot, filtragem pela métrica alvo
+        Transforma os dados extraídos, realizando filtragem pelas métricas alvo, unpivot
         e limpeza final para preparar o DataFrame para a carga no Data Mart.
         O resultado é armazenado em `self.final_df`.
         """
@@ -180,137 +473,346 @@ class EtlPipeline:
             df["servico"] = service_name
 
         df_consolidated = pd.concat(self.cleaned_data.values(), ignore_index=True)
+        logging.info(f"Filtrando pelas métricas alvo: {list(self.metrics)}")
+        df_final = self._transform_frame(df_consolidated)
+
+        if df_final.empty:
+            logging.error(f"Nenhuma das métricas alvo {list(self.metrics)} foi encontrada.")
+            self.final_df = pd.DataFrame()
+            return
+        ausentes = set(self.metrics) - set(df_final["metrica"].unique())
+        if ausentes:
+            logging.warning(f"Métricas alvo não encontradas nos arquivos: {sorted(ausentes)}")
+
+        self.final_df = df_final
+
+    def _transform_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aplica a transformação a um DataFrame limpo (já com a coluna `servico`): filtra as
+        métricas alvo, faz o unpivot das colunas de data e converte datas e valores.
+        Usada tanto pelo `transform` quanto, arquivo a arquivo, pelo modo streaming.
+        """
         id_vars = ["servico", "GRUPO ECONÔMICO", "VARIÁVEL"]
-        value_vars = [col for col in df_consolidated.columns if col not in id_vars]
+        value_vars = [col for col in df.columns if col not in id_vars]
 
-        df_unpivoted = df_consolidated.melt(
+        # A filtragem pelas métricas acontece antes do unpivot, para que o melt só
+        # processe as linhas que serão de fato carregadas.
+        variaveis = df["VARIÁVEL"].str.strip()
+        df_filtered = df[variaveis.isin(self.metrics)].assign(**{"VARIÁVEL": variaveis})
+
+        df_final = df_filtered.melt(
             id_vars=id_vars,
             value_vars=value_vars,
             var_name="data_referencia",
             value_name="valor",
         )
-
-        df_unpivoted["VARIÁVEL"] = df_unpivoted["VARIÁVEL"].str.strip()
-        logging.info(f"Filtrando pela métrica alvo: '{METRICA_ALVO}'")
-        df_filtered = df_unpivoted[df_unpivoted["VARIÁVEL"] == METRICA_ALVO].copy()
-
-        if df_filtered.empty:
-            logging.error(f"A métrica alvo '{METRICA_ALVO}' não foi encontrada.")
-            self.final_df = pd.DataFrame()
-            return
-
-        df_final = df_filtered.drop(columns=["VARIÁVEL"])
         df_final.rename(
-            columns={"GRUPO ECONÔMICO": "grupo_economico", "valor": "taxa_resolvidas_5_dias"},
+            columns={"GRUPO ECONÔMICO": "grupo_economico", "VARIÁVEL": "metrica"},
             inplace=True,
         )
         df_final["data_referencia"] = pd.to_datetime(
             df_final["data_referencia"], format="%Y-%m"
         )
-        df_final["taxa_resolvidas_5_dias"] = pd.to_numeric(
-            df_final["taxa_resolvidas_5_dias"], errors="coerce"
-        )
-        df_final.dropna(subset=["taxa_resolvidas_5_dias", "grupo_economico"], inplace=True)
+        df_final["valor"] = pd.to_numeric(df_final["valor"], errors="coerce")
+        df_final.dropna(subset=["valor", "grupo_economico"], inplace=True)
 
-        self.final_df = df_final[
-            ["data_referencia", "servico", "grupo_economico", "taxa_resolvidas_5_dias"]
+        return df_final[
+            ["data_referencia", "servico", "grupo_economico", "metrica", "valor"]
         ]
 
-    def load(self):
+    def iter_transformed_chunks(self) -> Iterator[pd.DataFrame]:
         """
-        Carrega o DataFrame transformado para o Data Mart no PostgreSQL.
-        A carga é idempotente, truncando as tabelas antes de inserir novos dados.
+        Extrai e transforma os arquivos .ods um de cada vez, emitindo blocos de no máximo
+        `chunk_rows` linhas já no formato de `final_df`. Apenas um arquivo fica em memória
+        por vez, e os blocos usam tipos compactos (categorias para os textos).
         """
-        if self.final_df.empty:
-            logging.warning("DataFrame vazio, nenhuma carga será realizada.")
+        self.parse_stats, self.parse_timings = Counter(), {}
+        ods_files = sorted(self.input_dir.glob("*.ods"))
+        if not ods_files:
+            logging.error(f"Nenhum arquivo .ods encontrado em '{self.input_dir}'. A etapa de download pode ter falhado.")
             return
 
-        logging.info("Iniciando a carga de dados para o PostgreSQL.")
-        df = self.final_df
-
-        with self.engine.connect() as conn:
-            logging.info("Limpando tabelas existentes para garantir a idempotência.")
-            conn.execute(text("TRUNCATE TABLE fato_atendimento, dim_tempo, dim_grupo_economico, dim_servico RESTART IDENTITY CASCADE;"))
-            conn.commit()
+        for file_path in ods_files:
+            (df,) = self._parse_files([file_path])
+            if df is None:
+                continue
+            df["servico"] = file_path.stem[:3]
+            chunk = self._transform_frame(df)
+            del df
+            if chunk.empty:
+                continue
+            chunk = chunk.astype({
+                "servico": "category",
+                "grupo_economico": "category",
+                "metrica": "category",
+            })
+            for start in range(0, len(chunk), self.chunk_rows):
+                yield chunk.iloc[start:start + self.chunk_rows]
+
+    def load(self) -> Optional[Dict[str, int]]:
+        """
+        Carrega o DataFrame transformado para o Data Mart no PostgreSQL, de acordo
+        com o `load_mode` do pipeline:
+
+        - "replace": trunca as tabelas e reinsere todo o histórico.
+        - "upsert": carga incremental; apenas as diferenças são gravadas.
+        - "copy": trunca e recarrega tudo via `COPY FROM STDIN`, numa única conexão.
+        - "swap": recarrega tudo num schema de staging e o publica com uma troca atômica.
+
+        Ao fim de uma carga bem-sucedida as views materializadas (se houver) são atualizadas
+        (no modo "swap" elas já são publicadas preenchidas) e a versão dos dados é
+        incrementada. A carga em si é feita pelo backend (ver `backends.PostgresBackend`
+        e `backends.ParquetBackend`).
+
+        Returns:
+            Optional[Dict[str, int]]: No modo "upsert", as contagens de registros da fato
+            inseridos, atualizados e inalterados.
+        """
+        if self.final_df.empty:
+            logging.warning("DataFrame vazio, nenhuma carga será realizada.")
+            return None
+        logging.info("Calculando os agregados das views analíticas.")
+        self.rollups = compute_rollups(self.final_df)
+        return self.backend.load(self.final_df, self.rollups, self.load_mode, self.materialized_views)
 
-        dim_servico_df = pd.DataFrame(df["servico"].unique(), columns=["nome_servico"])
-        dim_servico_df.to_sql("dim_servico", self.engine, if_exists="append", index=False)
-        logging.info(f"Carregados {len(dim_servico_df)} registros em dim_servico.")
+    def load_streaming(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Carrega o Data Mart a partir de um fluxo de blocos de `final_df`, com memória
+        limitada ao tamanho de cada bloco, respeitando o `load_mode` do pipeline (ver
+        `load_streaming` de cada backend).
 
-        dim_grupo_df = pd.DataFrame(df["grupo_economico"].unique(), columns=["nome_grupo"])
-        dim_grupo_df.to_sql("dim_grupo_economico", self.engine, if_exists="append", index=False)
-        logging.info(f"Carregados {len(dim_grupo_df)} registros em dim_grupo_economico.")
+        Returns:
+            int: O número de registros carregados na tabela fato.
+        """
+        return self.backend.load_streaming(chunks, self.load_mode, self.materialized_views)
 
-        dim_tempo_df = pd.DataFrame({"data_referencia": df["data_referencia"].unique()})
-        dim_tempo_df["ano"] = dim_tempo_df["data_referencia"].dt.year
-        dim_tempo_df["mes"] = dim_tempo_df["data_referencia"].dt.month
-        dim_tempo_df.to_sql("dim_tempo", self.engine, if_exists="append", index=False)
-        logging.info(f"Carregados {len(dim_tempo_df)} registros em dim_tempo.")
+    def _record_parse_metrics(self, metric: StageMetric) -> None:
+        """
+        Copia os contadores da leitura dos arquivos para as métricas de uma etapa.
+        """
+        metric.arquivos_processados = self.parse_stats["lidos"]
+        metric.arquivos_pulados = self.parse_stats["cache"]
+        metric.detalhes["arquivos_com_falha"] = self.parse_stats["falhas"]
+        if self.file_timings:
+            metric.detalhes["tempos_arquivos_s"] = {
+                name: round(seconds, 6) for name, seconds in self.parse_timings.items()
+            }
+
+    def _start_run_metrics(self, execucao: str) -> RunMetrics:
+        self.run_metrics = RunMetrics(
+            parametros={
+                "execucao": execucao,
+                "backend": self.backend.nome,
+                "load_mode": self.load_mode,
+                "ods_reader": self.ods_reader,
+                "parse_workers": self.parse_workers,
+                "download_workers": self.download_workers,
+                "pipelined": self.pipelined,
+                "parse_cache": self.parse_cache is not None,
+                "materialized_views": self.materialized_views,
+                "metrics": list(self.metrics),
+            },
+            log_path=self.metrics_log,
+        )
+        return self.run_metrics
 
-        logging.info("Mapeando chaves estrangeiras para a tabela fato.")
-        dim_servico_db = pd.read_sql("SELECT id_servico, nome_servico FROM dim_servico", self.engine)
-        dim_grupo_db = pd.read_sql("SELECT id_grupo, nome_grupo FROM dim_grupo_economico", self.engine)
-        dim_tempo_db = pd.read_sql("SELECT id_tempo, data_referencia FROM dim_tempo", self.engine)
+    def _download_stage(self, run_metrics: RunMetrics) -> None:
+        from .download import BAIXADO, NAO_MODIFICADO, RETOMADO
 
-        df = pd.merge(df, dim_servico_db, left_on="servico", right_on="nome_servico", how="left")
-        df = pd.merge(df, dim_grupo_db, left_on="grupo_economico", right_on="nome_grupo", how="left")
-        
-        dim_tempo_db['data_referencia'] = pd.to_datetime(dim_tempo_db['data_referencia'])
-        df = pd.merge(df, dim_tempo_db, on="data_referencia", how="left")
+        with run_metrics.stage("download") as metric:
+            results = self._download_source_files()
+            contagem = Counter(result.status for result in results)
+            metric.bytes_baixados = sum(result.bytes_downloaded for result in results)
+            metric.arquivos_processados = contagem[BAIXADO] + contagem[RETOMADO]
+            metric.arquivos_pulados = contagem[NAO_MODIFICADO]
+            metric.detalhes["arquivos_com_falha"] = _falhas_download(contagem)
+            metric.detalhes["status"] = dict(contagem)
 
-        df.rename(columns={
-            "id_tempo": "tempo_id",
-            "id_servico": "servico_id",
-            "id_grupo": "grupo_economico_id",
-            "taxa_resolvidas_5_dias": "valor"
-        }, inplace=True)
+    def run(self) -> RunMetrics:
+        """
+        Executa o pipeline de ETL completo, orquestrando todas as etapas:
+        setup do banco, download, extração, transformação e carga. Com `pipelined`,
+        download e extração rodam sobrepostos, numa única etapa "download_extract".
 
-        df_fato = df[["tempo_id", "servico_id", "grupo_economico_id", "valor"]].copy()
+        Cada etapa é instrumentada (tempo, CPU, memória, linhas e arquivos) e as métricas
+        são emitidas em JSON e gravadas nas tabelas `etl_run` / `etl_stage_metric`,
+        inclusive quando a execução falha.
 
-        logging.info(f"Carregando {len(df_fato)} registros na tabela fato_atendimento.")
-        df_fato.to_sql("fato_atendimento", self.engine, if_exists="append", index=False)
-        
-        logging.info("Carga de dados para o PostgreSQL concluída com sucesso.")
+        Returns:
+            RunMetrics: As métricas da execução, com o status final.
+        """
+        logging.info("--- INICIANDO PIPELINE DE ETL PARA DADOS IDA ---")
+        run_metrics = self._start_run_metrics("completa")
+        try:
+            with run_metrics.stage("setup"):
+                self._setup_database()
+            if self.pipelined:
+                with run_metrics.stage("download_extract") as metric:
+                    results = self.download_and_extract()
+                    metric.bytes_baixados = sum(result.bytes_downloaded for result in results)
+                    metric.linhas_saida = sum(len(df) for df in self.cleaned_data.values())
+                    self._record_parse_metrics(metric)
+                    contagem = Counter(result.status for result in results)
+                    metric.detalhes["downloads_com_falha"] = _falhas_download(contagem)
+                    metric.detalhes["status"] = dict(contagem)
+            else:
+                self._download_stage(run_metrics)
+                with run_metrics.stage("extract") as metric:
+                    self.extract_and_clean()
+                    metric.linhas_saida = sum(len(df) for df in self.cleaned_data.values())
+                    self._record_parse_metrics(metric)
+            with run_metrics.stage("transform") as metric:
+                metric.linhas_entrada = sum(len(df) for df in self.cleaned_data.values())
+                self.transform()
+                metric.linhas_saida = len(self.final_df)
+            with run_metrics.stage("load") as metric:
+                metric.linhas_entrada = len(self.final_df)
+                stats = self.load()
+                if stats is not None:
+                    metric.linhas_saida = stats["inseridos"] + stats["atualizados"]
+                    metric.detalhes.update(stats)
+                else:
+                    metric.linhas_saida = len(self.final_df)
+            run_metrics.finish(SUCESSO)
+            logging.info("ETL concluído com sucesso.")
+        except Exception as e:
+            run_metrics.finish(FALHA, str(e))
+            logging.error(f"Ocorreu um erro durante a execução do pipeline: {e}")
+        finally:
+            self.backend.record_run(run_metrics)
+            logging.info("--- FIM DO PIPELINE ---")
+        return run_metrics
 
-    def run(self):
+    def run_streaming(self) -> RunMetrics:
         """
-        Executa o pipeline de ETL completo, orquestrando todas as etapas:
-        setup do banco, download, extração, transformação e carga.
+        Executa o pipeline de ETL completo em modo streaming (baixo uso de memória):
+        os arquivos passam um a um, em blocos, por extração, transformação e carga,
+        sem manter `cleaned_data` nem `final_df` em memória, de acordo com o `load_mode`
+        (ver `load_streaming`). Nesse modo extração, transformação e carga são medidas
+        juntas, na etapa "streaming".
+
+        Returns:
+            RunMetrics: As métricas da execução, com o status final.
         """
-        logging.info("--- INICIANDO PIPELINE DE ETL PARA DADOS IDA ---")
+        logging.info("--- INICIANDO PIPELINE DE ETL PARA DADOS IDA (STREAMING) ---")
+        run_metrics = self._start_run_metrics("streaming")
         try:
-            self._setup_database()
-            self._download_source_files()
-            self.extract_and_clean()
-            self.transform()
-            self.load()
+            with run_metrics.stage("setup"):
+                self._setup_database()
+            self._download_stage(run_metrics)
+            with run_metrics.stage("streaming") as metric:
+                metric.linhas_saida = self.load_streaming(self.iter_transformed_chunks())
+                self._record_parse_metrics(metric)
+            run_metrics.finish(SUCESSO)
             logging.info("ETL concluído com sucesso.")
         except Exception as e:
+            run_metrics.finish(FALHA, str(e))
             logging.error(f"Ocorreu um erro durante a execução do pipeline: {e}")
         finally:
+            self.backend.record_run(run_metrics)
             logging.info("--- FIM DO PIPELINE ---")
+        return run_metrics
+
+
+def _falhas_download(contagem: Counter) -> int:
+    """
+    Conta os downloads que não produziram um arquivo atualizado (nem inalterado) no disco.
+    """
+    from .download import CANCELADO, FALHOU, NAO_ENCONTRADO
+
+    return sum(contagem[status] for status in (FALHOU, NAO_ENCONTRADO, CANCELADO))
+
+
+def _read_ods_file(
+    file_path: Path, reader: str = "odf", metrics: Iterable[str] = METRICAS_ALVO
+) -> pd.DataFrame:
+    """
+    Lê um arquivo .ods e aplica a limpeza básica: remove linhas e colunas vazias
+    e padroniza as colunas de data. Definida no nível do módulo para poder ser
+    executada pelos workers do pool de processos.
+
+    Com `reader="stream"` o arquivo é lido pelo leitor em streaming, que só mantém
+    as linhas das métricas informadas.
+    """
+    if reader == "stream":
+        return read_ods_filtered(
+            file_path, metrics, column_formatter=EtlPipeline._reformat_date_columns
+        )
+    df = pd.read_excel(file_path, engine="odf", header=8)
+    df.dropna(how="all", axis=1, inplace=True)
+    df.dropna(how="all", axis=0, inplace=True)
+    df.columns = EtlPipeline._reformat_date_columns(df.columns)
+    return df
+
+
+def _timed_read_ods_file(
+    file_path: Path, reader: str = "odf", metrics: Iterable[str] = METRICAS_ALVO
+) -> Tuple[pd.DataFrame, float]:
+    """
+    Executa `_read_ods_file` e retorna também o tempo de leitura, em segundos, medido
+    no próprio worker.
+    """
+    inicio = time.perf_counter()
+    df = _read_ods_file(file_path, reader, metrics)
+    return df, time.perf_counter() - inicio
+
+
+def pipeline_from_env(use_parse_cache: Optional[bool] = None, **overrides) -> EtlPipeline:
+    """
+    Constrói o pipeline a partir das variáveis de ambiente (`POSTGRES_*` e `ETL_*`).
+
+    Args:
+        use_parse_cache (bool, opcional): Liga ou desliga o cache de parsing,
+            sobrepondo `ETL_PARSE_CACHE`.
+        **overrides: Argumentos do `EtlPipeline` que sobrepõem o ambiente. Valores
+            `None` são ignorados.
+    """
+    if use_parse_cache is None:
+        use_parse_cache = os.getenv("ETL_PARSE_CACHE", "1") != "0"
+    parse_cache = None
+    if use_parse_cache:
+        parse_cache = ParseCache(
+            Path(os.getenv("ETL_PARSE_CACHE_DIR", CACHE_DIR)),
+            max_bytes=int(os.getenv("ETL_PARSE_CACHE_MAX_BYTES", MAX_BYTES)),
+        )
+    metrics_log = os.getenv("ETL_METRICS_LOG")
+
+    kwargs = dict(
+        input_dir=INPUT_DIR,
+        db_url=database_url(),
+        base_url=source_base_url(),
+        download_workers=int(os.getenv("ETL_DOWNLOAD_WORKERS", "4")),
+        parse_workers=int(os.getenv("ETL_PARSE_WORKERS", "1")),
+        ods_reader=os.getenv("ETL_ODS_READER", "odf"),
+        parse_cache=parse_cache,
+        load_mode=os.getenv("ETL_LOAD_MODE", "replace"),
+        metrics=[m for m in os.getenv("ETL_METRICAS", ";".join(METRICAS_ALVO)).split(";") if m.strip()],
+        materialized_views=os.getenv("ETL_MATERIALIZED_VIEWS", "0") == "1",
+        chunk_rows=int(os.getenv("ETL_CHUNK_ROWS", "50000")),
+        metrics_log=Path(metrics_log) if metrics_log else None,
+        file_timings=os.getenv("ETL_FILE_TIMINGS", "0") == "1",
+        pipelined=os.getenv("ETL_PIPELINED", "0") == "1",
+    )
+    kwargs.update({key: value for key, value in overrides.items() if value is not None})
+    return EtlPipeline(**kwargs)
 
 
 def main():
     """
     Ponto de entrada principal do script.
-    Configura e executa o pipeline de ETL.
+    Configura e executa o pipeline de ETL completo. Para executar etapas isoladas,
+    use a linha de comando `python -m src`.
     """
     try:
-        db_user = os.getenv("POSTGRES_USER", "default_user")
-        db_password = os.getenv("POSTGRES_PASSWORD", "default_password")
-        db_host = os.getenv("POSTGRES_HOST", "localhost")
-        db_port = os.getenv("POSTGRES_PORT", "5432")
-        db_name = os.getenv("POSTGRES_DB", "default_db")
-
-        database_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-        
-        pipeline = EtlPipeline(input_dir=INPUT_DIR, db_url=database_url)
-        pipeline.run()
+        pipeline = pipeline_from_env()
+        if os.getenv("ETL_STREAMING", "0") == "1":
+            pipeline.run_streaming()
+        else:
+            pipeline.run()
 
     except Exception as e:
         logging.error(f"Falha ao iniciar o pipeline de ETL: {e}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,247 @@
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, CPU e memória ficam sem medição.
+    resource = None
+
+# Status de uma execução ou etapa.
+EM_EXECUCAO = "em_execucao"
+SUCESSO = "sucesso"
+FALHA = "falha"
+
+# Logger dedicado às linhas JSON de métricas, para que possam ser filtradas do log comum.
+metrics_logger = logging.getLogger("etl.metricas")
+
+
+def _cpu_seconds() -> Optional[float]:
+    """
+    Tempo de CPU (usuário + sistema) do processo e dos processos filhos já finalizados,
+    como os workers de parsing.
+    """
+    if resource is None:
+        return None
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _reset_peak_rss() -> None:
+    """
+    Zera a marca de pico de memória (VmHWM) do processo, quando o kernel permite
+    (Linux), para que o pico medido seja o da etapa e não o de toda a execução.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """
+    Pico de memória residente do processo, em MiB.
+    """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # Sem /proc o valor é o pico de toda a vida do processo (KiB no Linux).
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+def _children_peak_rss_mb() -> Optional[float]:
+    """
+    Maior pico de memória residente, em MiB, entre os processos filhos já finalizados
+    (ex: workers de parsing). O valor só cresce ao longo da vida do processo.
+    """
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 2)
+
+
+@dataclass
+class StageMetric:
+    """
+    Métricas de uma etapa do pipeline. Os contadores que não se aplicam à etapa ficam `None`.
+    `pico_rss_mb` é o pico do processo durante a etapa (ou dos workers que terminaram nela).
+    """
+    etapa: str
+    iniciado_em: datetime
+    duracao_s: float = 0.0
+    cpu_s: Optional[float] = None
+    pico_rss_mb: Optional[float] = None
+    linhas_entrada: Optional[int] = None
+    linhas_saida: Optional[int] = None
+    bytes_baixados: Optional[int] = None
+    arquivos_processados: Optional[int] = None
+    arquivos_pulados: Optional[int] = None
+    status: str = EM_EXECUCAO
+    erro: Optional[str] = None
+    detalhes: Dict = field(default_factory=dict)
+
+
+class RunMetrics:
+    """
+    Coleta as métricas de uma execução do pipeline, etapa a etapa.
+
+    Cada etapa é medida com o gerenciador de contexto `stage`, que registra tempo de parede,
+    tempo de CPU e pico de memória; a etapa preenche os contadores (linhas, bytes, arquivos)
+    no objeto recebido. Ao fim de cada etapa e da execução uma linha JSON é emitida no
+    logger `etl.metricas` e, se `log_path` for informado, acrescentada a esse arquivo
+    (formato JSON Lines). `persist` grava tudo nas tabelas `etl_run` e `etl_stage_metric`.
+    """
+
+    def __init__(self, parametros: Optional[Dict] = None, log_path: Optional[Path] = None):
+        """
+        Constrói uma instância do RunMetrics.
+
+        Args:
+            parametros (Dict, opcional): Configuração da execução (modo de carga, leitor...),
+                registrada junto com as métricas.
+            log_path (Path, opcional): Arquivo JSON Lines que recebe as métricas.
+        """
+        self.run_id = uuid.uuid4().hex
+        self.parametros = parametros or {}
+        self.log_path = log_path
+        self.iniciado_em = datetime.now(timezone.utc)
+        self.finalizado_em: Optional[datetime] = None
+        self.status = EM_EXECUCAO
+        self.erro: Optional[str] = None
+        self.stages: List[StageMetric] = []
+
+    @contextmanager
+    def stage(self, etapa: str) -> Iterator[StageMetric]:
+        """
+        Mede uma etapa. Se a etapa levantar uma exceção, ela é registrada com status de
+        falha e a exceção é propagada.
+        """
+        metric = StageMetric(etapa=etapa, iniciado_em=datetime.now(timezone.utc))
+        _reset_peak_rss()
+        children_peak_inicio = _children_peak_rss_mb()
+        cpu_inicio = _cpu_seconds()
+        inicio = time.perf_counter()
+        try:
+            yield metric
+            metric.status = SUCESSO
+        except Exception as e:
+            metric.status = FALHA
+            metric.erro = str(e)
+            raise
+        finally:
+            metric.duracao_s = round(time.perf_counter() - inicio, 6)
+            cpu_fim = _cpu_seconds()
+            if cpu_inicio is not None and cpu_fim is not None:
+                metric.cpu_s = round(cpu_fim - cpu_inicio, 6)
+            metric.pico_rss_mb = _peak_rss_mb()
+            children_peak = _children_peak_rss_mb()
+            if children_peak is not None and children_peak != children_peak_inicio:
+                # Um filho que terminou durante a etapa usou mais memória que os anteriores.
+                metric.pico_rss_mb = max(metric.pico_rss_mb or 0.0, children_peak)
+            self.stages.append(metric)
+            self._emit("etapa", _serializable(asdict(metric)))
+
+    def finish(self, status: str, erro: Optional[str] = None) -> None:
+        """
+        Encerra a execução com o status final.
+        """
+        self.status = status
+        self.erro = erro
+        self.finalizado_em = datetime.now(timezone.utc)
+        self._emit("execucao", {k: v for k, v in self.to_dict().items() if k != "etapas"})
+
+    def to_dict(self) -> Dict:
+        return _serializable({
+            "run_id": self.run_id,
+            "iniciado_em": self.iniciado_em,
+            "finalizado_em": self.finalizado_em,
+            "status": self.status,
+            "erro": self.erro,
+            "parametros": self.parametros,
+            "etapas": [asdict(stage) for stage in self.stages],
+        })
+
+    def _emit(self, evento: str, payload: Dict) -> None:
+        line = json.dumps({"evento": evento, "run_id": self.run_id, **payload}, ensure_ascii=False)
+        metrics_logger.info(line)
+        if self.log_path is not None:
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logging.warning(f"Falha ao gravar as métricas em '{self.log_path}': {e}")
+
+    def persist(self, engine) -> Optional[int]:
+        """
+        Grava a execução e suas etapas nas tabelas `etl_run` e `etl_stage_metric`.
+        Falhas são apenas registradas no log, para não mascarar o resultado do pipeline.
+
+        Returns:
+            Optional[int]: O `id_execucao` gravado, ou `None` em caso de falha.
+        """
+        # Importados aqui para que medir uma execução não carregue o SQLAlchemy.
+        from sqlalchemy import insert
+
+        from .models import EtlRun, EtlStageMetric
+
+        try:
+            with engine.begin() as connection:
+                run_id = connection.execute(
+                    insert(EtlRun)
+                    .values(
+                        run_uuid=self.run_id,
+                        iniciado_em=self.iniciado_em,
+                        finalizado_em=self.finalizado_em,
+                        status=self.status,
+                        erro=self.erro,
+                        parametros=_serializable(self.parametros),
+                    )
+                    .returning(EtlRun.id_execucao)
+                ).scalar_one()
+                if self.stages:
+                    connection.execute(
+                        insert(EtlStageMetric),
+                        [
+                            {**_serializable(asdict(stage), datas=False), "execucao_id": run_id, "ordem": ordem}
+                            for ordem, stage in enumerate(self.stages, start=1)
+                        ],
+                    )
+            return run_id
+        except Exception as e:
+            logging.warning(f"Falha ao gravar as métricas da execução no banco: {e}")
+            return None
+
+
+def _serializable(value, datas: bool = True):
+    """
+    Converte recursivamente um valor para tipos aceitos pelo JSON. Com `datas=False`
+    os `datetime` do primeiro nível são mantidos (para gravação no banco).
+    """
+    if isinstance(value, dict):
+        return {
+            str(k): (v if not datas and isinstance(v, datetime) else _serializable(v))
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_serializable(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Path):
+        return str(value)
+    if hasattr(value, "item"):  # escalares do numpy
+        return value.item()
+    return value
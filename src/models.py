@@ -1,13 +1,20 @@
 # models.py
 
 from sqlalchemy import (
+    JSON,
+    BigInteger,
     Column,
     Integer,
     String,
     Date,
+    DateTime,
+    Float,
     Numeric,
     ForeignKey,
+    Index,
+    Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -61,24 +68,227 @@ class DimServico(Base):
     atendimentos = relationship("FatoAtendimento", back_populates="servico")
 
 
+class DimMetrica(Base):
+    """
+    Modelo ORM para a tabela de dimensão de Métrica.
+    Armazena os indicadores (valores da coluna VARIÁVEL) carregados no Data Mart.
+    """
+    __tablename__ = "dim_metrica"
+    __table_args__ = {"comment": "Dimensão que armazena os indicadores (métricas) de atendimento."}
+
+    id_metrica = Column(Integer, primary_key=True, comment="Chave primária autoincremental da dimensão de métrica.")
+    nome_metrica = Column(String(150), nullable=False, unique=True, comment="Nome único da métrica (ex: Taxa de Respondidas em 5 dias Úteis).")
+
+    atendimentos = relationship("FatoAtendimento", back_populates="metrica")
+
+
 class FatoAtendimento(Base):
     """
     Modelo ORM para a tabela fato de Atendimento.
     Armazena as métricas de desempenho (IDA) e suas chaves para as dimensões.
+
+    A tabela é particionada por faixa (RANGE) de `data_referencia`, com uma partição por ano
+    (ver `ensure_partitions`). Por isso a data também faz parte da chave primária e da
+    constraint única, e as consultas que filtram por período leem apenas as partições
+    envolvidas. As views analíticas leem os agregados pré-calculados, não a fato; o índice
+    por serviço atende ao recálculo desses agregados a partir da fato.
     """
     __tablename__ = "fato_atendimento"
     __table_args__ = (
-        UniqueConstraint("tempo_id", "servico_id", "grupo_economico_id", name="uq_atendimento_contexto"),
-        {"comment": "Tabela fato que armazena as métricas de desempenho de atendimento (IDA)."}
+        UniqueConstraint("tempo_id", "servico_id", "grupo_economico_id", "metrica_id", "data_referencia", name="uq_atendimento_contexto"),
+        # Recálculo dos agregados a partir da fato, um serviço por vez (modos upsert e streaming).
+        Index("ix_fato_servico", "servico_id"),
+        Index("ix_fato_tempo", "tempo_id"),
+        {
+            "comment": "Tabela fato que armazena as métricas de desempenho de atendimento (IDA).",
+            "postgresql_partition_by": "RANGE (data_referencia)",
+        },
     )
 
-    id = Column(Integer, primary_key=True, comment="Chave primária para o registro da fato.")
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="Chave primária para o registro da fato.")
+    data_referencia = Column(Date, primary_key=True, comment="Data de referência (desnormalizada de dim_tempo); chave de particionamento.")
     tempo_id = Column(Integer, ForeignKey("dim_tempo.id_tempo"), comment="Chave estrangeira referenciando a dimensão de tempo (dim_tempo).")
     servico_id = Column(Integer, ForeignKey("dim_servico.id_servico"), comment="Chave estrangeira referenciando a dimensão de serviço (dim_servico).")
     grupo_economico_id = Column(Integer, ForeignKey("dim_grupo_economico.id_grupo"), comment="Chave estrangeira referenciando a dimensão de grupo econômico (dim_grupo_economico).")
-    valor = Column(Numeric(10, 4), comment="O valor da métrica (ex: taxa de resolvidas em 5 dias).")
+    metrica_id = Column(Integer, ForeignKey("dim_metrica.id_metrica"), comment="Chave estrangeira referenciando a dimensão de métrica (dim_metrica).")
+    valor = Column(Numeric(18, 4), comment="O valor da métrica (ex: taxa de resolvidas em 5 dias, total de reclamações).")
 
     # Relacionamentos para facilitar o acesso aos objetos dimensionais
     tempo = relationship("DimTempo", back_populates="atendimentos")
     servico = relationship("DimServico", back_populates="atendimentos")
-    grupo_economico = relationship("DimGrupoEconomico", back_populates="atendimentos")
\ No newline at end of file
+    grupo_economico = relationship("DimGrupoEconomico", back_populates="atendimentos")
+    metrica = relationship("DimMetrica", back_populates="atendimentos")
+
+
+class AggMercadoMensal(Base):
+    """
+    Modelo ORM para o agregado mensal do mercado.
+    Armazena, por serviço e métrica, a média mensal entre os grupos econômicos e sua
+    variação em relação ao mês anterior. Calculado pelo pipeline a cada carga.
+    """
+    __tablename__ = "agg_mercado_mensal"
+    __table_args__ = {"comment": "Média mensal do mercado por serviço e métrica, com a variação mês a mês."}
+
+    data_referencia = Column(Date, primary_key=True, comment="Mês de referência (primeiro dia do mês).")
+    servico = Column(String(50), primary_key=True, comment="Nome do serviço.")
+    metrica = Column(String(150), primary_key=True, comment="Nome da métrica.")
+    media_mercado = Column(Float, nullable=False, comment="Média do valor da métrica entre os grupos econômicos no mês.")
+    variacao_media_mercado = Column(Float, comment="Variação relativa da média do mercado em relação ao mês anterior disponível.")
+    grupos = Column(Integer, nullable=False, comment="Número de grupos econômicos com valor no mês.")
+
+
+class AggGrupoMensal(Base):
+    """
+    Modelo ORM para o agregado mensal por grupo econômico.
+    Armazena, por mês, serviço, grupo e métrica, o valor, sua variação em relação ao mês
+    anterior (absoluta e relativa à do mercado) e o ranking do grupo no mês e serviço.
+    """
+    __tablename__ = "agg_grupo_mensal"
+    __table_args__ = {"comment": "Variação mês a mês e ranking mensal de cada grupo econômico por serviço e métrica."}
+
+    data_referencia = Column(Date, primary_key=True, comment="Mês de referência (primeiro dia do mês).")
+    servico = Column(String(50), primary_key=True, comment="Nome do serviço.")
+    grupo_economico = Column(String(100), primary_key=True, comment="Nome do grupo econômico.")
+    metrica = Column(String(150), primary_key=True, comment="Nome da métrica.")
+    valor = Column(Numeric(18, 4), nullable=False, comment="O valor da métrica no mês.")
+    valor_anterior = Column(Numeric(18, 4), comment="O valor da métrica no mês anterior disponível do grupo.")
+    variacao_mensal = Column(Float, comment="Variação relativa do valor em relação ao mês anterior disponível.")
+    variacao_relativa_mercado = Column(Float, comment="Variação mensal do grupo menos a variação da média do mercado.")
+    ranking = Column(Integer, nullable=False, comment="Posição do grupo no mês, serviço e métrica (maior valor = 1, empates com a mesma posição).")
+
+
+class AggGrupoAnual(Base):
+    """
+    Modelo ORM para o agregado anual por grupo econômico.
+    Armazena média, mínimo e máximo anuais de cada métrica por serviço e grupo.
+    """
+    __tablename__ = "agg_grupo_anual"
+    __table_args__ = {"comment": "Agregados anuais de cada métrica por serviço e grupo econômico."}
+
+    ano = Column(Integer, primary_key=True, comment="Ano de referência.")
+    servico = Column(String(50), primary_key=True, comment="Nome do serviço.")
+    grupo_economico = Column(String(100), primary_key=True, comment="Nome do grupo econômico.")
+    metrica = Column(String(150), primary_key=True, comment="Nome da métrica.")
+    media = Column(Float, nullable=False, comment="Média mensal do valor no ano.")
+    minimo = Column(Numeric(18, 4), nullable=False, comment="Menor valor mensal no ano.")
+    maximo = Column(Numeric(18, 4), nullable=False, comment="Maior valor mensal no ano.")
+    meses = Column(Integer, nullable=False, comment="Número de meses com valor no ano.")
+
+
+class EtlRun(Base):
+    """
+    Modelo ORM para a tabela de execuções do pipeline.
+    Cada linha é uma execução, com seu status final e os parâmetros usados.
+    """
+    __tablename__ = "etl_run"
+    __table_args__ = {"comment": "Execuções do pipeline de ETL, com status e parâmetros."}
+
+    id_execucao = Column(Integer, primary_key=True, comment="Chave primária autoincremental da execução.")
+    run_uuid = Column(String(32), nullable=False, unique=True, comment="Identificador da execução, o mesmo emitido no log JSON de métricas.")
+    iniciado_em = Column(DateTime(timezone=True), nullable=False, comment="Início da execução.")
+    finalizado_em = Column(DateTime(timezone=True), comment="Fim da execução.")
+    status = Column(String(20), nullable=False, comment="Status final da execução (sucesso, falha).")
+    erro = Column(Text, comment="Mensagem de erro, em caso de falha.")
+    parametros = Column(JSON, comment="Parâmetros da execução (modo de carga, leitor, workers...).")
+
+    etapas = relationship("EtlStageMetric", back_populates="execucao")
+
+
+class EtlVersaoDados(Base):
+    """
+    Modelo ORM para a versão dos dados do Data Mart.
+    Tem uma única linha, cuja versão é incrementada ao fim de cada carga bem-sucedida;
+    caches de consultas (ver `src/query.py`) a usam para saber quando os dados mudaram.
+    """
+    __tablename__ = "etl_versao_dados"
+    __table_args__ = {"comment": "Versão dos dados do Data Mart, incrementada a cada carga."}
+
+    id = Column(Integer, primary_key=True, autoincrement=False, comment="Identificador da linha única (sempre 1).")
+    versao = Column(BigInteger, nullable=False, comment="Versão atual dos dados.")
+    atualizado_em = Column(DateTime(timezone=True), nullable=False, comment="Momento da última carga bem-sucedida.")
+
+
+class EtlStageMetric(Base):
+    """
+    Modelo ORM para a tabela de métricas por etapa do pipeline.
+    Armazena tempo, CPU, memória e volumes de cada etapa de cada execução.
+    """
+    __tablename__ = "etl_stage_metric"
+    __table_args__ = (
+        Index("ix_etl_stage_metric_etapa_inicio", "etapa", "iniciado_em"),
+        {"comment": "Métricas de desempenho de cada etapa de cada execução do pipeline."},
+    )
+
+    id = Column(Integer, primary_key=True, comment="Chave primária da métrica.")
+    execucao_id = Column(Integer, ForeignKey("etl_run.id_execucao", ondelete="CASCADE"), nullable=False, comment="Chave estrangeira referenciando a execução (etl_run).")
+    ordem = Column(Integer, nullable=False, comment="Posição da etapa na execução.")
+    etapa = Column(String(30), nullable=False, comment="Nome da etapa (setup, download, extract, transform, load...).")
+    iniciado_em = Column(DateTime(timezone=True), nullable=False, comment="Início da etapa.")
+    duracao_s = Column(Float, comment="Tempo de parede, em segundos.")
+    cpu_s = Column(Float, comment="Tempo de CPU (usuário + sistema, incluindo processos filhos), em segundos.")
+    pico_rss_mb = Column(Float, comment="Pico de memória residente durante a etapa, em MiB.")
+    linhas_entrada = Column(BigInteger, comment="Linhas recebidas pela etapa.")
+    linhas_saida = Column(BigInteger, comment="Linhas produzidas (ou gravadas) pela etapa.")
+    bytes_baixados = Column(BigInteger, comment="Bytes baixados (etapa de download).")
+    arquivos_processados = Column(Integer, comment="Arquivos baixados ou lidos.")
+    arquivos_pulados = Column(Integer, comment="Arquivos pulados (inalterados no servidor ou recuperados do cache).")
+    status = Column(String(20), nullable=False, comment="Status da etapa (sucesso, falha).")
+    erro = Column(Text, comment="Mensagem de erro, em caso de falha.")
+    detalhes = Column(JSON, comment="Detalhes adicionais, como os tempos por arquivo e os contadores da carga.")
+
+    execucao = relationship("EtlRun", back_populates="etapas")
+
+
+def partition_name(ano: int) -> str:
+    """
+    Nome da partição anual da tabela fato.
+    """
+    return f"{FatoAtendimento.__tablename__}_{ano}"
+
+
+def _partition_bounds(ano: int) -> str:
+    return f"FOR VALUES FROM ('{ano}-01-01') TO ('{ano + 1}-01-01')"
+
+
+def partition_ddl(anos) -> list:
+    """
+    Monta o DDL que cria (se ainda não existirem) as partições anuais da tabela fato para
+    os anos informados. Não há partição DEFAULT: ela impediria o `DETACH ... CONCURRENTLY`
+    e obrigaria cada nova partição a varrê-la; por isso os anos são criados antes da carga.
+    """
+    tabela = FatoAtendimento.__tablename__
+    return [
+        f"CREATE TABLE IF NOT EXISTS {partition_name(ano)} PARTITION OF {tabela} {_partition_bounds(ano)}"
+        for ano in sorted(set(int(ano) for ano in anos))
+    ]
+
+
+def ensure_partitions(connection, anos) -> None:
+    """
+    Garante que existam as partições anuais da tabela fato para os anos informados.
+    Deve ser chamada antes de carregar dados de um ano novo.
+    """
+    for statement in partition_ddl(anos):
+        connection.execute(text(statement))
+
+
+def detach_partition(connection, ano: int, concurrently: bool = False) -> None:
+    """
+    Desanexa a partição de um ano da tabela fato, sem reescrever a tabela. A partição
+    continua existindo como tabela comum e pode ser arquivada ou anexada de novo.
+    Com `concurrently=True` o comando não bloqueia as leituras, mas não pode rodar
+    dentro de uma transação.
+    """
+    modo = " CONCURRENTLY" if concurrently else ""
+    connection.execute(text(
+        f"ALTER TABLE {FatoAtendimento.__tablename__} DETACH PARTITION {partition_name(ano)}{modo}"
+    ))
+
+
+def attach_partition(connection, ano: int) -> None:
+    """
+    Anexa de volta à tabela fato a partição (tabela) de um ano, sem reescrever a tabela.
+    """
+    connection.execute(text(
+        f"ALTER TABLE {FatoAtendimento.__tablename__} ATTACH PARTITION {partition_name(ano)} {_partition_bounds(ano)}"
+    ))
@@ -0,0 +1,171 @@
+import zipfile
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from xml.etree.ElementTree import Element, iterparse
+
+import pandas as pd
+
+# Namespaces do formato OpenDocument usados no content.xml.
+TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+_TABLE = f"{{{TABLE_NS}}}table"
+_ROW = f"{{{TABLE_NS}}}table-row"
+_CELL = f"{{{TABLE_NS}}}table-cell"
+_COVERED_CELL = f"{{{TABLE_NS}}}covered-table-cell"
+_COLS_REPEATED = f"{{{TABLE_NS}}}number-columns-repeated"
+_ROWS_REPEATED = f"{{{TABLE_NS}}}number-rows-repeated"
+_VALUE_TYPE = f"{{{OFFICE_NS}}}value-type"
+_VALUE = f"{{{OFFICE_NS}}}value"
+_DATE_VALUE = f"{{{OFFICE_NS}}}date-value"
+_BOOLEAN_VALUE = f"{{{OFFICE_NS}}}boolean-value"
+_ANNOTATION = f"{{{OFFICE_NS}}}annotation"
+_TEXT_S = f"{{{TEXT_NS}}}s"
+_TEXT_C = f"{{{TEXT_NS}}}c"
+
+COLUNA_VARIAVEL = "VARIÁVEL"
+
+
+def _cell_text(element: Element) -> str:
+    """
+    Concatena o texto de uma célula, expandindo as tags `text:s` (sequências de espaços)
+    e ignorando anotações, da mesma forma que o leitor `odf` do pandas.
+    """
+    value = [(element.text or "").strip("\n")]
+    for child in element:
+        if child.tag == _TEXT_S:
+            value.append(" " * int(child.get(_TEXT_C, 1)))
+        elif child.tag != _ANNOTATION:
+            value.append(_cell_text(child))
+        value.append((child.tail or "").strip("\n"))
+    return "".join(value)
+
+
+def _cell_value(cell: Element):
+    """
+    Converte uma célula ODS no valor Python equivalente ao produzido pelo `pd.read_excel`.
+    """
+    cell_type = cell.get(_VALUE_TYPE)
+    if cell_type is None:
+        return None
+    if cell_type == "float":
+        value = float(cell.get(_VALUE))
+        return int(value) if int(value) == value else value
+    if cell_type in ("percentage", "currency"):
+        return float(cell.get(_VALUE))
+    if cell_type == "date":
+        return pd.Timestamp(cell.get(_DATE_VALUE))
+    if cell_type == "boolean":
+        return cell.get(_BOOLEAN_VALUE) == "true"
+    text = _cell_text(cell)
+    if text == "#N/A":
+        return None
+    return text
+
+
+def iter_ods_rows(file_path: Path) -> Iterator[List]:
+    """
+    Percorre incrementalmente as linhas da primeira planilha de um arquivo .ods.
+
+    O `content.xml` é lido em streaming direto do zip, sem montar a árvore DOM inteira:
+    cada linha é liberada da memória assim que é emitida. Células e linhas repetidas
+    (`number-columns-repeated` / `number-rows-repeated`) são expandidas, exceto as
+    sequências de células vazias no fim da linha e as linhas totalmente vazias,
+    que não carregam informação.
+
+    Yields:
+        List: Os valores de cada linha não vazia, na ordem das colunas.
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open("content.xml") as content:
+        depth = 0
+        row: List = []
+        pending_empty = 0
+        for event, element in iterparse(content, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == _TABLE:
+                    depth += 1
+                elif tag == _ROW and depth == 1:
+                    row, pending_empty = [], 0
+                continue
+
+            if tag in (_CELL, _COVERED_CELL) and depth == 1:
+                repeat = int(element.get(_COLS_REPEATED, 1))
+                value = _cell_value(element) if tag == _CELL else None
+                if value is None:
+                    # Células vazias só entram na linha se houver algum valor depois delas.
+                    pending_empty += repeat
+                else:
+                    row.extend([None] * pending_empty)
+                    row.extend([value] * repeat)
+                    pending_empty = 0
+                element.clear()
+            elif tag == _ROW and depth == 1:
+                if row:
+                    for _ in range(int(element.get(_ROWS_REPEATED, 1))):
+                        yield list(row)
+                element.clear()
+            elif tag == _TABLE:
+                depth -= 1
+                if depth == 0:
+                    # Assim como o `pd.read_excel`, apenas a primeira planilha é lida.
+                    return
+
+
+def read_ods_filtered(
+    file_path: Path,
+    metrics: Iterable[str],
+    column_formatter: Optional[Callable[[Sequence], List]] = None,
+    columns: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """
+    Lê um arquivo .ods em streaming, mantendo apenas as linhas das métricas pedidas.
+
+    A linha de cabeçalho é localizada pela coluna `VARIÁVEL`; as linhas seguintes só são
+    materializadas se o valor dessa coluna (sem espaços nas pontas) estiver em `metrics`.
+
+    Args:
+        file_path (Path): O arquivo .ods a ser lido.
+        metrics (Iterable[str]): Os valores de `VARIÁVEL` que devem ser mantidos.
+        column_formatter (Callable, opcional): Função aplicada aos nomes das colunas,
+            ex: `EtlPipeline._reformat_date_columns`.
+        columns (Iterable[str], opcional): Se informado, apenas estas colunas (já formatadas)
+            são mantidas no resultado.
+
+    Returns:
+        pd.DataFrame: As linhas filtradas, sem linhas ou colunas totalmente vazias.
+    """
+    metrics = {metric.strip() for metric in metrics}
+    rows = iter_ods_rows(file_path)
+
+    header = None
+    for row in rows:
+        if any(isinstance(value, str) and value.strip() == COLUNA_VARIAVEL for value in row):
+            header = row
+            break
+    if header is None:
+        raise ValueError(f"Cabeçalho com a coluna '{COLUNA_VARIAVEL}' não encontrado em {file_path.name}.")
+
+    names = column_formatter(header) if column_formatter else list(header)
+    keep = [i for i, name in enumerate(names) if name is not None and name != ""]
+    if columns is not None:
+        wanted = set(columns) | {COLUNA_VARIAVEL}
+        keep = [i for i in keep if names[i] in wanted]
+    variable_idx = next(i for i, name in enumerate(header) if isinstance(name, str) and name.strip() == COLUNA_VARIAVEL)
+
+    data = []
+    for row in rows:
+        if variable_idx >= len(row):
+            continue
+        variable = row[variable_idx]
+        if not isinstance(variable, str) or variable.strip() not in metrics:
+            continue
+        data.append([row[i] if i < len(row) else None for i in keep])
+
+    df = pd.DataFrame(data, columns=[names[i] for i in keep])
+    if df.empty:
+        return df
+    df.dropna(how="all", axis=1, inplace=True)
+    df.dropna(how="all", axis=0, inplace=True)
+    return df
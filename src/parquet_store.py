@@ -0,0 +1,301 @@
+import argparse
+import logging
+import os
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import BigInteger, Date, Float, Integer, Numeric
+
+from .config import PARQUET_DIR, database_url, parquet_dir
+from .database import MART_TABLES, STAR_TABLES
+from .models import Base
+from .views import ANALYTIC_VIEWS, view_ddl
+
+# Arquivo, na raiz do diretório, com o nome da versão publicada. É trocado atomicamente
+# ao fim de cada carga, então os leitores veem a versão anterior ou a nova, nunca uma
+# carga pela metade.
+ARQUIVO_VERSAO = "VERSAO_ATUAL"
+
+# Versões mantidas em disco após uma publicação: a publicada e a imediatamente anterior.
+VERSOES_MANTIDAS = 2
+
+
+def _arrow_type(column) -> pa.DataType:
+    """
+    Tipo Arrow equivalente ao tipo SQLAlchemy de uma coluna dos modelos. Colunas NUMERIC
+    são gravadas como `float64`, o mesmo tipo que as consultas ao PostgreSQL devolvem
+    para elas nos DataFrames, para que os dois backends retornem os mesmos tipos.
+    """
+    tipo = column.type
+    if isinstance(tipo, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(tipo, BigInteger):
+        return pa.int64()
+    if isinstance(tipo, Integer):
+        return pa.int32()
+    if isinstance(tipo, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def table_schema(table: str) -> pa.Schema:
+    """
+    Schema Arrow de uma tabela do Data Mart, derivado do modelo ORM (mesmas colunas e
+    tipos equivalentes aos do PostgreSQL).
+    """
+    return pa.schema([(column.name, _arrow_type(column)) for column in Base.metadata.tables[table].columns])
+
+
+def _to_arrow(table: str, frame: pd.DataFrame, first_id: int) -> pa.Table:
+    """
+    Converte um DataFrame para o schema da tabela. Colunas inteiras de chave primária
+    ausentes no DataFrame (ex: o `id` da fato) são numeradas em sequência a partir de
+    `first_id`, como as sequências do PostgreSQL.
+    """
+    columns = Base.metadata.tables[table].columns
+    arrays = []
+    for field in table_schema(table):
+        if field.name in frame.columns:
+            values = frame[field.name]
+            scale = getattr(columns[field.name].type, "scale", None)
+            if scale is not None:
+                # Mesmo arredondamento do NUMERIC(p, s) do PostgreSQL.
+                values = values.astype(float).round(scale)
+            arrays.append(pa.array(values, from_pandas=True).cast(field.type))
+        elif columns[field.name].primary_key and pa.types.is_integer(field.type):
+            arrays.append(pa.array(range(first_id, first_id + len(frame)), type=field.type))
+        else:
+            raise ValueError(f"Coluna '{field.name}' ausente no DataFrame da tabela {table}.")
+    return pa.Table.from_arrays(arrays, schema=table_schema(table))
+
+
+def _connect(directory: Path, tables: Iterable[str] = MART_TABLES, analytic_views: bool = True):
+    """
+    Abre uma conexão DuckDB em memória com as tabelas de uma versão do Data Mart (views
+    sobre os arquivos Parquet) e as views analíticas no dialeto do DuckDB.
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError(
+            "O backend Parquet precisa do DuckDB para consultas: instale o extra `duckdb` "
+            "(ex: `uv sync --extra duckdb`)."
+        ) from e
+
+    connection = duckdb.connect()
+    for table in tables:
+        padrao = str(directory / table / "*.parquet").replace("'", "''")
+        connection.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{padrao}')")
+    if analytic_views:
+        for name in ANALYTIC_VIEWS:
+            connection.execute(view_ddl(name, "duckdb"))
+    return connection
+
+
+class ParquetWriter:
+    """
+    Grava uma versão do Data Mart em Parquet: um diretório por tabela, com um arquivo
+    por bloco gravado (`<tabela>/part-00000.parquet`, ...).
+    """
+
+    def __init__(self, directory: Path):
+        """
+        Constrói uma instância do ParquetWriter.
+
+        Args:
+            directory (Path): Diretório da versão sendo gravada.
+        """
+        self.directory = directory
+        self.linhas: Counter = Counter()
+        self._partes: Counter = Counter()
+
+    def append(self, table: str, frame: pd.DataFrame) -> None:
+        """
+        Acrescenta um bloco de registros a uma tabela, num novo arquivo Parquet.
+        """
+        arrow_table = _to_arrow(table, frame, first_id=self.linhas[table] + 1)
+        table_dir = self.directory / table
+        table_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(arrow_table, table_dir / f"part-{self._partes[table]:05d}.parquet")
+        self._partes[table] += 1
+        self.linhas[table] += len(frame)
+
+    def close(self) -> None:
+        """
+        Grava um arquivo vazio (apenas com o schema) para as tabelas que não receberam
+        registros, para que todas possam ser consultadas.
+        """
+        for table in MART_TABLES:
+            if not self._partes[table]:
+                (self.directory / table).mkdir(parents=True, exist_ok=True)
+                pq.write_table(table_schema(table).empty_table(), self.directory / table / "part-00000.parquet")
+                self._partes[table] += 1
+
+    def facts_by_service(self) -> Iterator[pd.DataFrame]:
+        """
+        Lê de volta os registros da fato já gravados, um serviço por vez, no formato de
+        `final_df` (ex: para calcular os agregados de uma carga em streaming).
+        """
+        connection = _connect(self.directory, STAR_TABLES, analytic_views=False)
+        try:
+            servicos = [row[0] for row in connection.execute("SELECT id_servico FROM dim_servico ORDER BY id_servico").fetchall()]
+            for servico_id in servicos:
+                df = connection.execute(
+                    "SELECT f.data_referencia, s.nome_servico AS servico, g.nome_grupo AS grupo_economico, "
+                    "m.nome_metrica AS metrica, f.valor "
+                    "FROM fato_atendimento f "
+                    "JOIN dim_servico s ON f.servico_id = s.id_servico "
+                    "JOIN dim_grupo_economico g ON f.grupo_economico_id = g.id_grupo "
+                    "JOIN dim_metrica m ON f.metrica_id = m.id_metrica "
+                    "WHERE f.servico_id = ?",
+                    [servico_id],
+                ).df()
+                if df.empty:
+                    continue
+                df["data_referencia"] = pd.to_datetime(df["data_referencia"])
+                yield df
+        finally:
+            connection.close()
+
+
+class ParquetStore:
+    """
+    Data Mart em arquivos Parquet, servido pelo DuckDB: uma alternativa ao PostgreSQL para
+    análises locais, sem servidor.
+
+    Cada carga grava uma versão completa num subdiretório novo (`v<data e hora>/`) e só
+    então a publica, trocando atomicamente o arquivo `VERSAO_ATUAL`. A versão anterior é
+    mantida para as consultas que ainda a estejam lendo; as mais antigas são removidas.
+
+    As consultas de uma versão reaproveitam uma única conexão DuckDB, aberta (com as
+    views sobre os arquivos) na primeira consulta à versão e fechada quando a versão
+    deixa de ser mantida.
+    """
+
+    def __init__(self, root: Path):
+        """
+        Constrói uma instância do ParquetStore.
+
+        Args:
+            root (Path): Diretório raiz do Data Mart em Parquet.
+        """
+        self.root = root
+        self._conexoes: Dict[Path, object] = {}
+        self._lock = threading.Lock()
+
+    def setup(self) -> None:
+        """
+        Garante que o diretório raiz exista.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def current_version(self) -> Optional[Path]:
+        """
+        Retorna o diretório da versão publicada, ou None se nenhuma carga foi publicada.
+        """
+        try:
+            versao = (self.root / ARQUIVO_VERSAO).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        return self.root / versao
+
+    def _versions(self) -> List[Path]:
+        return sorted(path for path in self.root.glob("v*") if path.is_dir())
+
+    @contextmanager
+    def writer(self) -> Iterator[ParquetWriter]:
+        """
+        Abre a gravação de uma nova versão. Se o bloco terminar sem erros a versão é
+        publicada; caso contrário ela é descartada e a versão publicada não muda.
+        """
+        self.setup()
+        versao = datetime.now().strftime("v%Y%m%d%H%M%S%f")
+        writer = ParquetWriter(self.root / versao)
+        try:
+            yield writer
+            writer.close()
+        except Exception:
+            shutil.rmtree(writer.directory, ignore_errors=True)
+            raise
+        self._publish(versao)
+        logging.info(f"Versão '{versao}' do Data Mart em Parquet publicada: {dict(writer.linhas)}")
+
+    def _publish(self, versao: str) -> None:
+        """
+        Publica uma versão e remove as versões anteriores, exceto a imediatamente anterior.
+        """
+        tmp_path = self.root / f"{ARQUIVO_VERSAO}.tmp"
+        tmp_path.write_text(versao, encoding="utf-8")
+        os.replace(tmp_path, self.root / ARQUIVO_VERSAO)
+        anteriores = [path for path in self._versions() if path.name < versao]
+        for path in anteriores[:1 - VERSOES_MANTIDAS]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def connect(self, directory: Optional[Path] = None):
+        """
+        Retorna uma conexão DuckDB (um cursor da conexão compartilhada da versão) sobre a
+        versão publicada, ou sobre a versão `directory` (ex: uma obtida antes com
+        `current_version`), com as tabelas do Data Mart e as views analíticas. A conexão
+        continua lendo a mesma versão mesmo que uma nova seja publicada depois; quem a
+        recebe deve fechá-la ao terminar.
+        """
+        directory = directory or self.current_version()
+        if directory is None:
+            raise FileNotFoundError(f"Nenhuma carga publicada em '{self.root}'. Execute o pipeline antes.")
+        with self._lock:
+            connection = self._conexoes.get(directory)
+            if connection is None:
+                connection = self._conexoes[directory] = _connect(directory)
+                # Fecha as conexões das versões que já não são mantidas em disco.
+                for antiga in sorted(self._conexoes, key=lambda path: path.name)[:-VERSOES_MANTIDAS]:
+                    if antiga != directory:
+                        self._conexoes.pop(antiga).close()
+            return connection.cursor()
+
+    def close(self) -> None:
+        """
+        Fecha as conexões DuckDB abertas pelas consultas.
+        """
+        with self._lock:
+            for connection in self._conexoes.values():
+                connection.close()
+            self._conexoes.clear()
+
+    def query(self, sql: str) -> pd.DataFrame:
+        """
+        Executa uma consulta SQL (dialeto do DuckDB) sobre a versão publicada.
+        """
+        connection = self.connect()
+        try:
+            return connection.execute(sql).df()
+        finally:
+            connection.close()
+
+
+def main():
+    """
+    Linha de comando para consultar o Data Mart em Parquet.
+    """
+    parser = argparse.ArgumentParser(description="Consulta o Data Mart em Parquet com o DuckDB.")
+    parser.add_argument("consulta", help='Consulta SQL, ex: "SELECT * FROM vw_ranking_desempenho_absoluto".')
+    parser.add_argument(
+        "--dir", type=Path, default=parquet_dir(database_url()) or PARQUET_DIR,
+        help=f"Diretório do Data Mart (padrão: o de ETL_DATABASE_URL, ou {PARQUET_DIR}).",
+    )
+    args = parser.parse_args()
+
+    df = ParquetStore(args.dir).query(args.consulta)
+    print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
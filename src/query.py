@@ -0,0 +1,321 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from .backends import DataMartBackend, open_backend
+from .config import database_url
+
+# Formatos de saída das consultas.
+FORMATOS = ("pandas", "arrow")
+
+# Marcador de parâmetro nomeado em cada dialeto.
+PARAMETRO = {"postgresql": ":{nome}", "duckdb": "${nome}"}
+
+# Colunas fixas da `vw_performance_relativa_mercado`; as demais são uma por grupo econômico.
+COLUNAS_PERFORMANCE = ["Mes", "Serviço", "Taxa de Variação Média"]
+
+
+class ResultCache:
+    """
+    Cache em memória de resultados de consultas, com remoção das entradas menos usadas
+    recentemente (LRU) além de `max_entries` e expiração após `ttl` segundos.
+    Os resultados são guardados como tabelas Arrow, que são imutáveis, para que quem
+    consulta não altere a entrada do cache. Seguro para uso entre threads.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        """
+        Constrói uma instância do ResultCache.
+
+        Args:
+            max_entries (int): Número máximo de resultados guardados.
+            ttl (float): Tempo de vida de cada resultado, em segundos.
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.stats: Counter = Counter()
+        self._entries: "OrderedDict[Hashable, Tuple[float, pa.Table]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[pa.Table]:
+        """
+        Retorna o resultado guardado para a chave, ou `None` se não houver entrada válida.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, table: pa.Table) -> None:
+        """
+        Guarda um resultado e remove os menos usados recentemente além do limite.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), table)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove todos os resultados guardados.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _mes(valor) -> Optional[str]:
+    # Aceita "AAAA-MM", datas ou Timestamps e normaliza para o formato "AAAA-MM" das views.
+    return None if valor is None else pd.Timestamp(valor).strftime("%Y-%m")
+
+
+def _valores(valores: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    # A ordem e as repetições não mudam o resultado; normalizar evita entradas duplicadas no cache.
+    return None if valores is None else tuple(sorted(set(valores)))
+
+
+class QueryService:
+    """
+    Serviço de consultas de leitura ao Data Mart, com os filtros usados pelos painéis
+    (serviços, grupos econômicos e período) e cache dos resultados em memória.
+
+    A chave do cache é formada pela consulta, pelos parâmetros e pela versão dos dados:
+    no PostgreSQL, a da tabela `etl_versao_dados`, incrementada por `EtlPipeline.load`
+    a cada carga bem-sucedida; no backend Parquet, a versão publicada pela carga. Assim
+    os resultados deixam de ser usados exatamente quando os dados mudam, e consultas
+    repetidas são respondidas da memória. No PostgreSQL as consultas usam um pool de
+    conexões; a verificação da versão é uma leitura de uma linha pela chave primária.
+    """
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        max_entries: int = 256,
+        ttl: float = 300.0,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        version_interval: float = 0.0,
+    ):
+        """
+        Constrói uma instância do QueryService.
+
+        Args:
+            db_url (str, opcional): A URL do Data Mart (PostgreSQL ou `parquet://<diretório>`).
+                Por padrão, a mesma do pipeline (ver `config.database_url`).
+            max_entries (int): Número máximo de resultados em cache.
+            ttl (float): Tempo de vida de cada resultado em cache, em segundos.
+            pool_size (int): Conexões mantidas abertas no pool do PostgreSQL.
+            max_overflow (int): Conexões extras permitidas além do pool em picos de uso.
+            version_interval (float): Intervalo, em segundos, em que a versão dos dados
+                lida é reaproveitada sem nova consulta. Com 0 (padrão) a versão é lida a
+                cada consulta e os resultados nunca ficam defasados; valores maiores
+                evitam essa leitura ao custo de até esse atraso após uma carga.
+        """
+        db_url = db_url or database_url()
+        self.cache = ResultCache(max_entries, ttl)
+        self.version_interval = version_interval
+        self._version: Optional[Tuple[float, str]] = None
+        self.backend: DataMartBackend = open_backend(
+            db_url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True
+        )
+        self.dialect = self.backend.dialect
+
+    def data_version(self) -> str:
+        """
+        Retorna a versão atual dos dados do Data Mart.
+        """
+        if self._version is not None and time.monotonic() - self._version[0] < self.version_interval:
+            return self._version[1]
+        versao = self.backend.data_version()
+        self._version = (time.monotonic(), versao)
+        return versao
+
+    def _fetch(self, nome: str, filtros: Tuple, sql: str, params: Dict) -> pa.Table:
+        """
+        Responde uma consulta do cache ou, se necessário, do Data Mart. `filtros` são os
+        parâmetros já normalizados que, com o nome e a versão dos dados, formam a chave.
+        """
+        versao = self.data_version()
+        key = (nome, filtros, versao)
+        table = self.cache.get(key)
+        if table is None:
+            inicio = time.perf_counter()
+            table = self.backend.read(sql, params, versao)
+            self.cache.put(key, table)
+            logging.info(
+                f"Consulta '{nome}' executada no Data Mart (versão {versao}): "
+                f"{table.num_rows} linhas em {time.perf_counter() - inicio:.3f}s."
+            )
+        return table
+
+    @staticmethod
+    def _output(table: pa.Table, formato: str) -> Union[pd.DataFrame, pa.Table]:
+        """
+        Converte o resultado para o formato pedido. Cada chamada recebe um DataFrame novo.
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: '{formato}'. Opções: {FORMATOS}")
+        return table if formato == "arrow" else table.to_pandas()
+
+    def _where(self, filtros: List[Tuple[str, str, Optional[Tuple]]], params: Dict) -> str:
+        """
+        Monta a cláusula WHERE a partir de filtros `(coluna, operador, valores)`, com os
+        valores como parâmetros nomeados. Filtros com valores `None` são ignorados.
+        """
+        condicoes = []
+        for coluna, operador, valores in filtros:
+            if valores is None:
+                continue
+            marcadores = []
+            for valor in valores:
+                nome = f"p{len(params)}"
+                params[nome] = valor
+                marcadores.append(PARAMETRO[self.dialect].format(nome=nome))
+            if operador == "IN":
+                condicoes.append(f"{coluna} IN ({', '.join(marcadores) or 'NULL'})")
+            else:
+                condicoes.append(f"{coluna} {operador} {marcadores[0]}")
+        return f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    @staticmethod
+    def _periodo(coluna: str, inicio: Optional[str], fim: Optional[str]) -> List[Tuple[str, str, Optional[Tuple]]]:
+        return [
+            (coluna, ">=", None if inicio is None else (inicio,)),
+            (coluna, "<=", None if fim is None else (fim,)),
+        ]
+
+    def performance(
+        self,
+        servicos: Optional[Iterable[str]] = None,
+        grupos: Optional[Iterable[str]] = None,
+        inicio=None,
+        fim=None,
+        formato: str = "pandas",
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """
+        Consulta a `vw_performance_relativa_mercado`.
+
+        Args:
+            servicos (Iterable[str], opcional): Serviços a retornar (ex: ["SMP"]). Todos, se omitido.
+            grupos (Iterable[str], opcional): Colunas de grupos econômicos a retornar. Todas, se omitido.
+            inicio, fim (opcional): Primeiro e último mês, inclusive (ex: "2015-01" ou uma data).
+            formato (str): "pandas" (padrão) ou "arrow".
+
+        Raises:
+            ValueError: Se algum grupo não for uma coluna da view.
+        """
+        servicos, grupos = _valores(servicos), _valores(grupos)
+        inicio, fim = _mes(inicio), _mes(fim)
+        params: Dict = {}
+        where = self._where(
+            [('"Serviço"', "IN", servicos)] + self._periodo('"Mes"', inicio, fim), params
+        )
+        sql = f'SELECT * FROM vw_performance_relativa_mercado {where} ORDER BY "Mes", "Serviço"'
+        table = self._fetch("performance", (servicos, inicio, fim), sql, params)
+        if grupos is not None:
+            disponiveis = [coluna for coluna in table.column_names if coluna not in COLUNAS_PERFORMANCE]
+            ausentes = [grupo for grupo in grupos if grupo not in disponiveis]
+            if ausentes:
+                raise ValueError(f"Grupos sem coluna na view: {ausentes}. Opções: {disponiveis}")
+            table = table.select(COLUNAS_PERFORMANCE + [coluna for coluna in disponiveis if coluna in grupos])
+        return self._output(table, formato)
+
+    def ranking(
+        self,
+        servicos: Optional[Iterable[str]] = None,
+        grupos: Optional[Iterable[str]] = None,
+        inicio=None,
+        fim=None,
+        metricas: Optional[Iterable[str]] = None,
+        formato: str = "pandas",
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """
+        Consulta a `vw_ranking_desempenho_absoluto`, com os mesmos filtros de `performance`
+        e, opcionalmente, as métricas. O ranking é o do mercado inteiro, mesmo quando
+        apenas alguns grupos são retornados.
+        """
+        servicos, grupos, metricas = _valores(servicos), _valores(grupos), _valores(metricas)
+        inicio, fim = _mes(inicio), _mes(fim)
+        params: Dict = {}
+        where = self._where(
+            [
+                ('"Serviço"', "IN", servicos),
+                ('"Grupo Econômico"', "IN", grupos),
+                ('"Métrica"', "IN", metricas),
+            ]
+            + self._periodo('"Mes"', inicio, fim),
+            params,
+        )
+        sql = (
+            f'SELECT * FROM vw_ranking_desempenho_absoluto {where} '
+            f'ORDER BY "Mes", "Métrica", "Serviço", "Ranking", "Grupo Econômico"'
+        )
+        return self._output(self._fetch("ranking", (servicos, grupos, metricas, inicio, fim), sql, params), formato)
+
+    def desempenho(
+        self,
+        servicos: Optional[Iterable[str]] = None,
+        grupos: Optional[Iterable[str]] = None,
+        inicio=None,
+        fim=None,
+        metricas: Optional[Iterable[str]] = None,
+        formato: str = "pandas",
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """
+        Consulta os agregados mensais de cada grupo (`agg_grupo_mensal`) junto com os do
+        mercado (`agg_mercado_mensal`), uma linha por mês, serviço, grupo e métrica.
+        Diferente da `vw_performance_relativa_mercado`, atende a qualquer grupo econômico,
+        sem depender das colunas fixas da view.
+        """
+        servicos, grupos, metricas = _valores(servicos), _valores(grupos), _valores(metricas)
+        inicio, fim = _mes(inicio), _mes(fim)
+        params: Dict = {}
+        where = self._where(
+            [
+                ("g.servico", "IN", servicos),
+                ("g.grupo_economico", "IN", grupos),
+                ("g.metrica", "IN", metricas),
+            ]
+            + self._periodo(
+                "g.data_referencia",
+                None if inicio is None else pd.Timestamp(inicio).date(),
+                None if fim is None else pd.Timestamp(fim).date(),
+            ),
+            params,
+        )
+        sql = f"""
+SELECT
+    g.data_referencia, g.servico, g.grupo_economico, g.metrica,
+    g.valor, g.valor_anterior, g.variacao_mensal,
+    m.media_mercado, m.variacao_media_mercado,
+    g.variacao_relativa_mercado, g.ranking
+FROM
+    agg_grupo_mensal g
+JOIN
+    agg_mercado_mensal m
+    ON m.data_referencia = g.data_referencia AND m.servico = g.servico AND m.metrica = g.metrica
+{where}
+ORDER BY
+    g.data_referencia, g.servico, g.metrica, g.grupo_economico
+"""
+        return self._output(self._fetch("desempenho", (servicos, grupos, metricas, inicio, fim), sql, params), formato)
+
+    def close(self) -> None:
+        """
+        Descarta os resultados em cache e fecha as conexões do backend.
+        """
+        self.cache.clear()
+        self.backend.close()
@@ -0,0 +1,82 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Colunas de `final_df` usadas nos agregados.
+COLUNAS_FATO = ["data_referencia", "servico", "grupo_economico", "metrica", "valor"]
+
+
+def _variacao(atual: pd.Series, anterior: pd.Series) -> pd.Series:
+    # Assim como `NULLIF(anterior, 0)` no SQL, uma base zero não gera variação.
+    return (atual - anterior) / anterior.replace(0, np.nan)
+
+
+def compute_rollups(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Calcula os agregados lidos pelas views analíticas a partir de um DataFrame no formato
+    de `final_df`, com operações vetorizadas do pandas:
+
+    - `agg_mercado_mensal`: média mensal do mercado por serviço e métrica e sua variação
+      em relação ao mês anterior;
+    - `agg_grupo_mensal`: variação mês a mês de cada grupo por serviço e métrica, a
+      diferença para a variação do mercado e o ranking mensal por serviço e métrica;
+    - `agg_grupo_anual`: média, mínimo e máximo anuais por serviço, grupo e métrica.
+
+    Todas as séries são calculadas dentro de um mesmo serviço, então o DataFrame pode ser
+    processado serviço a serviço com o mesmo resultado. As variações usam o mês anterior
+    disponível da série, como o `LAG` do SQL.
+
+    Returns:
+        Dict[str, pd.DataFrame]: Um DataFrame por tabela de agregado, com as colunas na
+        ordem da tabela.
+    """
+    # Os modelos (e com eles o SQLAlchemy) só são importados quando os agregados são
+    # calculados, o que acontece na carga.
+    from .models import AggGrupoAnual, AggGrupoMensal, AggMercadoMensal
+
+    df = df[COLUNAS_FATO].astype({"servico": str, "grupo_economico": str, "metrica": str})
+    # Os valores são arredondados como na coluna `valor` (NUMERIC(18, 4)) da tabela fato.
+    df["valor"] = df["valor"].astype(float).round(4)
+    df = df.sort_values(["servico", "metrica", "grupo_economico", "data_referencia"], kind="mergesort")
+
+    mercado = (
+        df.groupby(["data_referencia", "servico", "metrica"], sort=False)["valor"]
+        .agg(media_mercado="mean", grupos="size")
+        .reset_index()
+        .sort_values(["servico", "metrica", "data_referencia"], kind="mergesort")
+    )
+    anterior = mercado.groupby(["servico", "metrica"], sort=False)["media_mercado"].shift(1)
+    mercado["variacao_media_mercado"] = _variacao(mercado["media_mercado"], anterior)
+
+    grupo = df.copy()
+    grupo["valor_anterior"] = grupo.groupby(["servico", "metrica", "grupo_economico"], sort=False)["valor"].shift(1)
+    grupo["variacao_mensal"] = _variacao(grupo["valor"], grupo["valor_anterior"])
+    grupo = grupo.merge(
+        mercado[["data_referencia", "servico", "metrica", "variacao_media_mercado"]],
+        on=["data_referencia", "servico", "metrica"],
+        how="left",
+    )
+    grupo["variacao_relativa_mercado"] = grupo["variacao_mensal"] - grupo["variacao_media_mercado"]
+    # Equivalente ao RANK() ... ORDER BY valor DESC: empates dividem a menor posição.
+    grupo["ranking"] = (
+        grupo.groupby(["data_referencia", "servico", "metrica"], sort=False)["valor"]
+        .rank(method="min", ascending=False)
+        .astype("int64")
+    )
+
+    anual = (
+        df.assign(ano=df["data_referencia"].dt.year)
+        .groupby(["ano", "servico", "grupo_economico", "metrica"])["valor"]
+        .agg(media="mean", minimo="min", maximo="max", meses="count")
+        .reset_index()
+    )
+
+    return {
+        model.__tablename__: frame[[column.name for column in model.__table__.columns]]
+        for model, frame in (
+            (AggMercadoMensal, mercado),
+            (AggGrupoMensal, grupo),
+            (AggGrupoAnual, anual),
+        )
+    }
@@ -1,84 +1,121 @@
-VW_PERFORMANCE_SQL = """
-CREATE OR REPLACE VIEW vw_performance_relativa_mercado AS
-WITH
--- PASSO 1: Mantém o mesmo, calcula o IDA do mês anterior para cada grupo.
-calculo_variacao_individual AS (
-    SELECT
-        t.data_referencia,
-        g.nome_grupo,
-        f.valor AS ida_atual,
-        LAG(f.valor, 1) OVER (PARTITION BY g.nome_grupo ORDER BY t.data_referencia) AS ida_anterior
-    FROM
-        fato_atendimento f
-    JOIN dim_tempo t ON f.tempo_id = t.id_tempo
-    JOIN dim_grupo_economico g ON f.grupo_economico_id = g.id_grupo
-),
-
--- PASSO 2: Mantém o mesmo, calcula a taxa de variação individual e a média de mercado por mês.
-calculo_taxa_individual_e_media_mercado AS (
-    SELECT
-        data_referencia,
-        nome_grupo,
-        (ida_atual - ida_anterior) / NULLIF(ida_anterior, 0) AS taxa_variacao_individual,
-        AVG(ida_atual) OVER (PARTITION BY data_referencia) AS media_ida_mercado_atual
-    FROM
-        calculo_variacao_individual
-),
-
--- PASSO 3 (REESTRUTURADO): Calcula a taxa de variação da média do mercado de forma separada e limpa.
-variacao_media_mercado AS (
-    SELECT
-        data_referencia,
-        (media_ida_mercado_atual - LAG(media_ida_mercado_atual, 1) OVER (ORDER BY data_referencia)) / NULLIF(LAG(media_ida_mercado_atual, 1) OVER (ORDER BY data_referencia), 0) AS taxa_variacao_media_mercado
-    FROM
-        (SELECT DISTINCT data_referencia, media_ida_mercado_atual FROM calculo_taxa_individual_e_media_mercado) AS medias_unicas_mensais
-)
-
--- PASSO 4 (FINAL): Junta os dados de variação individual com os de variação de mercado e pivota.
+from .config import METRICA_ALVO
+
+# As variações mês a mês, a média do mercado e o ranking são pré-calculados pelo pipeline
+# a cada carga (ver `src/rollups.py`); as views apenas formatam e pivotam os agregados.
+# As séries são calculadas por serviço: cada grupo é comparado com o mês anterior e com a
+# média do mercado do mesmo serviço.
+#
+# O único trecho que depende do dialeto SQL é a formatação do mês ("YYYY-MM"): as views
+# são montadas para o PostgreSQL e para o DuckDB (backend Parquet, ver `src/parquet_store.py`).
+FORMATO_MES = {
+    "postgresql": "TO_CHAR({coluna}, 'YYYY-MM')",
+    "duckdb": "strftime({coluna}, '%Y-%m')",
+}
+
+
+def _literal(valor: str) -> str:
+    """
+    Literal de texto SQL, com as aspas simples escapadas.
+    """
+    return "'" + valor.replace("'", "''") + "'"
+
+
+def performance_select(dialect: str = "postgresql") -> str:
+    """
+    SELECT da `vw_performance_relativa_mercado` no dialeto informado, para a métrica
+    `config.METRICA_ALVO`.
+    """
+    mes = FORMATO_MES[dialect].format(coluna="g.data_referencia")
+    return f"""
 SELECT
-    TO_CHAR(ind.data_referencia, 'YYYY-MM') AS "Mes",
-    MAX(merc.taxa_variacao_media_mercado * 100) AS "Taxa de Variação Média",
-    MAX(CASE WHEN ind.nome_grupo = 'ALGAR' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "ALGAR",
-    MAX(CASE WHEN ind.nome_grupo = 'CLARO' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "CLARO",
-    MAX(CASE WHEN ind.nome_grupo = 'VIVO' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "VIVO",
-    MAX(CASE WHEN ind.nome_grupo = 'OI' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "OI",
-    MAX(CASE WHEN ind.nome_grupo = 'SKY' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "SKY",
-    MAX(CASE WHEN ind.nome_grupo = 'TIM' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "TIM",
-    MAX(CASE WHEN ind.nome_grupo = 'NEXTEL' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "NEXTEL",
-    MAX(CASE WHEN ind.nome_grupo = 'SERCOMTEL' THEN (ind.taxa_variacao_individual - merc.taxa_variacao_media_mercado) * 100 ELSE NULL END) AS "SERCOMTEL"
+    {mes} AS "Mes",
+    g.servico AS "Serviço",
+    MAX(m.variacao_media_mercado * 100) AS "Taxa de Variação Média",
+    MAX(CASE WHEN g.grupo_economico = 'ALGAR' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "ALGAR",
+    MAX(CASE WHEN g.grupo_economico = 'CLARO' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "CLARO",
+    MAX(CASE WHEN g.grupo_economico = 'VIVO' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "VIVO",
+    MAX(CASE WHEN g.grupo_economico = 'OI' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "OI",
+    MAX(CASE WHEN g.grupo_economico = 'SKY' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "SKY",
+    MAX(CASE WHEN g.grupo_economico = 'TIM' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "TIM",
+    MAX(CASE WHEN g.grupo_economico = 'NEXTEL' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "NEXTEL",
+    MAX(CASE WHEN g.grupo_economico = 'SERCOMTEL' THEN g.variacao_relativa_mercado * 100 ELSE NULL END) AS "SERCOMTEL"
 FROM
-    calculo_taxa_individual_e_media_mercado AS ind
+    agg_grupo_mensal g
 JOIN
-    variacao_media_mercado AS merc ON ind.data_referencia = merc.data_referencia
+    agg_mercado_mensal m
+    ON m.data_referencia = g.data_referencia AND m.servico = g.servico AND m.metrica = g.metrica
 WHERE
-    ind.taxa_variacao_individual IS NOT NULL AND merc.taxa_variacao_media_mercado IS NOT NULL
+    g.metrica = {_literal(METRICA_ALVO)}
+    AND g.variacao_relativa_mercado IS NOT NULL
 GROUP BY
-    "Mes"
+    "Mes",
+    "Serviço"
 ORDER BY
-    "Mes"
+    "Mes",
+    "Serviço"
 """
 
-VW_RANKING_ABSOLUTO_SQL = """
-CREATE OR REPLACE VIEW vw_ranking_desempenho_absoluto AS
+
+def ranking_select(dialect: str = "postgresql") -> str:
+    """
+    SELECT da `vw_ranking_desempenho_absoluto` no dialeto informado.
+    """
+    mes = FORMATO_MES[dialect].format(coluna="data_referencia")
+    return f"""
 SELECT
-    TO_CHAR(t.data_referencia, 'YYYY-MM') AS "Mes",
-    s.nome_servico AS "Serviço",
-    g.nome_grupo AS "Grupo Econômico",
-    f.valor AS "Valor do Indicador",
-    RANK() OVER (
-        PARTITION BY t.data_referencia, s.nome_servico
-        ORDER BY f.valor DESC
-    ) AS "Ranking"
+    {mes} AS "Mes",
+    metrica AS "Métrica",
+    servico AS "Serviço",
+    grupo_economico AS "Grupo Econômico",
+    valor AS "Valor do Indicador",
+    ranking AS "Ranking"
 FROM
-    fato_atendimento f
-JOIN
-    dim_tempo t ON f.tempo_id = t.id_tempo
-JOIN
-    dim_grupo_economico g ON f.grupo_economico_id = g.id_grupo
-JOIN
-    dim_servico s ON f.servico_id = s.id_servico
+    agg_grupo_mensal
 ORDER BY
     "Mes",
+    "Métrica",
     "Serviço",
-    "Ranking";
-"""
\ No newline at end of file
+    "Ranking"
+"""
+
+
+VW_PERFORMANCE_SELECT = performance_select()
+VW_RANKING_ABSOLUTO_SELECT = ranking_select()
+
+# Views analíticas: nome -> (SELECT que as define, colunas que identificam cada linha).
+# As colunas-chave formam o índice único exigido por `REFRESH MATERIALIZED VIEW CONCURRENTLY`
+# quando as views são criadas como materializadas.
+ANALYTIC_VIEWS = {
+    "vw_performance_relativa_mercado": (VW_PERFORMANCE_SELECT, ["Mes", "Serviço"]),
+    "vw_ranking_desempenho_absoluto": (
+        VW_RANKING_ABSOLUTO_SELECT,
+        ["Mes", "Métrica", "Serviço", "Grupo Econômico"],
+    ),
+}
+
+
+# Funções que montam o SELECT de cada view analítica num dialeto.
+_SELECTS = {
+    "vw_performance_relativa_mercado": performance_select,
+    "vw_ranking_desempenho_absoluto": ranking_select,
+}
+
+
+def view_ddl(name: str, dialect: str = "postgresql") -> str:
+    """
+    Monta o DDL que cria (ou substitui) uma view analítica comum no dialeto informado.
+    """
+    return f"CREATE OR REPLACE VIEW {name} AS" + _SELECTS[name](dialect)
+
+
+def materialized_view_ddl(name: str) -> list:
+    """
+    Monta o DDL que cria uma view analítica como materializada, com o índice único
+    que permite atualizá-la de forma concorrente.
+    """
+    select_sql, key_columns = ANALYTIC_VIEWS[name]
+    columns = ", ".join(f'"{column}"' for column in key_columns)
+    return [
+        f"CREATE MATERIALIZED VIEW {name} AS{select_sql}",
+        f"CREATE UNIQUE INDEX ux_{name} ON {name} ({columns})",
+    ]
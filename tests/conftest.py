@@ -0,0 +1,180 @@
+import hashlib
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from benchmarks.generator import VARIAVEIS, generate_dataset
+from src.etl import EtlPipeline
+
+class ServidorArquivos(BaseHTTPRequestHandler):
+    """
+    Serve os arquivos de um diretório como o portal da Anatel: com ETag, respostas
+    condicionais (304), retomada com `Range`/`If-Range` (206 ou 416) e 404 para arquivos
+    inexistentes. Cada requisição é registrada em `requisicoes`.
+    """
+
+    diretorio: Path
+    requisicoes: List[Dict[str, str]]
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _responder(self, status: int, dados: bytes = b"", etag: str = "") -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self) -> None:
+        self.requisicoes.append({"arquivo": Path(self.path).name, **self.headers})
+        caminho = self.diretorio / Path(self.path).name
+        if not caminho.is_file():
+            return self._responder(404)
+        dados = caminho.read_bytes()
+        etag = f'"{hashlib.md5(dados).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._responder(304, etag=etag)
+        intervalo = self.headers.get("Range")
+        if intervalo and self.headers.get("If-Range") == etag:
+            inicio = int(intervalo.removeprefix("bytes=").rstrip("-"))
+            if inicio >= len(dados):
+                return self._responder(416)
+            return self._responder(206, dados[inicio:], etag)
+        return self._responder(200, dados, etag)
+
+
+@pytest.fixture
+def servidor(tmp_path: Path) -> Iterator[ThreadingHTTPServer]:
+    """
+    Servidor HTTP local sobre o diretório `tmp_path / "servidor"`. A URL base fica em
+    `servidor.base_url` e as requisições recebidas, em `servidor.requisicoes`.
+    """
+    diretorio = tmp_path / "servidor"
+    diretorio.mkdir()
+    handler = type("Handler", (ServidorArquivos,), {"diretorio": diretorio, "requisicoes": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.diretorio = diretorio
+    server.requisicoes = handler.requisicoes
+    server.base_url = f"http://127.0.0.1:{server.server_port}/"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+
+@pytest.fixture(scope="session")
+def planilhas(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """
+    Diretório com planilhas .ods sintéticas (`benchmarks.generator`) dos três serviços
+    em dois anos, com valores faltantes.
+    """
+    diretorio = tmp_path_factory.mktemp("planilhas")
+    generate_dataset(diretorio, anos=(2013, 2014), n_grupos=5, n_variaveis=4, faltantes=0.1, seed=7)
+    return diretorio
+
+
+@pytest.fixture(scope="session")
+def metricas() -> Tuple[str, ...]:
+    """
+    Métricas lidas nos testes do pipeline: a métrica alvo e mais uma, para exercitar a
+    leitura de várias métricas numa única passada.
+    """
+    return tuple(VARIAVEIS[:2])
+
+
+@pytest.fixture(scope="session")
+def final_df(planilhas: Path, metricas, tmp_path_factory: pytest.TempPathFactory) -> pd.DataFrame:
+    """
+    O `final_df` das planilhas sintéticas, lido em série com o leitor padrão.
+    """
+    pipeline = EtlPipeline(planilhas, f"parquet://{tmp_path_factory.mktemp('mart')}", metrics=metricas)
+    pipeline.extract_and_clean()
+    pipeline.transform()
+    return pipeline.final_df
+
+@pytest.fixture(scope="session")
+def servidor_postgres(tmp_path_factory: pytest.TempPathFactory):
+    """
+    PostgreSQL descartável (via `pgserver`, do extra `test`) compartilhado pela sessão.
+    Os testes que dependem dele são pulados se o pgserver não estiver instalado.
+    """
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="delete")
+    yield server
+    server.cleanup()
+
+
+@pytest.fixture
+def banco(servidor_postgres) -> Iterator[str]:
+    """
+    URL de um banco vazio, criado para o teste e descartado ao fim dele.
+    """
+    nome = f"teste_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(servidor_postgres.get_uri(), isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f"CREATE DATABASE {nome}"))
+    yield servidor_postgres.get_uri(nome)
+    with admin.connect() as connection:
+        connection.execute(text(f"DROP DATABASE {nome} WITH (FORCE)"))
+    admin.dispose()
+
+
+def _conteudo_mart(url: str) -> Dict[str, pd.DataFrame]:
+    engine = create_engine(url)
+    consultas = {
+        # A fato pelas chaves naturais: as chaves substitutas dependem do modo de carga.
+        "fato_atendimento": (
+            "SELECT f.data_referencia, s.nome_servico, g.nome_grupo, m.nome_metrica, f.valor "
+            "FROM fato_atendimento f "
+            "JOIN dim_servico s ON s.id_servico = f.servico_id "
+            "JOIN dim_grupo_economico g ON g.id_grupo = f.grupo_economico_id "
+            "JOIN dim_metrica m ON m.id_metrica = f.metrica_id"
+        ),
+        **{tabela: f"SELECT * FROM {tabela}" for tabela in (
+            "agg_mercado_mensal", "agg_grupo_mensal", "agg_grupo_anual",
+            "vw_performance_relativa_mercado", "vw_ranking_desempenho_absoluto",
+        )},
+    }
+    conteudo = {}
+    with engine.connect() as connection:
+        for nome, sql in consultas.items():
+            df = pd.read_sql(sql, connection)
+            conteudo[nome] = df.sort_values(list(df.columns), ignore_index=True)
+    engine.dispose()
+    return conteudo
+
+
+@pytest.fixture(scope="session")
+def conteudo_mart():
+    """
+    Função que lê o conteúdo de um Data Mart no PostgreSQL (fato pelas chaves naturais,
+    agregados e views analíticas), ordenado, para comparar cargas feitas de jeitos diferentes.
+    """
+    return _conteudo_mart
+
+
+
+def _assert_mesmo_conteudo(obtido: Dict[str, pd.DataFrame], esperado: Dict[str, pd.DataFrame]) -> None:
+    assert obtido.keys() == esperado.keys()
+    for nome, df in esperado.items():
+        # Agregados calculados no pandas e recalculados a partir do banco diferem no último bit.
+        pd.testing.assert_frame_equal(obtido[nome], df, check_dtype=False, atol=1e-9, obj=nome)
+
+
+@pytest.fixture(scope="session")
+def mesmo_conteudo():
+    """
+    Função que compara dois conteúdos lidos com `conteudo_mart`.
+    """
+    return _assert_mesmo_conteudo
@@ -0,0 +1,110 @@
+from functools import partial
+
+import pandas as pd
+import pytest
+from psycopg2.errors import UniqueViolation
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.backends import PostgresBackend
+from src.config import STAGING_SCHEMA
+from src.database import swap_schema
+from src.rollups import compute_rollups
+
+
+@pytest.fixture
+def backend(banco):
+    backend = PostgresBackend(banco)
+    backend.setup()
+    yield backend
+    backend.close()
+
+
+def _carrega(backend: PostgresBackend, df, load_mode: str):
+    return backend.load(df, compute_rollups(df), load_mode)
+
+
+@pytest.mark.parametrize("load_mode", ["upsert", "copy", "swap"])
+def test_modos_de_carga_geram_o_mesmo_conteudo(backend, banco, final_df, conteudo_mart, mesmo_conteudo, load_mode):
+    _carrega(backend, final_df, load_mode)
+    obtido = conteudo_mart(banco)
+
+    _carrega(backend, final_df, "replace")
+
+    assert len(obtido["fato_atendimento"]) == len(final_df)
+    mesmo_conteudo(obtido, conteudo_mart(banco))
+
+
+def test_upsert_repetido_nao_grava_nada(backend, final_df):
+    assert _carrega(backend, final_df, "upsert") == {"inseridos": len(final_df), "atualizados": 0, "inalterados": 0}
+
+    assert _carrega(backend, final_df, "upsert") == {"inseridos": 0, "atualizados": 0, "inalterados": len(final_df)}
+
+
+def test_upsert_atualiza_so_o_valor_alterado(backend, banco, final_df, conteudo_mart, mesmo_conteudo):
+    _carrega(backend, final_df, "upsert")
+    alterado = final_df.copy()
+    alterado.loc[alterado.index[0], "valor"] += 1
+
+    assert _carrega(backend, alterado, "upsert") == {"inseridos": 0, "atualizados": 1, "inalterados": len(final_df) - 1}
+    obtido = conteudo_mart(banco)
+
+    # Os agregados foram recalculados com o novo valor.
+    _carrega(backend, alterado, "replace")
+    mesmo_conteudo(obtido, conteudo_mart(banco))
+
+
+def test_copy_acerta_as_sequencias_das_dimensoes(backend, final_df):
+    _carrega(backend, final_df, "copy")
+    novo = final_df.head(1).assign(grupo_economico="GRUPO NOVO")
+
+    # O upsert seguinte usa as sequências ajustadas pelo COPY sem colidir com as chaves atribuídas.
+    assert _carrega(backend, novo, "upsert") == {"inseridos": 1, "atualizados": 0, "inalterados": 0}
+    grupo = backend.read("SELECT id_grupo FROM dim_grupo_economico WHERE nome_grupo = 'GRUPO NOVO'", {}, "")
+    assert grupo.column("id_grupo").to_pylist() == [final_df["grupo_economico"].nunique() + 1]
+
+
+def _schemas(banco: str) -> set:
+    engine = create_engine(banco)
+    with engine.connect() as connection:
+        schemas = set(connection.execute(text("SELECT nspname FROM pg_namespace")).scalars())
+    engine.dispose()
+    return schemas
+
+
+def test_swap_com_falha_na_carga_preserva_o_publicado(backend, banco, final_df, conteudo_mart, mesmo_conteudo):
+    _carrega(backend, final_df, "copy")
+    publicado = conteudo_mart(banco)
+    duplicado = pd.concat([final_df, final_df.head(1)], ignore_index=True)
+
+    with pytest.raises(UniqueViolation):
+        _carrega(backend, duplicado, "swap")
+
+    mesmo_conteudo(conteudo_mart(banco), publicado)
+    assert STAGING_SCHEMA not in _schemas(banco)
+
+
+def test_swap_sem_os_bloqueios_preserva_o_publicado_e_tenta_de_novo(
+    backend, banco, final_df, conteudo_mart, mesmo_conteudo, monkeypatch
+):
+    _carrega(backend, final_df, "copy")
+    publicado = conteudo_mart(banco)
+    monkeypatch.setattr("src.backends.swap_schema", partial(swap_schema, lock_timeout="50ms", tentativas=2))
+    # Uma consulta longa segura a view: a troca não obtém os bloqueios em nenhuma tentativa.
+    engine = create_engine(banco)
+    consulta = engine.connect()
+    transacao = consulta.begin()
+    consulta.execute(text("SELECT count(*) FROM vw_ranking_desempenho_absoluto"))
+
+    with pytest.raises(OperationalError):
+        _carrega(backend, final_df.iloc[::2], "swap")
+
+    transacao.rollback()
+    consulta.close()
+    engine.dispose()
+    mesmo_conteudo(conteudo_mart(banco), publicado)
+    assert STAGING_SCHEMA not in _schemas(banco)
+
+    # Sem a consulta, a mesma troca é publicada.
+    _carrega(backend, final_df.iloc[::2], "swap")
+    assert len(conteudo_mart(banco)["fato_atendimento"]) == len(final_df.iloc[::2])
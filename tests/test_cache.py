@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.cache import ParseCache
+from src.etl import EtlPipeline
+
+DF = pd.DataFrame({"GRUPO ECONÔMICO": ["CLARO", "VIVO"], "2015-01": [90.5, "-"]})
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ParseCache:
+    return ParseCache(tmp_path / "cache")
+
+
+def _arquivo(tmp_path: Path, nome: str, conteudo: bytes) -> Path:
+    path = tmp_path / nome
+    path.write_bytes(conteudo)
+    return path
+
+
+def test_acerto_e_falta(cache, tmp_path):
+    key = cache.key(_arquivo(tmp_path, "SMP2015.ods", b"smp"), "odf")
+
+    assert cache.get(key) is None
+    cache.put(key, DF)
+
+    # A coluna com números e textos é guardada como texto.
+    pd.testing.assert_frame_equal(cache.get(key), DF.astype({"2015-01": str}), check_dtype=False)
+    assert cache.get(cache.key(_arquivo(tmp_path, "SMP2015.ods", b"smp alterado"), "odf")) is None
+
+
+def test_entrada_corrompida_e_descartada(cache, tmp_path):
+    key = cache.key(_arquivo(tmp_path, "SMP2015.ods", b"smp"), "odf")
+    cache.put(key, DF)
+    (cache.cache_dir / f"{key}.parquet").write_bytes(b"corrompido")
+
+    assert cache.get(key) is None
+    assert not (cache.cache_dir / f"{key}.parquet").exists()
+
+
+def test_remove_as_menos_usadas_alem_do_limite(cache, tmp_path):
+    keys = [cache.key(_arquivo(tmp_path, f"SMP{ano}.ods", str(ano).encode()), "odf") for ano in (2013, 2014, 2015)]
+    cache.put(keys[0], DF)
+    tamanho = (cache.cache_dir / f"{keys[0]}.parquet").stat().st_size
+    cache.max_bytes = 2 * tamanho
+    cache.put(keys[1], DF)
+    # Usos em segundos distintos, sem depender da resolução do mtime: a primeira entrada
+    # foi gravada antes, mas lida depois da segunda.
+    os.utime(cache.cache_dir / f"{keys[1]}.parquet", (1_000, 1_000))
+    os.utime(cache.cache_dir / f"{keys[0]}.parquet", (2_000, 2_000))
+
+    cache.put(keys[2], DF)
+
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+
+
+def test_invalidar_e_limpar(cache, tmp_path):
+    smp = _arquivo(tmp_path, "SMP2015.ods", b"smp")
+    scm = _arquivo(tmp_path, "SCM2015.ods", b"scm")
+    for variante in ("odf", "stream"):
+        cache.put(cache.key(smp, variante), DF)
+    cache.put(cache.key(scm, "odf"), DF)
+
+    assert cache.invalidate(smp) == 2
+    assert cache.get(cache.key(smp, "odf")) is None
+    assert cache.get(cache.key(scm, "odf")) is not None
+    assert cache.clear() == 1
+    assert list(cache.cache_dir.iterdir()) == []
+
+
+def _variante(tmp_path: Path, ods_reader: str, metricas) -> str:
+    return EtlPipeline(tmp_path, f"parquet://{tmp_path / 'mart'}", ods_reader=ods_reader, metrics=metricas)._cache_variant()
+
+
+def test_variante_muda_com_o_leitor_e_as_metricas(tmp_path, metricas):
+    assert _variante(tmp_path, "odf", metricas) != _variante(tmp_path, "stream", metricas)
+    # O leitor em streaming só guarda as linhas das métricas pedidas; a ordem não importa.
+    assert _variante(tmp_path, "stream", metricas) != _variante(tmp_path, "stream", metricas[:1])
+    assert _variante(tmp_path, "stream", metricas) == _variante(tmp_path, "stream", metricas[::-1])
+    # O leitor padrão guarda todas as métricas, então a mesma entrada serve a qualquer conjunto.
+    assert _variante(tmp_path, "odf", metricas) == _variante(tmp_path, "odf", metricas[:1])
+
+
+@pytest.mark.parametrize("ods_reader", ["odf", "stream"])
+def test_extracao_reaproveita_o_cache(planilhas, tmp_path, cache, metricas, ods_reader):
+    def extrai(leitor, metricas):
+        pipeline = EtlPipeline(
+            planilhas, f"parquet://{tmp_path / 'mart'}", ods_reader=leitor, metrics=metricas, parse_cache=cache
+        )
+        pipeline.extract_and_clean()
+        pipeline.transform()
+        return pipeline
+
+    arquivos = len(list(planilhas.glob("*.ods")))
+    primeira = extrai(ods_reader, metricas)
+    segunda = extrai(ods_reader, metricas)
+    outro_leitor = extrai("stream" if ods_reader == "odf" else "odf", metricas)
+
+    assert (primeira.parse_stats["lidos"], primeira.parse_stats["cache"]) == (arquivos, 0)
+    assert (segunda.parse_stats["lidos"], segunda.parse_stats["cache"]) == (0, arquivos)
+    # As colunas mistas voltam do cache como texto, mas o resultado da transformação é o mesmo.
+    pd.testing.assert_frame_equal(segunda.final_df, primeira.final_df)
+    assert outro_leitor.parse_stats["cache"] == 0
@@ -0,0 +1,98 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.checkpoint import load_cleaned_data, load_final_df, save_cleaned_data, save_final_df
+from src.cli import main
+from src.parquet_store import ParquetStore
+
+
+@pytest.fixture
+def publicadas(servidor, planilhas: Path) -> Path:
+    for arquivo in planilhas.glob("*.ods"):
+        shutil.copy(arquivo, servidor.diretorio / arquivo.name)
+    return servidor.diretorio
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch) -> Path:
+    """
+    Data Mart em Parquet e cache de parsing desligado, tudo dentro de `tmp_path`.
+    """
+    mart = tmp_path / "mart"
+    monkeypatch.setenv("ETL_DATABASE_URL", f"parquet://{mart}")
+    monkeypatch.setenv("ETL_PARSE_CACHE", "0")
+    monkeypatch.delenv("ETL_BASE_URL", raising=False)
+    return mart
+
+
+def _opcoes_metricas(metricas) -> list:
+    return [opcao for metrica in metricas for opcao in ("--metrica", metrica)]
+
+
+@pytest.mark.parametrize("pela_variavel", [False, True])
+def test_download_usa_a_url_base_configurada(servidor, publicadas, tmp_path, ambiente, monkeypatch, pela_variavel):
+    destino = tmp_path / "dados"
+    if pela_variavel:
+        monkeypatch.setenv("ETL_BASE_URL", servidor.base_url)
+        argv = ["--entrada", str(destino), "download"]
+    else:
+        argv = ["--entrada", str(destino), "--base-url", servidor.base_url, "download"]
+
+    assert main(argv) == 0
+
+    assert sorted(path.name for path in destino.glob("*.ods")) == sorted(path.name for path in publicadas.glob("*.ods"))
+
+
+def test_etapas_pelos_checkpoints_iguais_ao_run(servidor, publicadas, planilhas, tmp_path, ambiente, metricas, final_df):
+    checkpoints = tmp_path / "checkpoints"
+    globais = ["--entrada", str(planilhas), "--checkpoints", str(checkpoints)] + _opcoes_metricas(metricas)
+
+    for comando in (["setup-db"], ["extract", "--sem-cache"], ["transform"], ["load", "--modo", "copy"], ["refresh-views"]):
+        assert main(globais + comando) == 0, comando
+
+    pd.testing.assert_frame_equal(load_final_df(checkpoints), final_df.reset_index(drop=True), check_categorical=False)
+    etapas = ParquetStore(ambiente).query("SELECT * FROM vw_ranking_desempenho_absoluto")
+
+    run = ["--entrada", str(tmp_path / "dados"), "--base-url", servidor.base_url] + _opcoes_metricas(metricas)
+    assert main(run + ["run", "--modo", "copy"]) == 0
+    pd.testing.assert_frame_equal(ParquetStore(ambiente).query("SELECT * FROM vw_ranking_desempenho_absoluto"), etapas)
+
+
+def test_etapa_sem_o_checkpoint_anterior_falha(tmp_path, ambiente):
+    assert main(["--checkpoints", str(tmp_path / "vazio"), "transform"]) == 1
+    assert main(["--checkpoints", str(tmp_path / "vazio"), "load"]) == 1
+
+
+def test_particao_nao_se_aplica_ao_parquet(ambiente):
+    assert main(["particao", "--desanexar", "2013"]) == 1
+
+
+def test_checkpoints_ida_e_volta(tmp_path, final_df):
+    cleaned = {
+        "SMP": pd.DataFrame({"GRUPO ECONÔMICO": ["CLARO", "VIVO"], "2015-01": [90.5, "-"], "servico": "SMP"}),
+        "SCM": pd.DataFrame({"GRUPO ECONÔMICO": ["OI"], "2015-01": [70.0], "servico": "SCM"}),
+    }
+    save_cleaned_data(cleaned, tmp_path)
+    save_final_df(final_df, tmp_path)
+
+    lidos = load_cleaned_data(tmp_path)
+    assert lidos.keys() == {"SCM", "SMP"}
+    pd.testing.assert_frame_equal(lidos["SCM"], cleaned["SCM"])
+    # Colunas com números e textos voltam como texto, como no cache de parsing.
+    pd.testing.assert_frame_equal(lidos["SMP"], cleaned["SMP"].astype({"2015-01": str}), check_dtype=False)
+    pd.testing.assert_frame_equal(load_final_df(tmp_path), final_df.reset_index(drop=True))
+
+    # Um serviço que deixou de existir tem seu checkpoint removido.
+    save_cleaned_data({"SMP": cleaned["SMP"]}, tmp_path)
+    assert load_cleaned_data(tmp_path).keys() == {"SMP"}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_checkpoint_ausente(tmp_path):
+    with pytest.raises(FileNotFoundError, match="extract"):
+        load_cleaned_data(tmp_path)
+    with pytest.raises(FileNotFoundError, match="transform"):
+        load_final_df(tmp_path)
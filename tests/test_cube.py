@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from src.cube import IdaCube
+from src.rollups import compute_rollups
+
+
+def _manual() -> pd.DataFrame:
+    """
+    Série pequena com os casos de borda das views: mês faltante no meio da série,
+    valor anterior zero (sem variação) e empate no ranking.
+    """
+    linhas = [
+        ("2015-01-01", "SMP", "A", 10.0),
+        ("2015-01-01", "SMP", "B", 0.0),
+        ("2015-01-01", "SMP", "C", 10.0),
+        ("2015-02-01", "SMP", "A", 12.0),
+        ("2015-02-01", "SMP", "B", 5.0),
+        ("2015-03-01", "SMP", "A", 12.0),
+        ("2015-03-01", "SMP", "B", 4.0),
+        ("2015-03-01", "SMP", "C", 12.0),
+        ("2015-01-01", "SCM", "A", 7.12345),
+    ]
+    df = pd.DataFrame(linhas, columns=["data_referencia", "servico", "grupo_economico", "valor"])
+    df["data_referencia"] = pd.to_datetime(df["data_referencia"])
+    df["metrica"] = "Taxa de Respondidas em 5 dias Úteis"
+    return df
+
+
+def _compara(df: pd.DataFrame, metrica: str) -> None:
+    cubo = IdaCube.from_final_df(df, metrica)
+    rollups = compute_rollups(df)
+
+    grupo = rollups["agg_grupo_mensal"]
+    grupo = grupo[grupo["metrica"] == metrica]
+    assert (~np.isnan(cubo.valores)).sum() == len(grupo)
+    i = cubo.meses.get_indexer(grupo["data_referencia"])
+    j = cubo.servicos.get_indexer(grupo["servico"])
+    k = cubo.grupos.get_indexer(grupo["grupo_economico"])
+    for coluna, valores in [
+        ("valor", cubo.valores),
+        ("valor_anterior", cubo.valor_anterior()),
+        ("variacao_mensal", cubo.variacao_mensal()),
+        ("variacao_relativa_mercado", cubo.variacao_relativa_mercado()),
+        ("ranking", cubo.ranking()),
+    ]:
+        np.testing.assert_allclose(valores[i, j, k], grupo[coluna].astype(float), rtol=1e-12, equal_nan=True, err_msg=coluna)
+
+    mercado = rollups["agg_mercado_mensal"]
+    mercado = mercado[mercado["metrica"] == metrica]
+    assert (cubo.grupos_presentes() > 0).sum() == len(mercado)
+    i = cubo.meses.get_indexer(mercado["data_referencia"])
+    j = cubo.servicos.get_indexer(mercado["servico"])
+    np.testing.assert_array_equal(cubo.grupos_presentes()[i, j], mercado["grupos"])
+    np.testing.assert_allclose(cubo.media_mercado()[i, j], mercado["media_mercado"], rtol=1e-12)
+    np.testing.assert_allclose(
+        cubo.variacao_media_mercado()[i, j], mercado["variacao_media_mercado"].astype(float), rtol=1e-12, equal_nan=True
+    )
+
+
+def test_cubo_igual_aos_agregados_nos_casos_de_borda():
+    df = _manual()
+    _compara(df, df["metrica"].iloc[0])
+
+
+def test_cubo_igual_aos_agregados_de_cada_metrica(final_df, metricas):
+    for metrica in metricas:
+        _compara(final_df, metrica)
+
+
+def test_ranking_desempenho_igual_ao_ranking_dos_agregados(final_df, metricas):
+    cubo = IdaCube.from_final_df(final_df, metricas[0])
+    grupo = compute_rollups(final_df)["agg_grupo_mensal"]
+    grupo = grupo[grupo["metrica"] == metricas[0]]
+    esperado = pd.DataFrame({
+        "Mes": grupo["data_referencia"].dt.strftime("%Y-%m"),
+        "Serviço": grupo["servico"],
+        "Grupo Econômico": grupo["grupo_economico"],
+        "Ranking": grupo["ranking"],
+    }).sort_values(["Mes", "Serviço", "Ranking", "Grupo Econômico"], kind="mergesort", ignore_index=True)
+
+    obtido = cubo.ranking_desempenho()[esperado.columns]
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False)
+
+
+def test_cubo_vazio(final_df, metricas):
+    vazios = [
+        IdaCube.from_final_df(final_df.iloc[:0], metricas[0]),
+        IdaCube.from_final_df(final_df, metricas[0]).select(inicio="2030-01"),
+    ]
+    for cubo in vazios:
+        assert len(cubo.meses) == 0
+        assert cubo.valor_anterior().shape == cubo.valores.shape
+        assert cubo.variacao_relativa_mercado().shape == cubo.valores.shape
+        assert cubo.variacao_media_mercado().shape == (0, len(cubo.servicos))
+        assert cubo.performance_relativa().empty
+        assert cubo.ranking_desempenho().empty
@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.backends import PostgresBackend
+from src.cli import main
+from src.config import ANOS, METRICA_ALVO
+from src.database import data_version, relkind, setup_database
+from src.rollups import compute_rollups
+
+
+@pytest.fixture
+def engine(banco):
+    engine = create_engine(banco)
+    yield engine
+    engine.dispose()
+
+
+def _cria_schema_original(engine) -> None:
+    """
+    Cria o schema das versões anteriores ao particionamento e à dimensão de métrica (a
+    tabela fato comum, sem `metrica_id` nem `data_referencia`), com alguns registros.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE dim_tempo (id_tempo SERIAL PRIMARY KEY, data_referencia DATE NOT NULL UNIQUE, "
+            "ano INTEGER NOT NULL, mes INTEGER NOT NULL)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE dim_grupo_economico (id_grupo SERIAL PRIMARY KEY, nome_grupo VARCHAR(100) NOT NULL UNIQUE)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE dim_servico (id_servico SERIAL PRIMARY KEY, nome_servico VARCHAR(50) NOT NULL UNIQUE)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE fato_atendimento (id SERIAL PRIMARY KEY, "
+            "tempo_id INTEGER REFERENCES dim_tempo (id_tempo), "
+            "servico_id INTEGER REFERENCES dim_servico (id_servico), "
+            "grupo_economico_id INTEGER REFERENCES dim_grupo_economico (id_grupo), "
+            "valor NUMERIC(10, 4), "
+            "CONSTRAINT uq_atendimento_contexto UNIQUE (tempo_id, servico_id, grupo_economico_id))"
+        ))
+        connection.execute(text(
+            "INSERT INTO dim_tempo (data_referencia, ano, mes) VALUES "
+            "('2014-12-01', 2014, 12), ('2015-01-01', 2015, 1), ('2015-02-01', 2015, 2)"
+        ))
+        connection.execute(text("INSERT INTO dim_grupo_economico (nome_grupo) VALUES ('CLARO'), ('VIVO'), ('OI')"))
+        connection.execute(text("INSERT INTO dim_servico (nome_servico) VALUES ('SMP'), ('SCM')"))
+        connection.execute(text(
+            "INSERT INTO fato_atendimento (tempo_id, servico_id, grupo_economico_id, valor) VALUES "
+            "(1, 1, 1, 90), (1, 1, 2, 80), (1, 1, 3, 70), "
+            "(2, 1, 1, 99), (2, 1, 2, 60), (2, 1, 3, 70), "
+            "(3, 1, 1, 90), (3, 1, 2, 75), "
+            "(1, 2, 1, 50), (2, 2, 1, 55), (3, 2, 2, 40)"
+        ))
+
+
+def test_setup_migra_a_tabela_fato_original_com_agregados(engine):
+    _cria_schema_original(engine)
+
+    setup_database(engine, ANOS)
+    # Um segundo setup não encontra mais o que migrar.
+    setup_database(engine, ANOS)
+
+    with engine.connect() as connection:
+        assert relkind(connection, "fato_atendimento") == "p"
+        fato = pd.read_sql(
+            "SELECT f.id, f.data_referencia, m.nome_metrica FROM fato_atendimento f "
+            "JOIN dim_metrica m ON m.id_metrica = f.metrica_id ORDER BY f.id",
+            connection,
+        )
+        agregados = {
+            tabela: connection.execute(text(f"SELECT COUNT(*) FROM {tabela}")).scalar()
+            for tabela in ("agg_grupo_mensal", "agg_mercado_mensal", "agg_grupo_anual")
+        }
+        performance = pd.read_sql("SELECT * FROM vw_performance_relativa_mercado", connection)
+        ranking = pd.read_sql("SELECT * FROM vw_ranking_desempenho_absoluto", connection)
+        legado = connection.execute(text("SELECT COUNT(*) FROM pg_class WHERE relname LIKE '%legado%'")).scalar()
+
+    assert fato["id"].tolist() == list(range(1, 12))
+    assert set(fato["nome_metrica"]) == {METRICA_ALVO}
+    assert agregados == {"agg_grupo_mensal": 11, "agg_mercado_mensal": 6, "agg_grupo_anual": 9}
+    assert len(ranking) == 11
+    assert performance[["Mes", "Serviço"]].values.tolist() == [["2015-01", "SCM"], ["2015-01", "SMP"], ["2015-02", "SMP"]]
+    # Janeiro/2015 no SMP: CLARO variou 10% e a média do mercado foi de 80 para 229/3.
+    janeiro = performance.iloc[1]
+    assert janeiro["CLARO"] == pytest.approx(10 - (229 / 3 / 80 - 1) * 100)
+    assert legado == 0
+
+
+def _views(engine) -> dict:
+    with engine.connect() as connection:
+        return {
+            view: pd.read_sql(f"SELECT * FROM {view}", connection)
+            for view in ("vw_performance_relativa_mercado", "vw_ranking_desempenho_absoluto")
+        }
+
+
+@pytest.mark.parametrize("concorrente", [False, True])
+def test_particao_desanexada_e_anexada_de_volta(banco, engine, final_df, monkeypatch, concorrente):
+    backend = PostgresBackend(banco)
+    backend.setup()
+    backend.load(final_df, compute_rollups(final_df), "copy")
+    completas = _views(engine)
+    monkeypatch.setenv("ETL_DATABASE_URL", banco)
+
+    assert main(["particao", "--desanexar", "2013"] + (["--concorrente"] if concorrente else [])) == 0
+
+    with engine.connect() as connection:
+        fatos = connection.execute(text("SELECT COUNT(*) FROM fato_atendimento")).scalar()
+        arquivados = connection.execute(text("SELECT COUNT(*) FROM fato_atendimento_2013")).scalar()
+        particao = connection.execute(text("SELECT relispartition FROM pg_class WHERE relname = 'fato_atendimento_2013'")).scalar()
+        versao = data_version(connection)
+    assert fatos == (final_df["data_referencia"].dt.year == 2014).sum()
+    assert arquivados == len(final_df) - fatos
+    assert particao is False
+    assert versao == 2
+    # Os agregados passam a ser os do histórico sem 2013.
+    ranking = completas["vw_ranking_desempenho_absoluto"]
+    pd.testing.assert_frame_equal(
+        _views(engine)["vw_ranking_desempenho_absoluto"], ranking[ranking["Mes"] >= "2014"].reset_index(drop=True)
+    )
+    esperado = compute_rollups(final_df[final_df["data_referencia"].dt.year == 2014])["agg_grupo_mensal"]
+    chaves = ["data_referencia", "servico", "grupo_economico", "metrica"]
+    with engine.connect() as connection:
+        obtido = pd.read_sql("SELECT * FROM agg_grupo_mensal", connection, parse_dates=["data_referencia"])
+    obtido = obtido.sort_values(chaves, ignore_index=True)
+    esperado = esperado.sort_values(chaves, ignore_index=True)
+    pd.testing.assert_frame_equal(obtido[esperado.columns], esperado, check_dtype=False, atol=1e-6)
+
+    assert main(["particao", "--anexar", "2013"]) == 0
+
+    for view, df in _views(engine).items():
+        pd.testing.assert_frame_equal(df, completas[view])
+    # A constraint única vale de novo para a partição anexada: a recarga incremental não
+    # encontra nada a inserir nem a atualizar.
+    stats = backend.load(final_df, compute_rollups(final_df), "upsert")
+    assert stats == {"inseridos": 0, "atualizados": 0, "inalterados": len(final_df)}
+    backend.close()
@@ -0,0 +1,108 @@
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+
+from src.download import BAIXADO, NAO_ENCONTRADO, NAO_MODIFICADO, RETOMADO, SourceDownloader
+
+ARQUIVO = "SMP2013.ods"
+CONTEUDO = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def destino(tmp_path: Path) -> Path:
+    return tmp_path / "dados_brutos"
+
+
+def _downloader(servidor, destino: Path) -> SourceDownloader:
+    return SourceDownloader(destino, base_url=servidor.base_url, max_workers=2)
+
+
+def _etag(dados: bytes) -> str:
+    return f'"{hashlib.md5(dados).hexdigest()}"'
+
+
+def _grava_parcial(downloader: SourceDownloader, dados: bytes, etag: str) -> None:
+    """
+    Simula um download interrompido: o `.part` em disco e os validadores do parcial
+    no manifesto.
+    """
+    downloader.output_dir.mkdir(parents=True, exist_ok=True)
+    (downloader.output_dir / f"{ARQUIVO}.part").write_bytes(dados)
+    downloader.manifest_path.write_text(json.dumps({ARQUIVO: {"partial": {"etag": etag}}}), encoding="utf-8")
+
+
+def test_download_e_304_quando_o_arquivo_nao_mudou(servidor, destino):
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO)
+
+    [primeiro] = _downloader(servidor, destino).download_all([ARQUIVO])
+    [segundo] = _downloader(servidor, destino).download_all([ARQUIVO])
+
+    assert (primeiro.status, primeiro.bytes_downloaded) == (BAIXADO, len(CONTEUDO))
+    assert (destino / ARQUIVO).read_bytes() == CONTEUDO
+    assert segundo.status == NAO_MODIFICADO
+    assert servidor.requisicoes[-1]["If-None-Match"] == _etag(CONTEUDO)
+
+
+def test_arquivo_alterado_no_servidor_e_baixado_de_novo(servidor, destino):
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO)
+    _downloader(servidor, destino).download_all([ARQUIVO])
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO[::-1])
+
+    [resultado] = _downloader(servidor, destino).download_all([ARQUIVO])
+
+    assert resultado.status == BAIXADO
+    assert (destino / ARQUIVO).read_bytes() == CONTEUDO[::-1]
+
+
+def test_retoma_o_parcial_com_range_e_if_range(servidor, destino):
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO)
+    downloader = _downloader(servidor, destino)
+    _grava_parcial(downloader, CONTEUDO[:1000], _etag(CONTEUDO))
+
+    [resultado] = downloader.download_all([ARQUIVO])
+
+    assert (resultado.status, resultado.bytes_downloaded) == (RETOMADO, len(CONTEUDO) - 1000)
+    assert servidor.requisicoes[-1]["Range"] == "bytes=1000-"
+    assert servidor.requisicoes[-1]["If-Range"] == _etag(CONTEUDO)
+    assert (destino / ARQUIVO).read_bytes() == CONTEUDO
+    assert not (destino / f"{ARQUIVO}.part").exists()
+    assert "partial" not in json.loads(downloader.manifest_path.read_text(encoding="utf-8"))[ARQUIVO]
+
+
+def test_parcial_de_outra_versao_do_arquivo_e_descartado(servidor, destino):
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO)
+    downloader = _downloader(servidor, destino)
+    _grava_parcial(downloader, b"x" * 1000, '"versao-antiga"')
+
+    [resultado] = downloader.download_all([ARQUIVO])
+
+    # O If-Range não confere, então o servidor responde 200 com o arquivo inteiro.
+    assert (resultado.status, resultado.bytes_downloaded) == (BAIXADO, len(CONTEUDO))
+    assert (destino / ARQUIVO).read_bytes() == CONTEUDO
+
+
+def test_416_descarta_o_parcial_e_recomeca(servidor, destino):
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO)
+    downloader = _downloader(servidor, destino)
+    _grava_parcial(downloader, CONTEUDO + b"excedente", _etag(CONTEUDO))
+
+    [resultado] = downloader.download_all([ARQUIVO])
+
+    assert [requisicao.get("Range") for requisicao in servidor.requisicoes] == [
+        f"bytes={len(CONTEUDO) + 9}-",
+        None,
+    ]
+    assert (resultado.status, resultado.bytes_downloaded) == (BAIXADO, len(CONTEUDO))
+    assert (destino / ARQUIVO).read_bytes() == CONTEUDO
+
+
+def test_404_nao_interrompe_os_demais_downloads(servidor, destino):
+    (servidor.diretorio / ARQUIVO).write_bytes(CONTEUDO)
+
+    resultados = _downloader(servidor, destino).download_all(["SMP2099.ods", ARQUIVO])
+
+    assert [(r.file_name, r.status) for r in resultados] == [("SMP2099.ods", NAO_ENCONTRADO), (ARQUIVO, BAIXADO)]
+    assert not (destino / "SMP2099.ods").exists()
+    assert (destino / ARQUIVO).read_bytes() == CONTEUDO
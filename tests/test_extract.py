@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.etl import EtlPipeline
+
+
+def _final_df(planilhas: Path, tmp_path: Path, metricas, **kwargs) -> pd.DataFrame:
+    # O Data Mart não é acessado: extração e transformação não abrem o backend.
+    pipeline = EtlPipeline(planilhas, f"parquet://{tmp_path / 'mart'}", metrics=metricas, **kwargs)
+    pipeline.extract_and_clean()
+    pipeline.transform()
+    return pipeline.final_df
+
+
+@pytest.fixture(scope="module")
+def serial(planilhas: Path, tmp_path_factory: pytest.TempPathFactory, metricas) -> pd.DataFrame:
+    return _final_df(planilhas, tmp_path_factory.mktemp("serial"), metricas)
+
+
+def test_leitura_serial_gera_todas_as_metricas(serial, metricas):
+    assert set(serial["metrica"].astype(str)) == set(metricas)
+    assert set(serial["servico"].astype(str)) == {"SMP", "STF", "SCM"}
+    assert serial["valor"].notna().all()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        pytest.param({"parse_workers": 2}, id="pool-de-processos"),
+        pytest.param({"ods_reader": "stream"}, id="leitor-stream"),
+        pytest.param({"ods_reader": "stream", "parse_workers": 2}, id="leitor-stream-pool"),
+    ],
+)
+def test_final_df_igual_ao_da_leitura_serial(planilhas, tmp_path, metricas, serial, kwargs):
+    pd.testing.assert_frame_equal(_final_df(planilhas, tmp_path, metricas, **kwargs), serial)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.config import ANOS
+from src.database import setup_database
+from src.metrics import FALHA, SUCESSO, RunMetrics
+
+
+def _execucao_com_falha(log_path=None) -> RunMetrics:
+    run_metrics = RunMetrics(parametros={"load_mode": "copy"}, log_path=log_path)
+    with run_metrics.stage("transform") as metric:
+        metric.linhas_entrada = 10
+        metric.linhas_saida = 8
+        metric.detalhes["arquivos_com_falha"] = 0
+    with pytest.raises(ValueError, match="carga interrompida"):
+        with run_metrics.stage("load") as metric:
+            metric.linhas_entrada = 8
+            raise ValueError("carga interrompida")
+    run_metrics.finish(FALHA, "carga interrompida")
+    return run_metrics
+
+
+def test_etapa_com_falha_e_registrada_e_propagada():
+    run_metrics = _execucao_com_falha()
+
+    transform, load = run_metrics.stages
+    assert (transform.status, transform.erro) == (SUCESSO, None)
+    assert (load.status, load.erro, load.linhas_entrada) == (FALHA, "carga interrompida", 8)
+    assert load.duracao_s >= 0
+    assert run_metrics.status == FALHA
+
+
+def test_metricas_em_json_lines(tmp_path):
+    log_path = tmp_path / "logs" / "metricas.jsonl"
+    run_metrics = _execucao_com_falha(log_path)
+
+    linhas = [json.loads(linha) for linha in log_path.read_text(encoding="utf-8").splitlines()]
+    assert [(linha["evento"], linha.get("etapa"), linha["status"]) for linha in linhas] == [
+        ("etapa", "transform", SUCESSO),
+        ("etapa", "load", FALHA),
+        ("execucao", None, FALHA),
+    ]
+    assert {linha["run_id"] for linha in linhas} == {run_metrics.run_id}
+    assert (linhas[0]["linhas_saida"], linhas[0]["detalhes"]) == (8, {"arquivos_com_falha": 0})
+    assert linhas[2]["parametros"] == {"load_mode": "copy"}
+    assert linhas[2]["erro"] == "carga interrompida"
+
+
+def test_persist_grava_a_execucao_e_as_etapas(banco):
+    engine = create_engine(banco)
+    run_metrics = _execucao_com_falha()
+    # Sem as tabelas, a falha só é registrada no log.
+    assert run_metrics.persist(engine) is None
+
+    setup_database(engine, ANOS)
+    id_execucao = run_metrics.persist(engine)
+
+    with engine.connect() as connection:
+        execucao = connection.execute(
+            text("SELECT run_uuid, status, erro, parametros FROM etl_run WHERE id_execucao = :id"), {"id": id_execucao}
+        ).one()
+        etapas = connection.execute(
+            text(
+                "SELECT ordem, etapa, status, erro, linhas_entrada, linhas_saida, detalhes "
+                "FROM etl_stage_metric WHERE execucao_id = :id ORDER BY ordem"
+            ),
+            {"id": id_execucao},
+        ).all()
+    engine.dispose()
+
+    assert tuple(execucao) == (run_metrics.run_id, FALHA, "carga interrompida", {"load_mode": "copy"})
+    assert [tuple(etapa) for etapa in etapas] == [
+        (1, "transform", SUCESSO, None, 10, 8, {"arquivos_com_falha": 0}),
+        (2, "load", FALHA, "carga interrompida", 8, None, {}),
+    ]
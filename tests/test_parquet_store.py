@@ -0,0 +1,74 @@
+import duckdb
+import pytest
+
+from src.backends import ParquetBackend
+from src.parquet_store import ARQUIVO_VERSAO, VERSOES_MANTIDAS
+from src.rollups import compute_rollups
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = ParquetBackend(tmp_path / "mart")
+    backend.setup()
+    yield backend
+    backend.close()
+
+
+def _publica(backend: ParquetBackend, df) -> str:
+    backend.load(df, compute_rollups(df))
+    return backend.data_version()
+
+
+def _versoes(store):
+    return sorted(path.name for path in store.root.iterdir() if path.is_dir())
+
+
+def _fatos(store, versao=None) -> int:
+    connection = store.connect(versao)
+    try:
+        return connection.execute("SELECT count(*) FROM fato_atendimento").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_carga_com_falha_nao_publica_a_versao(backend, final_df):
+    store = backend.store
+    publicada = _publica(backend, final_df)
+
+    with pytest.raises(RuntimeError):
+        with store.writer() as writer:
+            writer.append("dim_servico", final_df[["servico"]].drop_duplicates().rename(columns={"servico": "nome_servico"}))
+            raise RuntimeError("falha no meio da carga")
+
+    assert backend.data_version() == publicada
+    assert _versoes(store) == [publicada]
+    assert not (store.root / f"{ARQUIVO_VERSAO}.tmp").exists()
+    assert _fatos(store) == len(final_df)
+
+
+def test_leitura_continua_na_versao_em_que_comecou(backend, final_df):
+    store = backend.store
+    _publica(backend, final_df)
+    leitura = store.connect()
+
+    _publica(backend, final_df.iloc[::2])
+
+    assert leitura.execute("SELECT count(*) FROM fato_atendimento").fetchone()[0] == len(final_df)
+    leitura.close()
+    assert _fatos(store) == len(final_df.iloc[::2])
+
+
+def test_mantem_so_as_ultimas_versoes_e_fecha_as_conexoes_removidas(backend, final_df):
+    store = backend.store
+    primeira = _publica(backend, final_df)
+    leitura = store.connect()
+    versoes = [primeira] + [_publica(backend, final_df.iloc[:n]) for n in (100, 50)]
+
+    assert VERSOES_MANTIDAS == 2
+    assert _versoes(store) == versoes[-VERSOES_MANTIDAS:]
+    # A conexão da primeira versão só é fechada quando uma versão mais nova é consultada.
+    assert leitura.execute("SELECT 1").fetchone() == (1,)
+    assert _fatos(store, store.root / versoes[1]) == 100
+    assert _fatos(store) == 50
+    with pytest.raises(duckdb.ConnectionException):
+        leitura.execute("SELECT 1")
@@ -0,0 +1,62 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.download import BAIXADO, NAO_ENCONTRADO, NAO_MODIFICADO
+from src.etl import EtlPipeline
+
+
+@pytest.fixture
+def publicadas(servidor, planilhas: Path) -> Path:
+    """
+    Publica as planilhas sintéticas no servidor local; os demais arquivos do período
+    configurado respondem 404.
+    """
+    for arquivo in planilhas.glob("*.ods"):
+        shutil.copy(arquivo, servidor.diretorio / arquivo.name)
+    return servidor.diretorio
+
+
+def _pipeline(servidor, tmp_path: Path, destino: str, metricas, **kwargs) -> EtlPipeline:
+    return EtlPipeline(
+        tmp_path / destino,
+        f"parquet://{tmp_path / 'mart'}",
+        base_url=servidor.base_url,
+        metrics=metricas,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("parse_workers", [1, 2])
+def test_encadeado_igual_ao_sequencial(servidor, publicadas, tmp_path, metricas, parse_workers):
+    sequencial = _pipeline(servidor, tmp_path, "sequencial", metricas, parse_workers=parse_workers)
+    resultados_sequencial = sequencial._download_source_files()
+    sequencial.extract_and_clean()
+    sequencial.transform()
+
+    encadeado = _pipeline(servidor, tmp_path, "encadeado", metricas, parse_workers=parse_workers, pipelined=True)
+    resultados_encadeado = encadeado.download_and_extract()
+    encadeado.transform()
+
+    assert resultados_encadeado == resultados_sequencial
+    assert {r.status for r in resultados_encadeado} == {BAIXADO, NAO_ENCONTRADO}
+    assert not sequencial.final_df.empty
+    pd.testing.assert_frame_equal(encadeado.final_df, sequencial.final_df)
+    assert encadeado.parse_stats == sequencial.parse_stats
+
+
+def test_encadeado_le_os_arquivos_nao_modificados(servidor, publicadas, tmp_path, metricas):
+    primeiro = _pipeline(servidor, tmp_path, "dados", metricas, pipelined=True)
+    primeiro.download_and_extract()
+    primeiro.transform()
+
+    segundo = _pipeline(servidor, tmp_path, "dados", metricas, pipelined=True)
+    resultados = segundo.download_and_extract()
+    segundo.transform()
+
+    baixados = {r.file_name for r in resultados if r.status != NAO_ENCONTRADO}
+    assert baixados == {arquivo.name for arquivo in publicadas.glob("*.ods")}
+    assert {r.status for r in resultados if r.file_name in baixados} == {NAO_MODIFICADO}
+    pd.testing.assert_frame_equal(segundo.final_df, primeiro.final_df)
@@ -0,0 +1,108 @@
+import pyarrow as pa
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.backends import PostgresBackend
+from src.query import QueryService, ResultCache
+from src.rollups import compute_rollups
+
+
+class RelogioFalso:
+    """
+    Substitui o módulo `time` em `src.query`: o tempo só anda com `avanca`.
+    """
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+    def perf_counter(self) -> float:
+        return self.agora
+
+    def avanca(self, segundos: float) -> None:
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch) -> RelogioFalso:
+    relogio = RelogioFalso()
+    monkeypatch.setattr("src.query.time", relogio)
+    return relogio
+
+
+def _tabela(valor: int) -> pa.Table:
+    return pa.table({"valor": [valor]})
+
+
+def test_cache_remove_o_menos_usado_recentemente(relogio):
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.put("a", _tabela(1))
+    cache.put("b", _tabela(2))
+    assert cache.get("a") == _tabela(1)
+
+    cache.put("c", _tabela(3))
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == _tabela(1)
+    assert cache.get("c") == _tabela(3)
+    assert cache.stats == {"hits": 3, "misses": 1}
+
+
+def test_cache_expira_apos_o_ttl(relogio):
+    cache = ResultCache(ttl=60)
+    cache.put("a", _tabela(1))
+
+    relogio.avanca(60)
+    assert cache.get("a") == _tabela(1)
+    relogio.avanca(1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def carregado(banco, final_df):
+    backend = PostgresBackend(banco)
+    backend.setup()
+    backend.load(final_df, compute_rollups(final_df), "copy")
+    yield backend
+    backend.close()
+
+
+def test_cache_invalidado_quando_a_versao_dos_dados_muda(banco, carregado, final_df):
+    servico = QueryService(banco)
+    primeiro = servico.ranking(servicos=["SMP"])
+    segundo = servico.ranking(servicos=["SMP"])
+    assert servico.cache.stats == {"hits": 1, "misses": 1}
+    assert segundo.equals(primeiro)
+
+    alterado = final_df.copy()
+    linha = alterado.index[(alterado["servico"] == "SMP")][0]
+    alterado.loc[linha, "valor"] += 1
+    carregado.load(alterado, compute_rollups(alterado), "upsert")
+
+    atualizado = servico.ranking(servicos=["SMP"])
+    assert servico.cache.stats == {"hits": 1, "misses": 2}
+    assert atualizado["Valor do Indicador"].sum() == pytest.approx(primeiro["Valor do Indicador"].sum() + 1)
+    servico.close()
+
+
+def test_versao_reaproveitada_durante_o_intervalo(banco, carregado, relogio):
+    servico = QueryService(banco, version_interval=5)
+    servico.ranking()
+    engine = create_engine(banco)
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE etl_versao_dados SET versao = versao + 1"))
+    engine.dispose()
+
+    # Dentro do intervalo a versão não é relida e o resultado vem do cache.
+    relogio.avanca(4)
+    servico.ranking()
+    assert servico.cache.stats == {"hits": 1, "misses": 1}
+
+    relogio.avanca(2)
+    servico.ranking()
+    assert servico.cache.stats == {"hits": 1, "misses": 2}
+    servico.close()
@@ -0,0 +1,71 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.etl import EtlPipeline
+from src.metrics import SUCESSO
+
+CHUNK_ROWS = 37
+
+
+@pytest.fixture
+def publicadas(servidor, planilhas: Path) -> Path:
+    for arquivo in planilhas.glob("*.ods"):
+        shutil.copy(arquivo, servidor.diretorio / arquivo.name)
+    return servidor.diretorio
+
+
+def _pipeline(entrada: Path, banco: str, metricas, load_mode: str, **kwargs) -> EtlPipeline:
+    return EtlPipeline(entrada, banco, metrics=metricas, load_mode=load_mode, chunk_rows=CHUNK_ROWS, **kwargs)
+
+
+@pytest.mark.parametrize("load_mode", ["replace", "copy", "upsert", "swap"])
+def test_streaming_igual_ao_run(
+    servidor, publicadas, tmp_path, banco, metricas, final_df, conteudo_mart, mesmo_conteudo, load_mode
+):
+    streaming = _pipeline(tmp_path / "dados", banco, metricas, load_mode, base_url=servidor.base_url)
+    assert streaming.run_streaming().status == SUCESSO
+    # Com o banco vazio, todos os registros do fluxo são carregados, inclusive no upsert.
+    [etapa] = [m for m in streaming.run_metrics.stages if m.etapa == "streaming"]
+    assert etapa.linhas_saida == len(final_df)
+    obtido = conteudo_mart(banco)
+
+    completo = _pipeline(tmp_path / "dados", banco, metricas, "replace", base_url=servidor.base_url)
+    assert completo.run().status == SUCESSO
+
+    assert len(obtido["fato_atendimento"]) == len(final_df)
+    mesmo_conteudo(obtido, conteudo_mart(banco))
+
+
+def test_upsert_streaming_de_um_subconjunto_mantem_os_demais(
+    planilhas, tmp_path, banco, metricas, final_df, conteudo_mart, mesmo_conteudo
+):
+    completo = _pipeline(planilhas, banco, metricas, "replace")
+    completo._setup_database()
+    completo.extract_and_clean()
+    completo.transform()
+    completo.load()
+    esperado = conteudo_mart(banco)
+
+    subconjunto = tmp_path / "subconjunto"
+    subconjunto.mkdir()
+    shutil.copy(planilhas / "SMP2014.ods", subconjunto)
+    incremental = _pipeline(subconjunto, banco, metricas, "upsert")
+
+    # Nada mudou: nenhum registro conta como carregado e os dos outros arquivos continuam lá.
+    assert incremental.load_streaming(incremental.iter_transformed_chunks()) == 0
+    mesmo_conteudo(conteudo_mart(banco), esperado)
+
+    # Um valor do subconjunto alterado no banco é o único registro regravado.
+    engine = create_engine(banco)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE fato_atendimento SET valor = valor + 1 WHERE id = ("
+            "SELECT min(f.id) FROM fato_atendimento f JOIN dim_servico s ON s.id_servico = f.servico_id "
+            "WHERE s.nome_servico = 'SMP' AND f.data_referencia >= '2014-01-01')"
+        ))
+    engine.dispose()
+    assert incremental.load_streaming(incremental.iter_transformed_chunks()) == 1
+    mesmo_conteudo(conteudo_mart(banco), esperado)